@@ -6,6 +6,7 @@ Uses Pydantic Settings for environment variable management.
 from pydantic_settings import BaseSettings
 from pathlib import Path
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -36,11 +37,96 @@ class Settings(BaseSettings):
     LLM_TEMPERATURE: float = 0.7
     LLM_TOP_P: float = 0.9
     
+    # LLM backend: "transformers", "llamacpp" (quantized GGUF on CPU),
+    # "openai" (OpenAI-compatible completions server) or "mock"
+    LLM_BACKEND: str = "transformers"
+    LLM_MOCK_FALLBACK: bool = False  # Use the mock backend (reported degraded) if loading fails
+    LLM_CPU_DTYPE: str = "float32"  # transformers on CPU: float32 or bfloat16
+    LLM_GGUF_PATH: Optional[Path] = None
+    LLM_CONTEXT_LENGTH: int = 4096
+    LLM_N_THREADS: int = 0  # 0 lets llama.cpp pick the thread count
+    LLM_API_BASE: str = "http://localhost:8080/v1"
+    LLM_API_KEY: Optional[str] = None
+    LLM_API_TIMEOUT: float = 120.0
+    
     # RAG settings
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
+    # "chars" uses CHUNK_SIZE/CHUNK_OVERLAP; "tokens" sizes chunks with the
+    # embedding tokenizer so no chunk is truncated by the model
+    CHUNK_SIZE_UNIT: str = "chars"
+    CHUNK_SIZE_TOKENS: int = 0  # 0 = embedding model max sequence length
+    CHUNK_OVERLAP_TOKENS: int = 32
     TOP_K_RESULTS: int = 5
     
+    # Near-duplicate chunks (MinHash/LSH over word shingles) are stored once,
+    # with a back-reference to every document that contains them
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.9  # Estimated Jaccard similarity
+    DEDUP_NUM_PERM: int = 128
+    DEDUP_BANDS: int = 16
+    
+    # Context packing settings (token budget for retrieved context in the prompt)
+    CONTEXT_TOKEN_BUDGET: int = 1500
+    CONTEXT_DEDUP_THRESHOLD: float = 0.85
+    
+    # Extractive compression (sentence embeddings are computed at ingest)
+    SENTENCE_COMPRESSION: bool = True
+    SENTENCE_TOP_N: int = 3  # Top-scoring sentences kept per chunk
+    SENTENCE_NEIGHBOURS: int = 1  # Sentences kept around each for coherence
+    
+    # Collections: uploads go to a named collection (default: FAISS_INDEX_PATH,
+    # others in FAISS_INDEX_PATH/collections/<name>), loaded on demand; least
+    # recently used ones are unloaded past either cap (0 MB = no memory cap)
+    MAX_LOADED_COLLECTIONS: int = 8
+    COLLECTION_MEMORY_MB: int = 1024
+    
+    # Sharded mode: with SHARD_URLS set (JSON list of shard servers started with
+    # `python -m app.shard_server`), chunks are split across the shards by
+    # document or by chunk hash (SHARD_BY). Each query is fanned out to every
+    # shard; shards that fail or miss SHARD_TIMEOUT_MS are left out of the
+    # (partial) result. Writes wait up to SHARD_WRITE_TIMEOUT_S on every shard.
+    # SHARD_MAX_CONCURRENCY fan-outs can be in flight at once (one worker and
+    # one connection per shard each); more wait for a free worker.
+    # /health and /metrics read shard counters cached for SHARD_STATS_TTL_S
+    # and refreshed in the background.
+    SHARD_URLS: list = []
+    SHARD_BY: str = "document"  # "document" or "chunk"
+    SHARD_TIMEOUT_MS: int = 1000
+    SHARD_WRITE_TIMEOUT_S: float = 60.0
+    SHARD_MAX_CONCURRENCY: int = 32
+    SHARD_STATS_TTL_S: float = 5.0
+    
+    # Vector index: "flat" (float vectors in memory) or "binary" (sign bits in
+    # memory, 48 bytes per 384-dim vector, searched by Hamming distance; the
+    # BINARY_SHORTLIST x top_k closest codes are re-scored with the float
+    # vectors, memory-mapped from disk like the sentence embeddings). A saved
+    # index of the other type is converted on load.
+    INDEX_TYPE: str = "flat"
+    BINARY_SHORTLIST: int = 20
+    
+    # Reduced-dimension first stage: a PCA/OPQ projection fitted on the index
+    # (saved next to it) is searched for PROJECTION_SHORTLIST x top_k
+    # candidates, which are re-scored with the full vectors
+    PROJECTION_DIM: int = 0  # 0 = search at full dimension
+    PROJECTION_METHOD: str = "pca"  # "pca" or "opq"
+    PROJECTION_RESCORE: bool = True
+    PROJECTION_SHORTLIST: int = 4
+    PROJECTION_MIN_TRAIN: int = 1000  # Smaller indexes stay at full dimension
+    PROJECTION_RECALL_SAMPLE: int = 20  # Check every Nth query against full search (0 = off)
+    
+    # Reranking settings (cross-encoder stage between search and generation)
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20  # Chunks over-retrieved from FAISS
+    RERANK_TOP_K: int = 3  # Chunks forwarded to the LLM
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_TIMEOUT_MS: int = 500  # Fall back to vector order after this
+    RERANK_CACHE_SIZE: int = 4096
+    
+    # Query run once at startup to warm up retrieval and generation
+    WARMUP_QUERY: str = "What are the fundamental rights of citizens of Nepal?"
+    
     # CORS settings
     CORS_ORIGINS: list = ["http://localhost:3000", "http://localhost:5173"]
     
@@ -58,10 +144,16 @@ def get_settings() -> Settings:
     return Settings()
 
 
+def ensure_directories():
+    """
+    Create the data directories.
+    Called from the app lifespan rather than at import, so importing the
+    settings has no filesystem side effects.
+    """
+    settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
+    settings.FAISS_INDEX_PATH.mkdir(parents=True, exist_ok=True)
+    settings.DOCUMENTS_PATH.mkdir(parents=True, exist_ok=True)
+
+
 # Global settings instance
 settings = get_settings()
-
-# Create necessary directories on startup
-settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
-settings.FAISS_INDEX_PATH.mkdir(parents=True, exist_ok=True)
-settings.DOCUMENTS_PATH.mkdir(parents=True, exist_ok=True)
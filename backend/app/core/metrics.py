@@ -0,0 +1,280 @@
+"""
+In-process metrics with Prometheus text exposition.
+Counters, gauges and histograms with labels, plus scrape-time collectors
+that mirror counts kept elsewhere (cache hits, token totals, index size).
+No client library is needed: /metrics renders the text format directly.
+"""
+
+import bisect
+import logging
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.core.timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond FAISS searches up to slow CPU generation
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Lines of the text exposition format for this family."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """Add `amount` (must be >= 0)."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: str):
+        """Mirror a total that is counted elsewhere (used by collectors)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (seconds)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._series[key] = (counts, total + value, count + 1)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._series.items())
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    Holds metric families and scrape-time collectors.
+    Metric constructors are idempotent so modules can share families by name.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback that updates metrics right before each scrape."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                # A component that is still loading must not break the scrape
+                logger.debug(f"Metrics collector {collector.__name__} skipped: {e}")
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metric families shared by both APIs
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter(
+    "rag_requests_total", "HTTP requests by route and status code", ("method", "route", "status")
+)
+REQUEST_DURATION = metrics.histogram(
+    "rag_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+STAGE_DURATION = metrics.histogram(
+    "rag_stage_duration_seconds", "Duration of pipeline stages", ("pipeline", "stage")
+)
+CACHE_HITS = metrics.counter("rag_cache_hits_total", "Cache hits by cache", ("cache",))
+CACHE_MISSES = metrics.counter("rag_cache_misses_total", "Cache misses by cache", ("cache",))
+LLM_TOKENS = metrics.counter(
+    "rag_llm_tokens_total", "LLM tokens by direction (prompt or completion)", ("direction",)
+)
+FAST_PATH = metrics.counter(
+    "rag_fast_path_total", "Structured fast-path lookups by result (answered, elaborated, fallback)", ("result",)
+)
+INDEX_CHUNKS = metrics.gauge("rag_index_chunks", "Chunks in the vector index")
+INDEX_DOCUMENTS = metrics.gauge("rag_index_documents", "Documents in the vector index")
+COLLECTIONS_LOADED = metrics.gauge("rag_collections_loaded", "Collections currently loaded in memory")
+SHARD_FAILURES = metrics.counter(
+    "rag_shard_failures_total", "Shard calls that failed or missed the deadline", ("shard", "reason")
+)
+PARTIAL_SEARCHES = metrics.counter(
+    "rag_shard_partial_searches_total", "Sharded searches answered without every shard"
+)
+PROJECTION_RECALL = metrics.gauge(
+    "rag_projection_recall", "Sampled recall@k of projected search against full-dimension search"
+)
+
+
+def observe_stages(pipeline: str, timer: StageTimer):
+    """
+    Record every stage of a timed request in the stage histogram.
+
+    Args:
+        pipeline: Pipeline name, e.g. "ask", "search" or "upload"
+        timer: Timer holding the stage durations of one request
+    """
+    for stage, ms in timer.durations_ms.items():
+        STAGE_DURATION.observe(ms / 1000, pipeline=pipeline, stage=stage)
+    STAGE_DURATION.observe(timer.total_ms / 1000, pipeline=pipeline, stage="total")
+
+
+def observe_request(method: str, route: str, status: int, duration_s: float):
+    """Count one HTTP request and record its latency."""
+    REQUESTS.inc(method=method, route=route, status=str(status))
+    REQUEST_DURATION.observe(duration_s, method=method, route=route)
+
+
+def route_template(scope: Dict) -> str:
+    """
+    Route path template of a request (e.g. "/upload/{document_name}"),
+    so label values stay bounded; unmatched paths are grouped.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,158 @@
+"""
+Readiness tracking for components loaded in the background at startup.
+Lets the server answer liveness checks immediately while models and
+indexes are still loading, and report per-component progress.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+DEGRADED = "degraded"
+FAILED = "failed"
+
+# Statuses under which a component can serve requests
+USABLE = (READY, DEGRADED)
+
+
+class NotReadyError(RuntimeError):
+    """Raised when a required component has not finished loading."""
+
+    def __init__(self, components: Dict[str, str]):
+        self.components = components
+        super().__init__(
+            "Service is warming up: "
+            + ", ".join(f"{name} is {status}" for name, status in components.items())
+        )
+
+
+@dataclass
+class ComponentState:
+    """Load state of one component."""
+    status: str = PENDING
+    started_at: Optional[float] = None
+    load_time_s: Optional[float] = None
+    error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+class ReadinessRegistry:
+    """
+    Thread-safe registry of component load states and warm-up latencies.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, ComponentState] = {}
+        self._warmup_ms: Dict[str, float] = {}
+        self._lock = Lock()
+        self._created_at = time.time()
+
+    def register(self, *names: str):
+        """Declare components that must load before the service is ready."""
+        with self._lock:
+            for name in names:
+                self._components.setdefault(name, ComponentState())
+
+    @contextmanager
+    def loading(self, name: str) -> Iterator[ComponentState]:
+        """
+        Track the loading of a component.
+        Marks it ready when the block completes, or failed if it raises.
+
+        Args:
+            name: Component name
+
+        Yields:
+            The component state, whose details may be filled in
+        """
+        with self._lock:
+            state = self._components.setdefault(name, ComponentState())
+            state.status = LOADING
+            state.started_at = time.time()
+            state.error = None
+        start = time.perf_counter()
+        try:
+            yield state
+        except Exception as e:
+            with self._lock:
+                state.status = FAILED
+                state.error = f"{type(e).__name__}: {e}"
+                state.load_time_s = time.perf_counter() - start
+            logger.error(f"Component '{name}' failed to load: {state.error}")
+            raise
+        with self._lock:
+            state.status = READY
+            state.load_time_s = time.perf_counter() - start
+        logger.info(f"Component '{name}' ready in {state.load_time_s:.2f}s")
+
+    def mark_degraded(self, name: str, reason: str):
+        """
+        Mark a loaded component as running on a fallback.
+        It still serves requests, but the service is no longer reported ready.
+        """
+        with self._lock:
+            state = self._components.setdefault(name, ComponentState())
+            state.status = DEGRADED
+            state.error = reason
+        logger.warning(f"Component '{name}' degraded: {reason}")
+
+    def record_warmup(self, name: str, latency_ms: float):
+        """Record the latency of a warm-up query."""
+        with self._lock:
+            self._warmup_ms[name] = round(latency_ms, 1)
+
+    def is_ready(self, *names: str) -> bool:
+        """Whether the given components (all registered ones if none given) are ready."""
+        with self._lock:
+            names = names or tuple(self._components)
+            return all(
+                name in self._components and self._components[name].status == READY
+                for name in names
+            )
+
+    def require(self, *names: str):
+        """
+        Ensure components are ready.
+
+        Raises:
+            NotReadyError: If any component is not ready yet (or failed);
+                degraded components are accepted
+        """
+        with self._lock:
+            missing = {
+                name: self._components[name].status if name in self._components else PENDING
+                for name in names
+                if name not in self._components or self._components[name].status not in USABLE
+            }
+        if missing:
+            raise NotReadyError(missing)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-component states and warm-up latencies for /readyz."""
+        with self._lock:
+            return {
+                "ready": all(c.status == READY for c in self._components.values()),
+                "uptime_s": round(time.time() - self._created_at, 1),
+                "components": {
+                    name: {
+                        "status": state.status,
+                        "load_time_s": round(state.load_time_s, 2) if state.load_time_s is not None else None,
+                        "error": state.error,
+                        **state.details
+                    }
+                    for name, state in self._components.items()
+                },
+                "warmup_ms": dict(self._warmup_ms)
+            }
+
+
+# Global registry shared by the app, routes and services
+readiness = ReadinessRegistry()
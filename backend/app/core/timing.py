@@ -0,0 +1,51 @@
+"""
+Per-request stage timing.
+Collects how long each pipeline stage took and renders it as a
+Server-Timing header, so clients and load tests can see the breakdown.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """
+    Records the duration of named stages of one request.
+    A stage entered more than once accumulates its time.
+    """
+
+    def __init__(self):
+        self.durations_ms: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.durations_ms[name] = self.durations_ms.get(name, 0.0) + elapsed
+
+    def mark(self, name: str):
+        """Record the time since the timer started as `name`, once (e.g. time to first token)."""
+        self.durations_ms.setdefault(name, self.total_ms)
+
+    @property
+    def total_ms(self) -> float:
+        """Time since the timer was created."""
+        return (time.perf_counter() - self._start) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations (ms, rounded) plus the total."""
+        stages = {name: round(ms, 2) for name, ms in self.durations_ms.items()}
+        stages["total"] = round(self.total_ms, 2)
+        return stages
+
+    def server_timing(self) -> str:
+        """Render the stages as a Server-Timing header value."""
+        return ", ".join(
+            f"{name};dur={ms:.2f}" for name, ms in self.as_dict().items()
+        )
@@ -1,2 +1,4 @@
 # Database/Vector store package
 from .faiss_store import FAISSStore
+from .collection_manager import CollectionManager, CollectionNotFoundError, DEFAULT_COLLECTION
+from .sharded_store import ShardedCollections, ShardedStore, ShardUnavailableError
@@ -0,0 +1,194 @@
+"""
+Binary-quantized vector index with exact float re-scoring.
+Each vector is kept in memory only as its sign bits (dimension / 8 bytes),
+searched by Hamming distance with a FAISS binary index; the shortlist is
+re-scored with the float vectors, which are read from a memory-mapped file.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+logger = logging.getLogger(__name__)
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Sign-quantize vectors of shape (n, d) to packed codes of shape (n, d / 8)."""
+    return np.packbits(vectors > 0, axis=1)
+
+
+class BinaryFlatIndex:
+    """
+    Drop-in for the IndexFlatIP used by FAISSStore (add, search, reconstruct,
+    ntotal) that holds 1 bit per dimension in memory.
+
+    Float vectors added since the last save are kept in memory and written by
+    save(), so the vectors file always matches the saved codes and metadata.
+    """
+
+    def __init__(self, dimension: int, vectors_file: Path, shortlist: int = 20):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimension: Vector dimension, a multiple of 8
+            vectors_file: File holding the float32 vectors, row by row
+            shortlist: Candidates per result re-scored with the float vectors
+        """
+        import faiss
+
+        if dimension % 8:
+            raise ValueError(f"Binary index dimension must be a multiple of 8, got {dimension}")
+        self.d = dimension
+        self.vectors_file = vectors_file
+        self.shortlist = shortlist
+        self.codes = faiss.IndexBinaryFlat(dimension)
+
+        # Rows [0, _stored_rows) are on disk, the rest in _pending
+        self._stored: Optional[np.memmap] = None
+        self._stored_rows = 0
+        self._pending: List[np.ndarray] = []
+        self._pending_rows: Optional[np.ndarray] = None
+        # A new (or reset) index replaces the file on its first save
+        self._rewrite = True
+
+    @property
+    def ntotal(self) -> int:
+        return self.codes.ntotal
+
+    @classmethod
+    def load(
+        cls,
+        dimension: int,
+        vectors_file: Path,
+        codes_file: Path,
+        shortlist: int = 20
+    ) -> "BinaryFlatIndex":
+        """
+        Load an index written by save().
+
+        Args:
+            dimension: Vector dimension
+            vectors_file: Float vectors file
+            codes_file: Binary codes written by save()
+            shortlist: Candidates per result re-scored with the float vectors
+
+        Returns:
+            The loaded index
+        """
+        import faiss
+
+        index = cls(dimension, vectors_file, shortlist)
+        index.codes = faiss.read_index_binary(str(codes_file))
+        rows = vectors_file.stat().st_size // (4 * dimension) if vectors_file.exists() else 0
+        if rows < index.ntotal:
+            raise ValueError(
+                f"{vectors_file} holds {rows} vectors, the binary index {index.ntotal}"
+            )
+        if rows > index.ntotal:
+            # Left over from an interrupted save
+            os.truncate(vectors_file, index.ntotal * 4 * dimension)
+        index._map(index.ntotal)
+        index._rewrite = False
+        return index
+
+    def add(self, vectors: np.ndarray) -> None:
+        """Add normalized float vectors of shape (n, d)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.codes.add(binarize(vectors))
+        self._pending.append(vectors)
+        self._pending_rows = None
+
+    def reset(self) -> None:
+        """Remove all vectors (the file is rewritten on the next save)."""
+        self.codes.reset()
+        self._stored, self._stored_rows = None, 0
+        self._pending, self._pending_rows = [], None
+        self._rewrite = True
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        params: Optional["faiss.SearchParameters"] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search by Hamming distance and re-score the shortlist.
+
+        Args:
+            query: Normalized query of shape (1, d)
+            k: Number of results
+            params: FAISS search parameters (e.g. an ID selector)
+
+        Returns:
+            (scores, ids) of shape (1, <= k), exact inner products, best first
+        """
+        candidates = min(max(k * self.shortlist, k), self.ntotal)
+        if candidates <= 0:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+
+        _, ids = self.codes.search(binarize(query), candidates, params=params)
+        ids = ids[0][ids[0] >= 0]
+        scores = self.reconstruct_batch(ids) @ query.reshape(-1).astype(np.float32)
+        order = np.argsort(-scores)[:k]
+        return scores[order][None, :], ids[order][None, :]
+
+    def reconstruct(self, i: int) -> np.ndarray:
+        """Float vector of id i."""
+        return self.reconstruct_batch(np.array([i]))[0]
+
+    def reconstruct_n(self, i0: int, n: int) -> np.ndarray:
+        """Float vectors of ids i0 .. i0 + n - 1."""
+        return self.reconstruct_batch(np.arange(i0, i0 + n))
+
+    def reconstruct_batch(self, ids: np.ndarray) -> np.ndarray:
+        """Float vectors of the given ids, from the file or pending rows."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.empty((len(ids), self.d), dtype=np.float32)
+        on_disk = ids < self._stored_rows
+        if on_disk.any():
+            vectors[on_disk] = self._stored[ids[on_disk]]
+        if not on_disk.all():
+            if self._pending_rows is None:
+                self._pending_rows = np.vstack(self._pending)
+            vectors[~on_disk] = self._pending_rows[ids[~on_disk] - self._stored_rows]
+        return vectors
+
+    def save(self, codes_file: Path) -> None:
+        """Write pending vectors to the vectors file and the codes to codes_file."""
+        import faiss
+
+        if self._rewrite:
+            # Replace the file atomically so a failed save keeps the old one
+            tmp = self.vectors_file.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                for rows in self._pending:
+                    f.write(rows.tobytes())
+            self._stored = None
+            os.replace(tmp, self.vectors_file)
+        elif self._pending:
+            with open(self.vectors_file, "ab") as f:
+                for rows in self._pending:
+                    f.write(rows.tobytes())
+        self._pending, self._pending_rows = [], None
+        self._rewrite = False
+        faiss.write_index_binary(self.codes, str(codes_file))
+        self._map(self.ntotal)
+
+    def _map(self, rows: int) -> None:
+        self._stored_rows = rows
+        self._stored = None
+        if rows:
+            self._stored = np.memmap(
+                self.vectors_file, dtype=np.float32, mode="r", shape=(rows, self.d)
+            )
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory: codes plus vectors not yet saved."""
+        return self.ntotal * self.codes.code_size + sum(rows.nbytes for rows in self._pending)
@@ -0,0 +1,197 @@
+"""
+Named collections of indexed documents.
+Each collection is its own FAISSStore (index, metadata and persistence
+directory), created on first upload and loaded on demand; the least recently
+used collections are unloaded to stay under a count and memory cap.
+"""
+
+import logging
+import re
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.db.faiss_store import FAISSStore
+
+logger = logging.getLogger(__name__)
+
+# Stored in FAISS_INDEX_PATH itself, so an index from before collections is kept
+DEFAULT_COLLECTION = "default"
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class CollectionNotFoundError(LookupError):
+    """Raised when a collection that was never created is searched."""
+
+
+def validate_collection_name(name: str) -> str:
+    """
+    Check that a collection name is safe to use as a directory name.
+
+    Args:
+        name: Collection name
+
+    Returns:
+        The name
+    """
+    if not _NAME_PATTERN.match(name):
+        raise ValueError(
+            f"Invalid collection name: {name!r}. Use up to 64 letters, digits, "
+            f"'-' or '_', starting with a letter or digit"
+        )
+    return name
+
+
+class CollectionManager:
+    """
+    Loads, creates and unloads collections. Thread-safe.
+
+    The default collection is never unloaded. A collection in use (see use())
+    is not unloaded either, so a write never goes to a store that a later
+    request has loaded again from disk.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        max_loaded: Optional[int] = None,
+        max_memory_mb: Optional[int] = None
+    ):
+        """
+        Initialize the manager and load the default collection.
+
+        Args:
+            root: Directory of the default collection; named collections are
+                stored in root/collections/<name>
+            max_loaded: Most collections kept loaded (default: MAX_LOADED_COLLECTIONS)
+            max_memory_mb: Memory cap for loaded vectors in MB, 0 for none
+                (default: COLLECTION_MEMORY_MB)
+        """
+        self.root = root or settings.FAISS_INDEX_PATH
+        self.max_loaded = max_loaded or settings.MAX_LOADED_COLLECTIONS
+        self.max_memory_mb = settings.COLLECTION_MEMORY_MB if max_memory_mb is None else max_memory_mb
+
+        self._stores: "OrderedDict[str, FAISSStore]" = OrderedDict()
+        self._in_use: Counter = Counter()
+        self._lock = Lock()
+        self._loads = 0
+        self._evictions = 0
+
+        self._stores[DEFAULT_COLLECTION] = FAISSStore(self.root)
+
+    def path_for(self, name: str) -> Path:
+        """Persistence directory of a collection."""
+        if name == DEFAULT_COLLECTION:
+            return self.root
+        return self.root / "collections" / validate_collection_name(name)
+
+    def exists(self, name: str) -> bool:
+        """Whether a collection is loaded or saved on disk."""
+        return (
+            name == DEFAULT_COLLECTION
+            or name in self._stores
+            or (self.path_for(name) / "metadata.json").exists()
+        )
+
+    def list_collections(self) -> List[str]:
+        """Names of all collections, loaded or on disk."""
+        names = {DEFAULT_COLLECTION, *self._stores}
+        collections_dir = self.root / "collections"
+        if collections_dir.exists():
+            names.update(
+                path.name for path in collections_dir.iterdir()
+                if (path / "metadata.json").exists()
+            )
+        return sorted(names)
+
+    def get(self, name: str = DEFAULT_COLLECTION, create: bool = False) -> FAISSStore:
+        """
+        The store of a collection, loaded if needed.
+
+        Args:
+            name: Collection name
+            create: Create the collection if it does not exist
+
+        Returns:
+            The collection's store
+        """
+        with self._lock:
+            return self._load(name, create)
+
+    @contextmanager
+    def use(self, name: str = DEFAULT_COLLECTION, create: bool = False) -> Iterator[FAISSStore]:
+        """
+        Keep a collection loaded while the block runs (for writes, or reads
+        that span several calls).
+
+        Args:
+            name: Collection name
+            create: Create the collection if it does not exist
+        """
+        with self._lock:
+            store = self._load(name, create)
+            self._in_use[name] += 1
+        try:
+            yield store
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                if self._in_use[name] <= 0:
+                    del self._in_use[name]
+                self._evict()
+
+    def _load(self, name: str, create: bool) -> FAISSStore:
+        """Return a loaded store, loading or creating it. Lock must be held."""
+        store = self._stores.get(name)
+        if store is not None:
+            self._stores.move_to_end(name)
+            return store
+
+        path = self.path_for(name)
+        if not create and not (path / "metadata.json").exists():
+            raise CollectionNotFoundError(f"Collection not found: {name}")
+
+        store = FAISSStore(path)
+        self._stores[name] = store
+        self._loads += 1
+        logger.info(f"Loaded collection '{name}' ({store.get_total_chunks()} chunks)")
+        self._evict()
+        return store
+
+    def _evict(self):
+        """Unload least recently used collections over the caps. Lock must be held."""
+        max_bytes = self.max_memory_mb * 1024 * 1024
+        # The most recently used collection is the one being asked for
+        for name in list(self._stores)[:-1]:
+            over_count = len(self._stores) > self.max_loaded
+            over_memory = max_bytes > 0 and self._memory_bytes() > max_bytes
+            if not (over_count or over_memory):
+                break
+            if name == DEFAULT_COLLECTION or name in self._in_use:
+                continue
+            # Every write is saved by the caller, so there is nothing to flush
+            del self._stores[name]
+            self._evictions += 1
+            logger.info(f"Unloaded collection '{name}'")
+
+    def _memory_bytes(self) -> int:
+        return sum(store.memory_bytes() for store in self._stores.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Loaded collections, their size and the load/unload counters."""
+        with self._lock:
+            return {
+                "collections": self.list_collections(),
+                "loaded": {
+                    name: store.get_total_chunks() for name, store in self._stores.items()
+                },
+                "memory_mb": round(self._memory_bytes() / 1024 / 1024, 1),
+                "max_loaded": self.max_loaded,
+                "max_memory_mb": self.max_memory_mb,
+                "loads": self._loads,
+                "evictions": self._evictions
+            }
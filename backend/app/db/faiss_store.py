@@ -7,14 +7,28 @@ import logging
 import json
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-import faiss
+from typing import List, Dict, Any, Optional, Tuple, Union, TYPE_CHECKING
+from collections import Counter
 from threading import Lock
 
 from app.core.config import settings
+from app.db.binary_index import BinaryFlatIndex
+from app.db.projection import Projection, shortlist_search
+from app.db.sentence_store import SentenceStore
+from app.utils.minhash import MinHashLSH
+
+if TYPE_CHECKING:
+    import faiss
 
 logger = logging.getLogger(__name__)
 
+# Metadata fields that can be used as search filters
+FILTERABLE_FIELDS = ("document_name",)
+
+FilterValue = Union[str, int, List[Union[str, int]]]
+
+INDEX_TYPES = ("flat", "binary")
+
 
 class FAISSStore:
     """
@@ -32,11 +46,40 @@ class FAISSStore:
         self.index_path = index_path or settings.FAISS_INDEX_PATH
         self.index_file = self.index_path / "index.faiss"
         self.metadata_file = self.index_path / "metadata.json"
+        self.sentences_file = self.index_path / "sentences.npz"
+        self.projection_file = self.index_path / "projection.faiss"
+        # INDEX_TYPE=binary: sign codes in memory, float vectors (and sentence
+        # embeddings) memory-mapped
+        self.binary_index_file = self.index_path / "index_binary.faiss"
+        self.vectors_file = self.index_path / "vectors.f32"
+        if settings.INDEX_TYPE not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type: {settings.INDEX_TYPE}. "
+                f"Supported types: {', '.join(INDEX_TYPES)}"
+            )
+        self.binary = settings.INDEX_TYPE == "binary"
         
-        self.index: Optional[faiss.Index] = None
+        self.index: Optional[Union["faiss.Index", BinaryFlatIndex]] = None
         self.metadata: List[Dict[str, Any]] = []
         self.dimension = settings.EMBEDDING_DIMENSION
         
+        # Lazily built inverted lists: field -> value -> vector ids
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {}
+        
+        # Chunks per document, kept up to date so stats never scan metadata
+        self._document_chunks: Counter = Counter()
+        
+        # Sentence embeddings for extractive context compression
+        self.sentences = SentenceStore(self.sentences_file, self.dimension, mmap=self.binary)
+        
+        # MinHash signatures of stored chunks, built on first duplicate lookup
+        self._minhash: Optional[MinHashLSH] = None
+        
+        # Optional reduced-dimension first stage (PROJECTION_DIM > 0)
+        self.projection: Optional[Projection] = None
+        self.reduced_index: Optional["faiss.Index"] = None
+        self._projection_stats = {"queries": 0, "sampled": 0, "recall_sum": 0.0}
+        
         # Thread lock for concurrent access
         self._lock = Lock()
         
@@ -51,13 +94,17 @@ class FAISSStore:
             True if index was loaded successfully, False otherwise
         """
         try:
-            if self.index_file.exists() and self.metadata_file.exists():
-                logger.info(f"Loading FAISS index from {self.index_file}")
-                
-                self.index = faiss.read_index(str(self.index_file))
+            index = self._read_index() if self.metadata_file.exists() else None
+            if index is not None:
+                self.index = index
                 
                 with open(self.metadata_file, "r", encoding="utf-8") as f:
                     self.metadata = json.load(f)
+                self._postings = {}
+                self._minhash = None
+                self._document_chunks = self._count_document_chunks()
+                self.sentences.load(self.index.ntotal)
+                self._load_projection()
                 
                 logger.info(
                     f"Loaded FAISS index with {self.index.ntotal} vectors "
@@ -74,12 +121,61 @@ class FAISSStore:
             self._create_new_index()
             return False
     
-    def _create_new_index(self):
-        """Create a new empty FAISS index."""
+    def _read_index(self) -> Optional[Union["faiss.Index", BinaryFlatIndex]]:
+        """
+        Read the saved index, converting one saved with the other INDEX_TYPE.
+        
+        Returns:
+            The index, or None if none is saved
+        """
+        # faiss is imported where used so importing this module stays cheap
+        import faiss
+        
+        if self.binary and self.binary_index_file.exists():
+            logger.info(f"Loading binary FAISS index from {self.binary_index_file}")
+            return BinaryFlatIndex.load(
+                self.dimension, self.vectors_file, self.binary_index_file, settings.BINARY_SHORTLIST
+            )
+        if not self.binary and self.index_file.exists():
+            logger.info(f"Loading FAISS index from {self.index_file}")
+            return faiss.read_index(str(self.index_file))
+        
+        if self.binary and self.index_file.exists():
+            source = faiss.read_index(str(self.index_file))
+        elif not self.binary and self.binary_index_file.exists():
+            source = BinaryFlatIndex.load(self.dimension, self.vectors_file, self.binary_index_file)
+        else:
+            return None
+        
+        logger.info(f"Converting saved index ({source.ntotal} vectors) to INDEX_TYPE={settings.INDEX_TYPE}")
+        index = self._new_index()
+        batch_size = 65536
+        for start in range(0, source.ntotal, batch_size):
+            index.add(source.reconstruct_n(start, min(batch_size, source.ntotal - start)))
+        return index
+    
+    def _new_index(self) -> Union["faiss.Index", BinaryFlatIndex]:
+        """Empty index of the configured INDEX_TYPE."""
+        import faiss
+        
+        if self.binary:
+            return BinaryFlatIndex(self.dimension, self.vectors_file, settings.BINARY_SHORTLIST)
         # Using IndexFlatIP for inner product (cosine similarity with normalized vectors)
         # For better performance with large datasets, consider IndexIVFFlat
-        self.index = faiss.IndexFlatIP(self.dimension)
+        return faiss.IndexFlatIP(self.dimension)
+    
+    def _create_new_index(self):
+        """Create a new empty FAISS index."""
+        self.index = self._new_index()
         self.metadata = []
+        self._postings = {}
+        self._minhash = None
+        self._document_chunks = Counter()
+        self.sentences = SentenceStore(self.sentences_file, self.dimension, mmap=self.binary)
+        # A fitted projection stays valid for the vectors added back later
+        self.reduced_index = None
+        if self.projection is not None:
+            self.reduced_index = self.projection.build_index(np.empty((0, self.dimension)))
         logger.info(f"Created new FAISS index with dimension {self.dimension}")
     
     def save_index(self) -> bool:
@@ -89,21 +185,36 @@ class FAISSStore:
         Returns:
             True if saved successfully, False otherwise
         """
+        import faiss
+        
         try:
             with self._lock:
                 # Ensure directory exists
                 self.index_path.mkdir(parents=True, exist_ok=True)
                 
-                # Save FAISS index
-                faiss.write_index(self.index, str(self.index_file))
+                # Save FAISS index (and drop one saved with the other INDEX_TYPE)
+                if self.binary:
+                    self.index.save(self.binary_index_file)
+                    self.index_file.unlink(missing_ok=True)
+                else:
+                    faiss.write_index(self.index, str(self.index_file))
+                    self.binary_index_file.unlink(missing_ok=True)
+                    self.vectors_file.unlink(missing_ok=True)
                 
                 # Save metadata
                 with open(self.metadata_file, "w", encoding="utf-8") as f:
                     json.dump(self.metadata, f, ensure_ascii=False, indent=2)
                 
+                # Save sentence embeddings
+                self.sentences.save()
+                
+                # Save the projection next to the index
+                if self.projection is not None:
+                    self.projection.save(self.projection_file)
+                
                 logger.info(
                     f"Saved FAISS index with {self.index.ntotal} vectors "
-                    f"to {self.index_file}"
+                    f"to {self.binary_index_file if self.binary else self.index_file}"
                 )
                 return True
                 
@@ -114,7 +225,9 @@ class FAISSStore:
     def add_embeddings(
         self, 
         embeddings: np.ndarray, 
-        metadata_list: List[Dict[str, Any]]
+        metadata_list: List[Dict[str, Any]],
+        sentence_spans: Optional[List[List[Tuple[int, int]]]] = None,
+        sentence_embeddings: Optional[np.ndarray] = None
     ) -> int:
         """
         Add embeddings and their metadata to the index.
@@ -122,6 +235,8 @@ class FAISSStore:
         Args:
             embeddings: numpy array of shape (n, dimension)
             metadata_list: List of metadata dicts for each embedding
+            sentence_spans: Optional sentence (start, end) offsets for each chunk
+            sentence_embeddings: Embeddings of all those sentences, flattened
             
         Returns:
             Number of embeddings added
@@ -138,6 +253,8 @@ class FAISSStore:
                 f"index dimension ({self.dimension})"
             )
         
+        import faiss
+        
         with self._lock:
             # Normalize embeddings for cosine similarity
             faiss.normalize_L2(embeddings)
@@ -147,26 +264,228 @@ class FAISSStore:
             
             # Add metadata
             self.metadata.extend(metadata_list)
+            self._postings = {}
+            self._document_chunks.update(m.get("document_name") for m in metadata_list)
+            
+            # Add sentence data (chunks without it fall back to full text)
+            if sentence_spans is not None:
+                self.sentences.append(sentence_spans, sentence_embeddings)
+            else:
+                self.sentences.pad_to(self.index.ntotal)
+            
+            if self.reduced_index is not None:
+                self.reduced_index.add(self.projection.apply(embeddings))
+            elif settings.PROJECTION_DIM > 0 and not self.binary:
+                self._fit_projection()
+            
+            if self._minhash is not None:
+                first_id = self.index.ntotal - len(metadata_list)
+                for i, meta in enumerate(metadata_list):
+                    self._minhash.add(first_id + i, self._minhash.signature(meta.get("text", "")))
             
             logger.info(f"Added {len(embeddings)} embeddings to FAISS index")
             
             return len(embeddings)
     
+    def find_duplicates(
+        self,
+        texts: List[str],
+        document_name: Optional[str] = None
+    ) -> List[Optional[int]]:
+        """
+        Find chunks that near-duplicate a stored chunk or an earlier text
+        of the same batch (MinHash/LSH at DEDUP_THRESHOLD).
+        
+        A duplicate of an earlier text in the batch is reported with the id
+        that text will get when the non-duplicate texts are appended to the
+        index in order, so the result must be used before other additions.
+        
+        Args:
+            texts: Chunk texts about to be indexed, in order
+            document_name: Document of the texts; unused here, a sharded
+                store routes the texts by it
+            
+        Returns:
+            For each text, the vector id it duplicates, or None if it is new
+        """
+        with self._lock:
+            minhash = self._get_minhash()
+            batch = MinHashLSH(
+                threshold=settings.DEDUP_THRESHOLD,
+                num_perm=settings.DEDUP_NUM_PERM,
+                bands=settings.DEDUP_BANDS
+            )
+            next_id = self.index.ntotal
+            duplicate_of: List[Optional[int]] = []
+            for text in texts:
+                signature = minhash.signature(text)
+                match = minhash.query(signature) or batch.query(signature)
+                if match is not None:
+                    duplicate_of.append(match[0])
+                else:
+                    batch.add(next_id, signature)
+                    duplicate_of.append(None)
+                    next_id += 1
+            return duplicate_of
+    
+    def add_references(self, references: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """
+        Record further sources of already stored chunks.
+        
+        The chunk keeps one vector; each source is appended to its
+        "duplicates" list, so filters and citations still see every document.
+        
+        Args:
+            references: (vector id, {"document_name", "chunk_index"}) pairs
+            
+        Returns:
+            Number of references added
+        """
+        added = 0
+        with self._lock:
+            for vector_id, source in references:
+                if not 0 <= vector_id < len(self.metadata):
+                    raise ValueError(f"No stored chunk with id {vector_id}")
+                entry = self.metadata[vector_id]
+                known = [entry] + entry.get("duplicates", [])
+                if any(
+                    k.get("document_name") == source["document_name"]
+                    and k.get("chunk_index") == source["chunk_index"]
+                    for k in known
+                ):
+                    continue  # Same chunk of a re-uploaded document
+                entry.setdefault("duplicates", []).append(dict(source))
+                self._document_chunks[source["document_name"]] += 1
+                added += 1
+            self._postings = {}
+        return added
+    
+    def _load_projection(self) -> None:
+        """Load (or fit) the projection for the loaded index, per PROJECTION_DIM."""
+        self.projection = self.reduced_index = None
+        if settings.PROJECTION_DIM <= 0 or self.binary:
+            return
+        if self.projection_file.exists():
+            self.projection = Projection.load(self.projection_file)
+            if self.projection.d_out != settings.PROJECTION_DIM:
+                self.projection = None
+        if self.projection is None:
+            self._fit_projection()
+        else:
+            self.reduced_index = self.projection.build_index(
+                self.index.reconstruct_n(0, self.index.ntotal)
+            )
+            logger.info(
+                f"Loaded {self.projection.method.upper()} projection "
+                f"{self.dimension} -> {self.projection.d_out} dims"
+            )
+    
+    def _fit_projection(self) -> bool:
+        """
+        Fit the projection on the stored vectors and build the reduced index.
+        Must be called with the lock held (or before the store is shared).
+        
+        Returns:
+            True if fitted, False while there are too few vectors
+        """
+        if self.index.ntotal < settings.PROJECTION_MIN_TRAIN:
+            return False
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        self.projection = Projection.fit(vectors, settings.PROJECTION_DIM, settings.PROJECTION_METHOD)
+        self.reduced_index = self.projection.build_index(vectors)
+        logger.info(
+            f"Fitted {self.projection.method.upper()} projection on {len(vectors)} vectors: "
+            f"{self.dimension} -> {self.projection.d_out} dims"
+        )
+        return True
+    
+    def _track_projection_recall(
+        self,
+        query_embedding: np.ndarray,
+        indices: np.ndarray,
+        top_k: int,
+        min_score: Optional[float],
+        params: Optional["faiss.SearchParameters"]
+    ) -> None:
+        """
+        Every PROJECTION_RECALL_SAMPLE-th query, compare the projected results
+        with exact full-dimension search and record recall@k.
+        Must be called with the lock held.
+        """
+        stats = self._projection_stats
+        stats["queries"] += 1
+        every = settings.PROJECTION_RECALL_SAMPLE
+        if every <= 0 or stats["queries"] % every:
+            return
+        k = min(top_k, self.index.ntotal)
+        scores, exact = self.index.search(query_embedding, k, params=params)
+        exact = exact[0][(exact[0] >= 0) & (scores[0] >= (min_score if min_score is not None else -np.inf))]
+        if len(exact) == 0:
+            return
+        stats["sampled"] += 1
+        stats["recall_sum"] += len(set(exact.tolist()) & set(indices.tolist())) / len(exact)
+    
+    def get_projection_stats(self) -> Optional[Dict[str, Any]]:
+        """Projection settings and sampled recall@k against full-dimension search."""
+        if self.projection is None:
+            return None
+        stats = self._projection_stats
+        return {
+            "method": self.projection.method,
+            "dimension": self.projection.d_out,
+            "full_dimension": self.dimension,
+            "rescore": settings.PROJECTION_RESCORE,
+            "shortlist": settings.PROJECTION_SHORTLIST,
+            "queries": stats["queries"],
+            "sampled_queries": stats["sampled"],
+            "recall": round(stats["recall_sum"] / stats["sampled"], 4) if stats["sampled"] else None
+        }
+    
+    def _get_minhash(self) -> MinHashLSH:
+        """Get (building from stored texts if needed) the LSH index. Lock must be held."""
+        if self._minhash is None:
+            self._minhash = MinHashLSH(
+                threshold=settings.DEDUP_THRESHOLD,
+                num_perm=settings.DEDUP_NUM_PERM,
+                bands=settings.DEDUP_BANDS
+            )
+            for i, meta in enumerate(self.metadata):
+                self._minhash.add(i, self._minhash.signature(meta.get("text", "")))
+        return self._minhash
+    
+    def _count_document_chunks(self) -> Counter:
+        """Chunks per document, counting chunks stored once for several documents."""
+        counts = Counter(m.get("document_name") for m in self.metadata)
+        counts.update(d["document_name"] for m in self.metadata for d in m.get("duplicates", []))
+        return counts
+    
     def search(
         self, 
         query_embedding: np.ndarray, 
-        top_k: int = 5
+        top_k: int = 5,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        min_score: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar vectors in the index.
         
+        Metadata filters are pushed into FAISS as an ID selector, so the
+        index only scores vectors that satisfy them and a filtered query
+        still returns up to top_k hits. A min_score threshold is answered
+        with a range search instead of over-fetching and dropping.
+        
         Args:
             query_embedding: Query vector of shape (1, dimension) or (dimension,)
             top_k: Number of results to return
+            filters: Metadata equality filters, e.g. {"document_name": "a.pdf"}.
+                A list value matches any of its entries.
+            min_score: Minimum cosine similarity for a result to be returned
             
         Returns:
             List of results with metadata and similarity scores
         """
+        import faiss
+        
         if self.index is None or self.index.ntotal == 0:
             logger.warning("FAISS index is empty, no results to return")
             return []
@@ -174,24 +493,72 @@ class FAISSStore:
         # Reshape if needed
         if query_embedding.ndim == 1:
             query_embedding = query_embedding.reshape(1, -1)
+        query_embedding = np.ascontiguousarray(query_embedding, dtype=np.float32)
         
         # Normalize query for cosine similarity
         faiss.normalize_L2(query_embedding)
         
-        # Adjust top_k if we have fewer vectors
-        actual_k = min(top_k, self.index.ntotal)
-        
         with self._lock:
-            # Search
-            distances, indices = self.index.search(query_embedding, actual_k)
+            # Resolve filters to the set of allowed vector ids
+            allowed_ids = self._resolve_filter_ids(filters)
+            if allowed_ids is not None and len(allowed_ids) == 0:
+                logger.debug(f"No vectors match filters: {filters}")
+                return []
+            
+            params = None
+            if allowed_ids is not None:
+                selector = faiss.IDSelectorBatch(
+                    len(allowed_ids), faiss.swig_ptr(allowed_ids)
+                )
+                params = faiss.SearchParameters(sel=selector)
+            
+            candidates = self.index.ntotal if allowed_ids is None else len(allowed_ids)
+            
+            if self.reduced_index is not None:
+                # Projected first stage, shortlist re-scored at full dimension
+                distances, indices = shortlist_search(
+                    self.reduced_index,
+                    self.projection,
+                    query_embedding,
+                    top_k,
+                    shortlist=settings.PROJECTION_SHORTLIST,
+                    full_vectors=self.index.reconstruct_batch if settings.PROJECTION_RESCORE else None,
+                    min_score=min_score,
+                    params=params
+                )
+                self._track_projection_recall(query_embedding, indices, top_k, min_score, params)
+            elif self.binary:
+                # Hamming shortlist, already re-scored with the float vectors
+                distances, indices = self.index.search(
+                    query_embedding, min(top_k, candidates), params=params
+                )
+                distances, indices = distances[0], indices[0]
+                if min_score is not None:
+                    above = distances >= min_score
+                    distances, indices = distances[above], indices[above]
+            elif min_score is not None:
+                # Range search returns every vector above the threshold
+                lims, distances, indices = self.index.range_search(
+                    query_embedding, float(min_score), params=params
+                )
+                order = np.argsort(-distances[lims[0]:lims[1]])[:top_k]
+                distances = distances[lims[0]:lims[1]][order]
+                indices = indices[lims[0]:lims[1]][order]
+            else:
+                # Adjust top_k if we have fewer vectors
+                actual_k = min(top_k, candidates)
+                distances, indices = self.index.search(
+                    query_embedding, actual_k, params=params
+                )
+                distances, indices = distances[0], indices[0]
         
         results = []
-        for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
+        for dist, idx in zip(distances, indices):
             if idx == -1:  # FAISS returns -1 for empty slots
                 continue
                 
             result = {
-                "rank": i + 1,
+                "rank": len(results) + 1,
                 "similarity_score": float(dist),
                 "index": int(idx),
                 **self.metadata[idx]
@@ -201,6 +568,61 @@ class FAISSStore:
         logger.debug(f"Search returned {len(results)} results")
         return results
     
+    def _resolve_filter_ids(
+        self, 
+        filters: Optional[Dict[str, FilterValue]]
+    ) -> Optional[np.ndarray]:
+        """
+        Translate metadata filters into a sorted array of matching vector ids.
+        Must be called with the lock held.
+        
+        Args:
+            filters: Metadata equality filters (AND across fields, OR within a list)
+            
+        Returns:
+            Array of matching ids, or None if no filtering is needed
+        """
+        if not filters:
+            return None
+        
+        allowed: Optional[np.ndarray] = None
+        for field, value in filters.items():
+            if field not in FILTERABLE_FIELDS:
+                raise ValueError(
+                    f"Unsupported filter field: {field}. "
+                    f"Supported fields: {', '.join(FILTERABLE_FIELDS)}"
+                )
+            
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            postings = self._get_postings(field)
+            matches = [postings[str(v)] for v in values if str(v) in postings]
+            field_ids = (
+                np.unique(np.concatenate(matches)) if matches
+                else np.empty(0, dtype=np.int64)
+            )
+            
+            allowed = field_ids if allowed is None else np.intersect1d(
+                allowed, field_ids, assume_unique=True
+            )
+        
+        return allowed
+    
+    def _get_postings(self, field: str) -> Dict[str, np.ndarray]:
+        """Get (building if needed) the value -> ids inverted list for a field."""
+        if field not in self._postings:
+            buckets: Dict[str, List[int]] = {}
+            for i, meta in enumerate(self.metadata):
+                # A deduplicated chunk matches the filters of all its sources
+                values = {str(meta.get(field))}
+                values.update(str(d.get(field)) for d in meta.get("duplicates", []))
+                for value in values:
+                    buckets.setdefault(value, []).append(i)
+            self._postings[field] = {
+                value: np.asarray(ids, dtype=np.int64)
+                for value, ids in buckets.items()
+            }
+        return self._postings[field]
+    
     def delete_document(self, document_name: str) -> int:
         """
         Delete all chunks belonging to a specific document.
@@ -213,31 +635,57 @@ class FAISSStore:
             Number of chunks deleted
         """
         with self._lock:
+            # Chunks shared with other documents stay, with the next source
+            # promoted to primary
+            deleted_count = 0
+            for meta in self.metadata:
+                duplicates = meta.get("duplicates", [])
+                kept = [d for d in duplicates if d.get("document_name") != document_name]
+                deleted_count += len(duplicates) - len(kept)
+                if meta.get("document_name") == document_name and kept:
+                    meta.update(kept.pop(0))
+                    deleted_count += 1
+                if kept:
+                    meta["duplicates"] = kept
+                else:
+                    meta.pop("duplicates", None)
+            
             # Find indices to keep
             keep_indices = [
                 i for i, meta in enumerate(self.metadata)
                 if meta.get("document_name") != document_name
             ]
             
-            deleted_count = len(self.metadata) - len(keep_indices)
+            deleted_count += len(self.metadata) - len(keep_indices)
             
             if deleted_count == 0:
                 logger.info(f"No chunks found for document: {document_name}")
                 return 0
             
-            # Reconstruct vectors for remaining indices
-            if keep_indices:
+            if len(keep_indices) == len(self.metadata):
+                # Only references were dropped; the vectors are unchanged
+                self._postings = {}
+                self._document_chunks = self._count_document_chunks()
+            elif keep_indices:
+                # Reconstruct vectors for remaining indices
                 remaining_vectors = np.vstack([
                     self.index.reconstruct(i) for i in keep_indices
                 ])
                 remaining_metadata = [self.metadata[i] for i in keep_indices]
+                self.sentences.keep(keep_indices)
+                remaining_sentences = self.sentences
                 
                 # Create new index
                 self._create_new_index()
                 
                 # Add remaining vectors back
                 self.index.add(remaining_vectors)
+                if self.reduced_index is not None:
+                    self.reduced_index.add(self.projection.apply(remaining_vectors))
                 self.metadata = remaining_metadata
+                self.sentences = remaining_sentences
+                self._postings = {}
+                self._document_chunks = self._count_document_chunks()
             else:
                 # All vectors deleted, create empty index
                 self._create_new_index()
@@ -247,19 +695,33 @@ class FAISSStore:
     
     def get_document_count(self) -> int:
         """Get the number of unique documents in the index."""
-        documents = set(meta.get("document_name") for meta in self.metadata)
-        return len(documents)
+        return len(self._document_chunks)
     
     def get_total_chunks(self) -> int:
         """Get the total number of chunks in the index."""
         return self.index.ntotal if self.index else 0
     
+    def memory_bytes(self) -> int:
+        """Approximate memory held by vectors (index, projection and sentences)."""
+        if self.index is None:
+            return 0
+        if self.binary:
+            total = self.index.memory_bytes()
+        else:
+            total = self.index.ntotal * self.dimension * 4
+        if self.reduced_index is not None:
+            total += self.reduced_index.ntotal * self.reduced_index.d * 4
+        return total + self.sentences.memory_bytes()
+    
     def get_all_documents(self) -> List[str]:
         """Get list of all indexed document names."""
-        return list(set(meta.get("document_name") for meta in self.metadata))
+        return list(self._document_chunks)
     
     def clear(self):
         """Clear the entire index."""
         with self._lock:
+            self.projection = None
             self._create_new_index()
+            if self.projection_file.exists():
+                self.projection_file.unlink()
             logger.info("FAISS index cleared")
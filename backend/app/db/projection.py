@@ -0,0 +1,184 @@
+"""
+Learned linear projection for a cheaper first-stage vector search.
+A PCA (or OPQ rotation) fitted on the stored embeddings maps them to fewer
+dimensions; a shortlist found in the projected space can be re-scored with
+the full vectors.
+"""
+
+import logging
+from pathlib import Path
+from typing import Callable, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_METHODS = ("pca", "opq")
+
+# 39 points per centroid for the 256 centroids of each OPQ sub-quantizer
+OPQ_MIN_TRAIN = 39 * 256
+
+
+class Projection:
+    """
+    A trained FAISS VectorTransform. Outputs are L2-normalized so inner
+    product in the projected space is still cosine similarity.
+    """
+
+    def __init__(self, transform: "faiss.VectorTransform", method: str):
+        """
+        Initialize from a trained transform.
+
+        Args:
+            transform: Trained FAISS VectorTransform
+            method: "pca" or "opq"
+        """
+        self.transform = transform
+        self.method = method
+
+    @property
+    def d_in(self) -> int:
+        return self.transform.d_in
+
+    @property
+    def d_out(self) -> int:
+        return self.transform.d_out
+
+    @classmethod
+    def fit(
+        cls,
+        vectors: np.ndarray,
+        dim: int,
+        method: str = "pca",
+        max_train: int = 100_000,
+        seed: int = 0
+    ) -> "Projection":
+        """
+        Fit a projection on (a sample of) the given vectors.
+
+        Args:
+            vectors: Training vectors of shape (n, d)
+            dim: Output dimension, below d
+            method: "pca", or "opq" (falls back to PCA with too few vectors)
+            max_train: Largest number of vectors used for training
+            seed: Seed of the training sample
+
+        Returns:
+            The trained projection
+        """
+        import faiss
+
+        d = vectors.shape[1]
+        if not 0 < dim < d:
+            raise ValueError(f"Projection dimension must be between 1 and {d - 1}, got {dim}")
+        if method == "pca":
+            transform = faiss.PCAMatrix(d, dim)
+        elif method == "opq":
+            if min(len(vectors), max_train) < OPQ_MIN_TRAIN:
+                logger.warning(
+                    f"OPQ needs {OPQ_MIN_TRAIN} training vectors, got {len(vectors)}; using PCA"
+                )
+                return cls.fit(vectors, dim, "pca", max_train, seed)
+            # Rotation learned for product quantization into M sub-spaces
+            subspaces = next((m for m in (16, 8, 4, 2) if dim % m == 0), 1)
+            transform = faiss.OPQMatrix(d, subspaces, dim)
+            transform.niter, transform.niter_pq = 10, 4
+            transform.verbose = False
+        else:
+            raise ValueError(
+                f"Unknown projection method: {method}. "
+                f"Supported methods: {', '.join(PROJECTION_METHODS)}"
+            )
+
+        sample = vectors
+        if len(vectors) > max_train:
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(len(vectors), max_train, replace=False)]
+        transform.train(np.ascontiguousarray(sample, dtype=np.float32))
+        return cls(transform, method)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project and L2-normalize vectors of shape (n, d_in) or (d_in,)."""
+        import faiss
+
+        projected = self.transform.apply_py(
+            np.ascontiguousarray(vectors.reshape(-1, self.d_in), dtype=np.float32)
+        )
+        faiss.normalize_L2(projected)
+        return projected
+
+    def build_index(self, vectors: np.ndarray) -> "faiss.Index":
+        """Flat inner-product index over the projected vectors (same ids)."""
+        import faiss
+
+        index = faiss.IndexFlatIP(self.d_out)
+        if len(vectors):
+            index.add(self.apply(vectors))
+        return index
+
+    def save(self, path: Path) -> None:
+        """Write the transform to disk."""
+        import faiss
+
+        faiss.write_VectorTransform(self.transform, str(path))
+
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        """Read a transform written by save()."""
+        import faiss
+
+        transform = faiss.read_VectorTransform(str(path))
+        # OPQ is stored as its plain linear map
+        method = "pca" if isinstance(transform, faiss.PCAMatrix) else "opq"
+        return cls(transform, method)
+
+
+def shortlist_search(
+    reduced_index: "faiss.Index",
+    projection: Projection,
+    query_embedding: np.ndarray,
+    top_k: int,
+    shortlist: int = 4,
+    full_vectors: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    min_score: Optional[float] = None,
+    params: Optional["faiss.SearchParameters"] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search the projected index for shortlist * top_k candidates and keep the
+    best top_k.
+
+    Args:
+        reduced_index: Index over the projected vectors
+        projection: The projection of that index
+        query_embedding: Normalized full-dimension query of shape (1, d_in)
+        top_k: Number of results to return
+        shortlist: Candidates fetched per result
+        full_vectors: Maps ids to full-dimension vectors; when given, the
+            candidates are re-scored at full dimension
+        min_score: Minimum (re-scored) similarity of a result
+        params: FAISS search parameters (e.g. an ID selector for filters)
+
+    Returns:
+        (scores, ids) of the results, best first
+    """
+    k = min(max(top_k * shortlist, top_k), reduced_index.ntotal)
+    if k <= 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    scores, ids = reduced_index.search(projection.apply(query_embedding), k, params=params)
+    scores, ids = scores[0], ids[0]
+    valid = ids >= 0
+    scores, ids = scores[valid], ids[valid]
+
+    if full_vectors is not None and len(ids):
+        scores = full_vectors(ids) @ query_embedding.reshape(-1)
+
+    order = np.argsort(-scores)
+    scores, ids = scores[order], ids[order]
+    if min_score is not None:
+        above = scores >= min_score
+        scores, ids = scores[above], ids[above]
+    return scores[:top_k], ids[:top_k]
@@ -0,0 +1,393 @@
+"""
+Sentence-level embedding store for extractive context compression.
+Keeps float16 sentence embeddings for every indexed chunk in a CSR layout,
+aligned with the FAISS vector ids.
+"""
+
+import logging
+import os
+import re
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends (followed by whitespace) and line breaks are split points
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+# (start_char, end_char, is_top_scoring) for a selected sentence
+SelectedSentence = Tuple[int, int, bool]
+
+
+def split_sentences(text: str, min_chars: int = 40) -> List[Tuple[int, int]]:
+    """
+    Split text into sentence spans.
+    Fragments shorter than min_chars (clause numbers, headings) are merged
+    into the following sentence.
+
+    Args:
+        text: Text to split
+        min_chars: Minimum sentence length before merging
+
+    Returns:
+        List of (start, end) character offsets into text
+    """
+    raw_spans = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        raw_spans.append((start, match.start()))
+        start = match.end()
+    raw_spans.append((start, len(text)))
+
+    spans: List[Tuple[int, int]] = []
+    for start, end in raw_spans:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end <= start:
+            continue
+        if spans and spans[-1][1] - spans[-1][0] < min_chars:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+
+    return spans
+
+
+def build_excerpt(text: str, selected: List[SelectedSentence]) -> Tuple[str, List[List[int]]]:
+    """
+    Build an excerpt from selected sentences of a chunk.
+    Non-contiguous sentence groups are joined with an ellipsis.
+
+    Args:
+        text: Full chunk text
+        selected: Selected sentences in document order
+
+    Returns:
+        Tuple of (excerpt, highlights) where highlights are [start, end]
+        offsets of the top-scoring sentences within the excerpt
+    """
+    parts: List[str] = []
+    highlights: List[List[int]] = []
+    length = 0
+    previous_end = None
+
+    for start, end, is_top in selected:
+        if previous_end is not None:
+            separator = " " if text[previous_end:start].strip() == "" else " ... "
+            parts.append(separator)
+            length += len(separator)
+        sentence = text[start:end]
+        if is_top:
+            highlights.append([length, length + len(sentence)])
+        parts.append(sentence)
+        length += len(sentence)
+        previous_end = end
+
+    return "".join(parts), highlights
+
+
+class SentenceStore:
+    """
+    Stores sentence spans and embeddings per chunk.
+    Chunk i owns sentence rows offsets[i]:offsets[i + 1].
+
+    With mmap=True (INDEX_TYPE=binary) the embeddings and spans are saved to
+    raw files next to the .npz and memory-mapped, like the binary index's
+    float vectors; only the offsets and rows added since the last save are
+    held in memory.
+    """
+
+    def __init__(self, path: Path, dimension: int, mmap: bool = False):
+        """
+        Initialize an empty sentence store.
+
+        Args:
+            path: File the store is persisted to (.npz)
+            dimension: Embedding dimension
+            mmap: Keep saved embeddings and spans on disk, memory-mapped
+        """
+        self.path = path
+        self.dimension = dimension
+        self.mmap = mmap
+        # mmap=True: float16 embeddings and int32 (start, end) spans, row by row
+        self.embeddings_file = path.with_suffix(".f16")
+        self.spans_file = path.with_suffix(".spans.i32")
+        self.clear()
+
+    def clear(self):
+        """Remove all sentences."""
+        self.embeddings = np.zeros((0, self.dimension), dtype=np.float16)
+        self.spans = np.zeros((0, 2), dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        # mmap=True: rows [0, len(spans)) are on disk, the rest pending
+        self._pending_embeddings: List[np.ndarray] = []
+        self._pending_spans: List[np.ndarray] = []
+        # A new (or reset) store replaces the files on its first save
+        self._rewrite = True
+
+    @property
+    def num_chunks(self) -> int:
+        """Number of chunks covered by the store."""
+        return len(self.offsets) - 1
+
+    @property
+    def num_sentences(self) -> int:
+        """Total number of stored sentences."""
+        return int(self.offsets[-1])
+
+    def append(
+        self,
+        spans_per_chunk: List[List[Tuple[int, int]]],
+        embeddings: Optional[np.ndarray]
+    ):
+        """
+        Append sentences for a batch of new chunks.
+
+        Args:
+            spans_per_chunk: Sentence spans for each new chunk, in vector id order
+            embeddings: Embeddings for all sentences, flattened in the same order
+        """
+        counts = np.array([len(spans) for spans in spans_per_chunk], dtype=np.int64)
+        total = int(counts.sum())
+
+        if total:
+            if embeddings is None or len(embeddings) != total:
+                raise ValueError(
+                    f"Sentence embedding count ({0 if embeddings is None else len(embeddings)}) "
+                    f"doesn't match sentence count ({total})"
+                )
+            flat_spans = np.asarray(
+                [span for spans in spans_per_chunk for span in spans], dtype=np.int32
+            )
+            if self.mmap:
+                self._pending_spans.append(flat_spans)
+                self._pending_embeddings.append(embeddings.astype(np.float16))
+            else:
+                self.spans = np.vstack([self.spans, flat_spans])
+                self.embeddings = np.vstack([self.embeddings, embeddings.astype(np.float16)])
+
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(counts)])
+
+    def pad_to(self, num_chunks: int):
+        """Add chunks without sentence data until the store covers num_chunks."""
+        missing = num_chunks - self.num_chunks
+        if missing > 0:
+            self.append([[] for _ in range(missing)], None)
+
+    def take(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embeddings and spans of the given sentence rows.
+
+        Args:
+            rows: Sentence row numbers
+
+        Returns:
+            Tuple of (float16 embeddings, int32 spans), in memory
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self._pending_spans:
+            return np.asarray(self.embeddings[rows]), np.asarray(self.spans[rows])
+
+        embeddings = np.empty((len(rows), self.dimension), dtype=np.float16)
+        spans = np.empty((len(rows), 2), dtype=np.int32)
+        on_disk = rows < len(self.spans)
+        embeddings[on_disk] = self.embeddings[rows[on_disk]]
+        spans[on_disk] = self.spans[rows[on_disk]]
+        pending = rows[~on_disk] - len(self.spans)
+        embeddings[~on_disk] = np.vstack(self._pending_embeddings)[pending]
+        spans[~on_disk] = np.vstack(self._pending_spans)[pending]
+        return embeddings, spans
+
+    def keep(self, chunk_ids: List[int]):
+        """Keep only the given chunks (in the given order), e.g. after a delete."""
+        rows = [np.arange(self.offsets[i], self.offsets[i + 1]) for i in chunk_ids]
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        counts = np.diff(self.offsets)[chunk_ids] if chunk_ids else np.empty(0, dtype=np.int64)
+
+        embeddings, spans = self.take(rows)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        if self.mmap:
+            # Written out in full on the next save
+            self.embeddings = np.zeros((0, self.dimension), dtype=np.float16)
+            self.spans = np.zeros((0, 2), dtype=np.int32)
+            self._pending_embeddings, self._pending_spans = [embeddings], [spans]
+            self._rewrite = True
+        else:
+            self.embeddings, self.spans = embeddings, spans
+
+    def save(self):
+        """Persist the store next to the FAISS index."""
+        if not self.mmap:
+            np.savez(
+                self.path,
+                embeddings=self.embeddings,
+                spans=self.spans,
+                offsets=self.offsets
+            )
+            # Drop files saved with mmap=True
+            self.embeddings_file.unlink(missing_ok=True)
+            self.spans_file.unlink(missing_ok=True)
+            return
+
+        for file, pending in (
+            (self.embeddings_file, self._pending_embeddings),
+            (self.spans_file, self._pending_spans)
+        ):
+            if self._rewrite:
+                # Replace the file atomically so a failed save keeps the old one
+                tmp = file.with_suffix(file.suffix + ".tmp")
+                with open(tmp, "wb") as f:
+                    for rows in pending:
+                        f.write(rows.tobytes())
+                os.replace(tmp, file)
+            elif pending:
+                with open(file, "ab") as f:
+                    for rows in pending:
+                        f.write(rows.tobytes())
+        np.savez(self.path, offsets=self.offsets)
+        self._map(self.num_sentences)
+
+    def load(self, expected_chunks: int) -> bool:
+        """
+        Load the store from disk, converting one saved with the other mmap
+        setting.
+
+        Args:
+            expected_chunks: Number of vectors in the FAISS index
+
+        Returns:
+            True if sentence data was loaded, False if missing or stale
+        """
+        self.clear()
+        if not self.path.exists():
+            self.pad_to(expected_chunks)
+            return False
+
+        with np.load(self.path) as data:
+            offsets = data["offsets"]
+            if len(offsets) - 1 != expected_chunks:
+                logger.warning(
+                    f"Sentence store covers {len(offsets) - 1} chunks but index has "
+                    f"{expected_chunks}, ignoring it"
+                )
+                self.pad_to(expected_chunks)
+                return False
+            # Saved with mmap=False when the arrays are in the .npz
+            embeddings = data["embeddings"] if "embeddings" in data.files else None
+            spans = data["spans"] if "spans" in data.files else None
+
+        rows = int(offsets[-1])
+        if embeddings is None and rows and self._file_rows() < rows:
+            logger.warning(
+                f"Sentence files hold {self._file_rows()} rows but the store "
+                f"{rows}, ignoring them"
+            )
+            self.pad_to(expected_chunks)
+            return False
+
+        self.offsets = offsets
+        if embeddings is not None and self.mmap:
+            # Written to the files on the next save
+            self._pending_embeddings, self._pending_spans = [embeddings], [spans]
+        elif embeddings is not None:
+            self.embeddings, self.spans = embeddings, spans
+        elif self.mmap:
+            # Rows past the offsets are left over from an interrupted save
+            os.truncate(self.embeddings_file, rows * 2 * self.dimension)
+            os.truncate(self.spans_file, rows * 8)
+            self._map(rows)
+        else:
+            self.embeddings = np.fromfile(
+                self.embeddings_file, dtype=np.float16, count=rows * self.dimension
+            ).reshape(rows, self.dimension)
+            self.spans = np.fromfile(self.spans_file, dtype=np.int32, count=rows * 2).reshape(rows, 2)
+
+        logger.info(f"Loaded {self.num_sentences} sentence embeddings")
+        return True
+
+    def _file_rows(self) -> int:
+        if not (self.embeddings_file.exists() and self.spans_file.exists()):
+            return 0
+        return min(
+            self.embeddings_file.stat().st_size // (2 * self.dimension),
+            self.spans_file.stat().st_size // 8
+        )
+
+    def _map(self, rows: int):
+        self._pending_embeddings, self._pending_spans = [], []
+        self._rewrite = False
+        if rows:
+            self.embeddings = np.memmap(
+                self.embeddings_file, dtype=np.float16, mode="r", shape=(rows, self.dimension)
+            )
+            self.spans = np.memmap(self.spans_file, dtype=np.int32, mode="r", shape=(rows, 2))
+        else:
+            self.embeddings = np.zeros((0, self.dimension), dtype=np.float16)
+            self.spans = np.zeros((0, 2), dtype=np.int32)
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory: offsets plus rows that are not memory-mapped."""
+        total = self.offsets.nbytes + sum(
+            rows.nbytes for rows in self._pending_embeddings + self._pending_spans
+        )
+        if not self.mmap:
+            total += self.embeddings.nbytes + self.spans.nbytes
+        return total
+
+    def select(
+        self,
+        chunk_ids: List[int],
+        query_embedding: np.ndarray,
+        top_n: int = 3,
+        neighbours: int = 1
+    ) -> List[Optional[List[SelectedSentence]]]:
+        """
+        Select the most query-relevant sentences of each chunk.
+        All candidate sentences are scored with a single matrix product.
+
+        Args:
+            chunk_ids: Vector ids of the retrieved chunks
+            query_embedding: Normalized query embedding
+            top_n: Top-scoring sentences to keep per chunk
+            neighbours: Sentences kept on each side of a top sentence
+
+        Returns:
+            Per chunk, the selected sentences in document order, or None if
+            the chunk has no sentence data
+        """
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        starts = self.offsets[chunk_ids]
+        counts = self.offsets[np.asarray(chunk_ids) + 1] - starts
+
+        rows = np.concatenate(
+            [np.arange(s, s + c) for s, c in zip(starts, counts)]
+        ) if len(chunk_ids) else np.empty(0, dtype=np.int64)
+        embeddings, spans = self.take(rows)
+        scores = embeddings.astype(np.float32) @ query
+
+        selections: List[Optional[List[SelectedSentence]]] = []
+        position = 0
+        for count in counts:
+            count = int(count)
+            if count == 0:
+                selections.append(None)
+                continue
+
+            chunk_scores = scores[position:position + count]
+            chunk_spans = spans[position:position + count]
+            position += count
+
+            top = set(np.argsort(-chunk_scores)[:top_n].tolist())
+            keep = set()
+            for i in top:
+                keep.update(range(max(0, i - neighbours), min(count, i + neighbours + 1)))
+
+            selections.append([
+                (int(chunk_spans[i][0]), int(chunk_spans[i][1]), i in top)
+                for i in sorted(keep)
+            ])
+
+        return selections
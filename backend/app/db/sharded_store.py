@@ -0,0 +1,610 @@
+"""
+Scatter-gather search over shard servers (app/shard_server.py).
+Chunks are split across N shards by document or by chunk hash; every shard
+is a separate process (or node) holding its part of each collection. Queries
+are fanned out in parallel and the per-shard top-k lists are merged with a
+heap; a shard that fails or misses the deadline is left out of the result.
+
+ShardedStore and ShardedCollections have the interface of FAISSStore and
+CollectionManager that RAGService uses, so the pipeline is unchanged.
+Vector ids are global: local id * number of shards + shard number.
+"""
+
+import base64
+import heapq
+import logging
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import PARTIAL_SEARCHES, SHARD_FAILURES
+from app.db.collection_manager import (
+    CollectionNotFoundError,
+    DEFAULT_COLLECTION,
+    validate_collection_name
+)
+from app.db.sentence_store import SelectedSentence
+
+logger = logging.getLogger(__name__)
+
+SHARD_KEYS = ("document", "chunk")
+
+
+class ShardUnavailableError(RuntimeError):
+    """Raised when no shard answers a read, or a shard fails a write."""
+
+
+def encode_array(array: np.ndarray) -> Dict[str, Any]:
+    """Float32 array as a JSON-safe dict (base64 of the raw bytes)."""
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return {"shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def decode_array(payload: Dict[str, Any]) -> np.ndarray:
+    """Inverse of encode_array."""
+    data = base64.b64decode(payload["data"])
+    return np.frombuffer(data, dtype=np.float32).reshape(payload["shape"]).copy()
+
+
+def shard_for(document_name: str, text: str, num_shards: int, key: str = "document") -> int:
+    """
+    Shard that owns a chunk.
+
+    Args:
+        document_name: Document of the chunk
+        text: Chunk text
+        num_shards: Number of shards
+        key: "document" (all chunks of a document on one shard) or "chunk"
+
+    Returns:
+        Shard number
+    """
+    value = document_name if key == "document" else text
+    return zlib.crc32(value.encode("utf-8")) % num_shards
+
+
+class _ShardCall:
+    """Outcome of one fan-out: responses by shard, and the shards that failed."""
+
+    def __init__(self):
+        self.responses: Dict[int, Any] = {}
+        self.failed: Dict[int, str] = {}
+
+
+class _CachedStats:
+    """
+    Last result of a stats fan-out. Once older than the TTL it is refreshed
+    in the background, so /health and /metrics never wait on a slow shard;
+    only the first read (at startup) fetches inline.
+    """
+
+    def __init__(self, fetch: Callable[[], Any], executor: ThreadPoolExecutor, ttl_s: float):
+        self._fetch = fetch
+        self._executor = executor
+        self.ttl_s = ttl_s
+        self._value: Any = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = Lock()
+
+    def get(self) -> Any:
+        with self._lock:
+            value = self._value
+            stale = time.monotonic() - self._fetched_at > self.ttl_s
+            if value is not None and stale and not self._refreshing:
+                self._refreshing = True
+                self._executor.submit(self._refresh)
+        if value is None:
+            value = self._refresh()
+        return value
+
+    def refresh(self) -> Any:
+        """Fetch now, e.g. after a write (which already runs off the event loop)."""
+        return self._refresh()
+
+    def _refresh(self) -> Any:
+        try:
+            value = self._fetch()
+            with self._lock:
+                self._value, self._fetched_at = value, time.monotonic()
+            return value
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+class ShardedCollections:
+    """
+    Coordinator for a set of shard servers; hands out a ShardedStore per
+    collection. Stands in for CollectionManager.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        shard_by: Optional[str] = None,
+        timeout_ms: Optional[int] = None,
+        write_timeout_s: Optional[float] = None
+    ):
+        """
+        Initialize the coordinator.
+
+        Args:
+            urls: Base URLs of the shard servers; their order defines the
+                shard numbers, so it must not change once data is indexed
+            shard_by: "document" or "chunk" (default: SHARD_BY)
+            timeout_ms: Deadline of a read fan-out (default: SHARD_TIMEOUT_MS)
+            write_timeout_s: Timeout of writes (default: SHARD_WRITE_TIMEOUT_S)
+        """
+        import httpx
+
+        self.shard_by = shard_by or settings.SHARD_BY
+        if self.shard_by not in SHARD_KEYS:
+            raise ValueError(
+                f"Unknown shard key: {self.shard_by}. Supported keys: {', '.join(SHARD_KEYS)}"
+            )
+        if not urls:
+            raise ValueError("Sharded mode needs at least one shard URL")
+
+        self.urls = [url.rstrip("/") for url in urls]
+        self.timeout_s = (timeout_ms or settings.SHARD_TIMEOUT_MS) / 1000
+        self.write_timeout_s = write_timeout_s or settings.SHARD_WRITE_TIMEOUT_S
+
+        # One worker and one connection per shard for each of up to
+        # SHARD_MAX_CONCURRENCY fan-outs in flight, so requests don't queue
+        workers = settings.SHARD_MAX_CONCURRENCY * len(self.urls)
+        self._client = httpx.Client(
+            limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+        )
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+        # Background stats refreshes, apart from the fan-out pool they use
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shard-stats")
+        self.stats_ttl_s = settings.SHARD_STATS_TTL_S
+        self._stores: Dict[str, "ShardedStore"] = {}
+        self._lock = Lock()
+        self._stats = {"searches": 0, "partial_searches": 0, "failures": 0}
+        self._shard_stats = _CachedStats(self._fetch_shard_stats, self._refresher, self.stats_ttl_s)
+
+        logger.info(f"Sharded mode: {len(self.urls)} shards, split by {self.shard_by}")
+        # Fetch the counters served by /health and /metrics before they are asked for
+        self._shard_stats.get()
+        self.get(DEFAULT_COLLECTION).get_total_chunks()
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.urls)
+
+    def get(self, name: str = DEFAULT_COLLECTION, create: bool = False) -> "ShardedStore":
+        """
+        Store of a collection. Shards create collections on first write, so
+        a missing collection is only reported when it is searched.
+
+        Args:
+            name: Collection name
+            create: Accepted for CollectionManager compatibility
+
+        Returns:
+            The collection's sharded store
+        """
+        validate_collection_name(name)
+        with self._lock:
+            if name not in self._stores:
+                self._stores[name] = ShardedStore(self, name)
+            return self._stores[name]
+
+    @contextmanager
+    def use(self, name: str = DEFAULT_COLLECTION, create: bool = False) -> Iterator["ShardedStore"]:
+        """Same as get(); shard servers keep their own collections loaded."""
+        yield self.get(name, create)
+
+    def list_collections(self) -> List[str]:
+        """Names of the collections on any reachable shard."""
+        call = self.scatter("GET", "/collections", {shard: None for shard in range(self.num_shards)})
+        names = {DEFAULT_COLLECTION}
+        for response in call.responses.values():
+            names.update(response["collections"])
+        return sorted(names)
+
+    def scatter(
+        self,
+        method: str,
+        path: str,
+        payloads: Dict[int, Optional[Dict[str, Any]]],
+        write: bool = False
+    ) -> _ShardCall:
+        """
+        Send one request per shard in parallel and gather the answers.
+
+        Reads share one deadline (SHARD_TIMEOUT_MS), counted from when the
+        first request is sent rather than submitted to the pool; shards that
+        fail or miss it are reported in the result's `failed`. Writes wait for
+        every shard and raise if one fails.
+
+        Args:
+            method: "GET" or "POST"
+            path: Shard API path
+            payloads: JSON body (or GET params) per shard number
+            write: Whether this is a write
+
+        Returns:
+            Responses and failures by shard number
+        """
+        timeout = self.write_timeout_s if write else self.timeout_s
+        sent = Event()
+
+        def send(shard: int, payload: Optional[Dict[str, Any]]) -> Any:
+            sent.set()
+            return self._request(shard, method, path, payload, timeout)
+
+        futures = {
+            self._pool.submit(send, shard, payload): shard
+            for shard, payload in payloads.items()
+        }
+        # Time spent queued behind other fan-outs doesn't count; every request
+        # is itself bounded by the HTTP timeout, so a worker frees up in time
+        if futures:
+            sent.wait()
+        done, pending = wait(futures, timeout=timeout)
+
+        call = _ShardCall()
+        for future in done:
+            shard = futures[future]
+            try:
+                call.responses[shard] = future.result()
+            except Exception as e:
+                call.failed[shard] = type(e).__name__
+        for future in pending:
+            future.cancel()
+            call.failed[futures[future]] = "deadline"
+
+        with self._lock:
+            self._stats["failures"] += len(call.failed)
+        for shard, reason in call.failed.items():
+            SHARD_FAILURES.inc(shard=str(shard), reason=reason)
+            logger.warning(f"Shard {shard} ({self.urls[shard]}) {path}: {reason}")
+        if write and call.failed:
+            raise ShardUnavailableError(
+                f"Shards {sorted(call.failed)} failed to {path.strip('/')}: {call.failed}"
+            )
+        return call
+
+    def _request(
+        self,
+        shard: int,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]],
+        timeout: float
+    ) -> Any:
+        url = self.urls[shard] + path
+        if method == "GET":
+            response = self._client.get(url, params=payload, timeout=timeout)
+        else:
+            response = self._client.post(url, json=payload, timeout=timeout)
+        if response.status_code == 404:
+            # The shard holds no part of this collection
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def record_search(self, partial: bool):
+        with self._lock:
+            self._stats["searches"] += 1
+            if partial:
+                self._stats["partial_searches"] += 1
+        if partial:
+            PARTIAL_SEARCHES.inc()
+
+    def _fetch_shard_stats(self) -> Dict[int, Any]:
+        call = self.scatter("GET", "/stats", {shard: None for shard in range(self.num_shards)})
+        return call.responses
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Shard health (cached for SHARD_STATS_TTL_S) and fan-out counters."""
+        responses = self._shard_stats.get()
+        with self._lock:
+            counters = dict(self._stats)
+            loaded = {name: None for name in self._stores}
+        return {
+            "shard_by": self.shard_by,
+            "shards": [
+                {"url": url, "up": shard in responses, **(responses.get(shard) or {})}
+                for shard, url in enumerate(self.urls)
+            ],
+            "loaded": loaded,
+            **counters
+        }
+
+    def close(self):
+        self._refresher.shutdown(wait=False, cancel_futures=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._client.close()
+
+
+class _ShardedSentences:
+    """Sentence selection on the shards that hold the chunks."""
+
+    def __init__(self, store: "ShardedStore"):
+        self._store = store
+
+    def select(
+        self,
+        chunk_ids: List[int],
+        query_embedding: np.ndarray,
+        top_n: int = 3,
+        neighbours: int = 1
+    ) -> List[Optional[List[SelectedSentence]]]:
+        """Same as SentenceStore.select; chunks of a failed shard get None."""
+        store = self._store
+        by_shard: Dict[int, List[Tuple[int, int]]] = {}
+        for position, chunk_id in enumerate(chunk_ids):
+            shard, local_id = store.split_id(chunk_id)
+            by_shard.setdefault(shard, []).append((position, local_id))
+
+        query = encode_array(np.asarray(query_embedding).reshape(1, -1))
+        call = store.coordinator.scatter("POST", "/sentences", {
+            shard: {
+                "collection": store.name,
+                "chunk_ids": [local_id for _, local_id in items],
+                "embedding": query,
+                "top_n": top_n,
+                "neighbours": neighbours
+            }
+            for shard, items in by_shard.items()
+        })
+
+        selections: List[Optional[List[SelectedSentence]]] = [None] * len(chunk_ids)
+        for shard, response in call.responses.items():
+            if response is None:
+                continue
+            for (position, _), selected in zip(by_shard[shard], response["selections"]):
+                selections[position] = [tuple(s) for s in selected] if selected else None
+        return selections
+
+
+class ShardedStore:
+    """
+    One collection split across the shard servers. Stands in for FAISSStore.
+    """
+
+    def __init__(self, coordinator: ShardedCollections, name: str):
+        """
+        Initialize the store.
+
+        Args:
+            coordinator: Coordinator of the shard servers
+            name: Collection name
+        """
+        self.coordinator = coordinator
+        self.name = name
+        self.sentences = _ShardedSentences(self)
+        # Shards written since the last save
+        self._dirty: set = set()
+        self._stats = _CachedStats(
+            self._collection_stats, coordinator._refresher, coordinator.stats_ttl_s
+        )
+
+    def global_id(self, shard: int, local_id: int) -> int:
+        return local_id * self.coordinator.num_shards + shard
+
+    def split_id(self, vector_id: int) -> Tuple[int, int]:
+        """(shard, local id) of a global vector id."""
+        local_id, shard = divmod(int(vector_id), self.coordinator.num_shards)
+        return shard, local_id
+
+    def _route(self, document_name: Optional[str], text: str) -> int:
+        return shard_for(
+            document_name or "", text, self.coordinator.num_shards, self.coordinator.shard_by
+        )
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        min_score: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search every shard and merge their top-k lists.
+
+        Args:
+            query_embedding: Query vector of shape (1, dimension) or (dimension,)
+            top_k: Number of results to return
+            filters: Metadata equality filters, applied on each shard
+            min_score: Minimum cosine similarity for a result to be returned
+
+        Returns:
+            The best top_k results over the shards that answered in time
+        """
+        coordinator = self.coordinator
+        payload = {
+            "collection": self.name,
+            "embedding": encode_array(np.asarray(query_embedding).reshape(1, -1)),
+            "top_k": top_k,
+            "filters": filters,
+            "min_score": min_score
+        }
+        call = coordinator.scatter(
+            "POST", "/search", {shard: payload for shard in range(coordinator.num_shards)}
+        )
+        if not call.responses:
+            raise ShardUnavailableError(
+                f"No shard answered within {coordinator.timeout_s * 1000:.0f} ms"
+            )
+        if all(response is None for response in call.responses.values()) and not call.failed:
+            with coordinator._lock:
+                coordinator._stores.pop(self.name, None)
+            raise CollectionNotFoundError(f"Collection not found: {self.name}")
+        coordinator.record_search(partial=bool(call.failed))
+
+        # Each shard returns its hits best first; merge them lazily
+        per_shard = []
+        for shard, response in call.responses.items():
+            hits = response["results"] if response else []
+            for hit in hits:
+                hit["index"] = self.global_id(shard, hit["index"])
+                hit["shard"] = shard
+            per_shard.append(hits)
+        results = list(islice(
+            heapq.merge(*per_shard, key=lambda hit: -hit["similarity_score"]), top_k
+        ))
+        for rank, result in enumerate(results, 1):
+            result["rank"] = rank
+        return results
+
+    def find_duplicates(
+        self,
+        texts: List[str],
+        document_name: Optional[str] = None
+    ) -> List[Optional[int]]:
+        """
+        FAISSStore.find_duplicates on the shard of each text. Near-duplicates
+        are only found on the same shard.
+
+        Args:
+            texts: Chunk texts about to be indexed, in order
+            document_name: Document of the texts (routes them with SHARD_BY=document)
+
+        Returns:
+            For each text, the global vector id it duplicates, or None
+        """
+        by_shard: Dict[int, List[int]] = {}
+        for position, text in enumerate(texts):
+            by_shard.setdefault(self._route(document_name, text), []).append(position)
+
+        call = self.coordinator.scatter("POST", "/duplicates", {
+            shard: {"collection": self.name, "texts": [texts[i] for i in positions]}
+            for shard, positions in by_shard.items()
+        }, write=True)
+
+        duplicate_of: List[Optional[int]] = [None] * len(texts)
+        for shard, positions in by_shard.items():
+            for position, local_id in zip(positions, call.responses[shard]["duplicates"]):
+                if local_id is not None:
+                    duplicate_of[position] = self.global_id(shard, local_id)
+        return duplicate_of
+
+    def add_embeddings(
+        self,
+        embeddings: np.ndarray,
+        metadata_list: List[Dict[str, Any]],
+        sentence_spans: Optional[List[List[Tuple[int, int]]]] = None,
+        sentence_embeddings: Optional[np.ndarray] = None
+    ) -> int:
+        """FAISSStore.add_embeddings, each chunk on its shard."""
+        if len(embeddings) != len(metadata_list):
+            raise ValueError(
+                f"Embeddings count ({len(embeddings)}) doesn't match "
+                f"metadata count ({len(metadata_list)})"
+            )
+
+        by_shard: Dict[int, List[int]] = {}
+        for position, meta in enumerate(metadata_list):
+            shard = self._route(meta.get("document_name"), meta.get("text", ""))
+            by_shard.setdefault(shard, []).append(position)
+
+        # Sentence embeddings are flattened over the chunks
+        offsets = None
+        if sentence_spans is not None:
+            offsets = np.concatenate([[0], np.cumsum([len(spans) for spans in sentence_spans])])
+
+        payloads = {}
+        for shard, positions in by_shard.items():
+            payload = {
+                "collection": self.name,
+                "embeddings": encode_array(embeddings[positions]),
+                "metadata": [metadata_list[i] for i in positions]
+            }
+            if offsets is not None:
+                payload["sentence_spans"] = [sentence_spans[i] for i in positions]
+                rows = np.concatenate(
+                    [np.arange(offsets[i], offsets[i + 1]) for i in positions]
+                ).astype(np.int64)
+                payload["sentence_embeddings"] = encode_array(
+                    sentence_embeddings[rows].reshape(len(rows), -1)
+                )
+            payloads[shard] = payload
+
+        call = self.coordinator.scatter("POST", "/add", payloads, write=True)
+        self._dirty.update(by_shard)
+        return sum(response["added"] for response in call.responses.values())
+
+    def add_references(self, references: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """FAISSStore.add_references on the shard of each referenced chunk."""
+        by_shard: Dict[int, List[Tuple[int, Dict[str, Any]]]] = {}
+        for vector_id, source in references:
+            shard, local_id = self.split_id(vector_id)
+            by_shard.setdefault(shard, []).append((local_id, source))
+
+        call = self.coordinator.scatter("POST", "/references", {
+            shard: {"collection": self.name, "references": items}
+            for shard, items in by_shard.items()
+        }, write=True)
+        self._dirty.update(by_shard)
+        return sum(response["added"] for response in call.responses.values())
+
+    def save_index(self) -> bool:
+        """Save the collection on every shard written since the last save."""
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return True
+        try:
+            self.coordinator.scatter(
+                "POST", "/save", {shard: {"collection": self.name} for shard in dirty}, write=True
+            )
+            self._stats.refresh()
+            return True
+        except ShardUnavailableError as e:
+            logger.error(f"Failed to save collection '{self.name}': {e}")
+            self._dirty.update(dirty)
+            return False
+
+    def delete_document(self, document_name: str) -> int:
+        """Delete a document's chunks and references on every shard."""
+        call = self.coordinator.scatter("POST", "/delete", {
+            shard: {"collection": self.name, "document_name": document_name}
+            for shard in range(self.coordinator.num_shards)
+        }, write=True)
+        deleted = {
+            shard: response["deleted"]
+            for shard, response in call.responses.items()
+            if response and response["deleted"]
+        }
+        self._dirty.update(deleted)
+        self._stats.refresh()
+        return sum(deleted.values())
+
+    def _collection_stats(self) -> List[Dict[str, Any]]:
+        call = self.coordinator.scatter("GET", "/stats", {
+            shard: {"collection": self.name} for shard in range(self.coordinator.num_shards)
+        })
+        return [response for response in call.responses.values() if response]
+
+    def get_total_chunks(self) -> int:
+        """Chunks over the reachable shards (cached for SHARD_STATS_TTL_S)."""
+        return sum(stats["total_chunks"] for stats in self._stats.get())
+
+    def get_all_documents(self) -> List[str]:
+        """Documents over the reachable shards (cached for SHARD_STATS_TTL_S)."""
+        documents = {}
+        for stats in self._stats.get():
+            documents.update(dict.fromkeys(stats["documents"]))
+        return list(documents)
+
+    def get_document_count(self) -> int:
+        return len(self.get_all_documents())
+
+    def get_projection_stats(self) -> Optional[Dict[str, Any]]:
+        """Projections are per shard and not aggregated."""
+        return None
+
+    def memory_bytes(self) -> int:
+        """Vectors live in the shard processes."""
+        return 0
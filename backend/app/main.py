@@ -3,12 +3,17 @@ FastAPI application entry point.
 Configures the app, middleware, and routes.
 """
 
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.core.config import settings
+from app.core.config import settings, ensure_directories
+from app.core.metrics import observe_request, route_template
+from app.core.readiness import readiness, NotReadyError
 from app.routes import upload_router, ask_router, health_router
 
 # Configure logging
@@ -20,31 +25,84 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _warm_up():
+    """
+    Load models and the index, then run a warm-up query.
+    Runs in a worker thread so the server can answer /livez meanwhile.
+    Each component is tracked in the readiness registry.
+    """
+    from app.services.embedding_service import EmbeddingService
+    from app.services.llm_service import LLMService
+    from app.services.rag_service import RAGService
+    from app.services.rerank_service import RerankService
+    
+    with readiness.loading("embedding"):
+        EmbeddingService()
+    
+    with readiness.loading("index") as state:
+        rag_service = RAGService()
+        state.details["total_chunks"] = rag_service.faiss_store.get_total_chunks()
+        state.details["total_documents"] = rag_service.faiss_store.get_document_count()
+    
+    # Retrieval is usable from here on; time one query end to end
+    start = time.perf_counter()
+    query_embedding = rag_service.embedding_service.embed_query(settings.WARMUP_QUERY)
+    rag_service.faiss_store.search(query_embedding, settings.TOP_K_RESULTS)
+    readiness.record_warmup("search", (time.perf_counter() - start) * 1000)
+    
+    if settings.RERANK_ENABLED:
+        with readiness.loading("rerank"):
+            RerankService().model
+    
+    with readiness.loading("llm") as state:
+        llm_service = LLMService()
+        state.details["backend"] = llm_service.get_stats()["backend"]
+    if not llm_service.is_loaded():
+        # LLM_MOCK_FALLBACK swapped in the mock backend: serve, but fail /readyz
+        readiness.mark_degraded("llm", llm_service.get_stats()["load_error"])
+    
+    start = time.perf_counter()
+    llm_service.generate_answer(
+        llm_service.build_rag_prompt(settings.WARMUP_QUERY, []),
+        max_tokens=8
+    )
+    readiness.record_warmup("generate", (time.perf_counter() - start) * 1000)
+    
+    logger.info(f"Warm-up complete: {readiness.snapshot()['warmup_ms']}")
+
+
+async def _run_warm_up():
+    """Run the warm-up off the event loop and log (not raise) failures."""
+    try:
+        await asyncio.to_thread(_warm_up)
+    except Exception as e:
+        logger.error(f"Warm-up stopped: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Application lifespan manager.
     Handles startup and shutdown events.
+    Models and the index load in the background; /readyz reports progress.
     """
     # Startup
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info(f"Data directory: {settings.DATA_DIR}")
+    ensure_directories()
     
-    # Pre-load services (optional - comment out for faster startup)
-    # This ensures models are loaded before first request
-    try:
-        from app.services.rag_service import RAGService
-        rag_service = RAGService()
-        stats = rag_service.get_index_stats()
-        logger.info(f"FAISS index loaded: {stats['total_chunks']} chunks from {stats['total_documents']} documents")
-    except Exception as e:
-        logger.warning(f"Failed to pre-load services: {e}")
+    components = ["embedding", "index", "llm"]
+    if settings.RERANK_ENABLED:
+        components.append("rerank")
+    readiness.register(*components)
+    warm_up_task = asyncio.create_task(_run_warm_up())
     
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    warm_up_task.cancel()
 
 
 # Create FastAPI app
@@ -81,8 +139,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count every request and record its latency per route."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        observe_request(
+            request.method,
+            route_template(request.scope),
+            status,
+            time.perf_counter() - start
+        )
+
+
+@app.exception_handler(NotReadyError)
+async def not_ready_handler(request: Request, exc: NotReadyError):
+    """Answer 503 while the components a route needs are still loading."""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": "Service warming up", "detail": str(exc)},
+        headers={"Retry-After": "5"}
+    )
+
+
 # Include routers
-app.include_router(health_router)  # Includes /, /health, /stats
+app.include_router(health_router)  # Includes /, /livez, /readyz, /health, /stats, /metrics
 app.include_router(upload_router)  # /upload
 app.include_router(ask_router)     # /ask
 
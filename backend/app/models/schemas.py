@@ -4,7 +4,7 @@ These models ensure type safety and automatic documentation in FastAPI.
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 
@@ -14,7 +14,16 @@ class SourceChunk(BaseModel):
     text: str = Field(..., description="The actual text content of the chunk")
     document_name: str = Field(..., description="Name of the source document")
     chunk_index: int = Field(..., description="Index of this chunk in the document")
+    collection: str = Field("default", description="Collection the document belongs to")
     similarity_score: float = Field(..., description="Similarity score from vector search")
+    highlights: List[List[int]] = Field(
+        default_factory=list,
+        description="[start, end] offsets in text of the sentences most relevant to the question"
+    )
+    also_in: List[str] = Field(
+        default_factory=list,
+        description="Other documents containing this chunk (near-duplicates are stored once)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -22,7 +31,8 @@ class SourceChunk(BaseModel):
                 "text": "The Constitution of Nepal guarantees fundamental rights...",
                 "document_name": "Constitution-of-Nepal-2072.pdf",
                 "chunk_index": 15,
-                "similarity_score": 0.89
+                "similarity_score": 0.89,
+                "highlights": [[0, 58]]
             }
         }
 
@@ -33,8 +43,16 @@ class UploadResponse(BaseModel):
     success: bool = Field(..., description="Whether the upload was successful")
     message: str = Field(..., description="Status message")
     document_name: str = Field(..., description="Name of the uploaded document")
+    collection: str = Field("default", description="Collection the document was added to")
     total_chunks: int = Field(..., description="Number of chunks created from the document")
+    duplicate_chunks: int = Field(
+        0, description="Chunks already in the index, stored as references instead of new vectors"
+    )
     processing_time: float = Field(..., description="Time taken to process in seconds")
+    timings: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Per-stage durations in ms (parse, chunk, embed, index, save), only with debug=true"
+    )
     
     class Config:
         json_schema_extra = {
@@ -63,12 +81,38 @@ class AskRequest(BaseModel):
         le=20,
         description="Number of relevant chunks to retrieve"
     )
+    filters: Optional[Dict[str, Union[str, List[str]]]] = Field(
+        default=None,
+        description=(
+            "Metadata filters applied inside the vector search, "
+            "e.g. {\"document_name\": [\"a.pdf\", \"b.pdf\"]}"
+        )
+    )
+    min_score: Optional[float] = Field(
+        default=None,
+        ge=-1.0,
+        le=1.0,
+        description="Minimum similarity score for a chunk to be used"
+    )
+    rerank: Optional[bool] = Field(
+        default=None,
+        description="Rerank retrieved chunks with a cross-encoder (default: server setting)"
+    )
+    collection: Union[str, List[str]] = Field(
+        default="default",
+        description="Collection to search, or a list of collections whose results are merged"
+    )
+    debug: bool = Field(
+        default=False,
+        description="Include the per-stage timing breakdown in the response"
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "question": "What are the fundamental rights in Nepal's constitution?",
-                "top_k": 5
+                "top_k": 5,
+                "filters": {"document_name": "Constitution-of-Nepal-2072.pdf"}
             }
         }
 
@@ -83,6 +127,10 @@ class AskResponse(BaseModel):
     )
     question: str = Field(..., description="The original question asked")
     processing_time: float = Field(..., description="Total processing time in seconds")
+    timings: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Per-stage durations in ms (embed, search, rerank, compress, pack, generate), only with debug=true"
+    )
     
     class Config:
         json_schema_extra = {
@@ -4,8 +4,14 @@ Handles user questions, retrieves relevant context, and generates answers.
 """
 
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 
+from app.core.metrics import observe_stages
+from app.core.readiness import readiness
+from app.core.timing import StageTimer
+from app.db.collection_manager import CollectionNotFoundError, DEFAULT_COLLECTION
+from app.db.sharded_store import ShardUnavailableError
 from app.models.schemas import AskRequest, AskResponse, ErrorResponse
 from app.services.rag_service import RAGService
 
@@ -15,7 +21,8 @@ router = APIRouter(prefix="/ask", tags=["Question Answering"])
 
 
 def get_rag_service() -> RAGService:
-    """Dependency injection for RAG service."""
+    """Dependency injection for the shared RAG service (503 until retrieval is loaded)."""
+    readiness.require("embedding", "index")
     return RAGService()
 
 
@@ -45,6 +52,7 @@ def get_rag_service() -> RAGService:
 )
 async def ask_question(
     request: AskRequest,
+    response: Response,
     rag_service: RAGService = Depends(get_rag_service)
 ):
     """
@@ -52,25 +60,44 @@ async def ask_question(
     
     - **question**: Your question about Nepali laws/documents
     - **top_k**: Number of relevant chunks to use (default: 5)
+    - **filters**: Optional metadata filters, e.g. `{"document_name": "a.pdf"}`
+    - **min_score**: Optional minimum similarity score
+    - **rerank**: Rerank candidates with a cross-encoder before generation
+    - **collection**: Collection to search, or a list of collections to search together
+    - **debug**: Include the per-stage timing breakdown
     
     Returns the answer along with source chunks used for context.
     """
+    readiness.require("llm")
+    timer = StageTimer()
     try:
         logger.info(f"Received question: {request.question[:100]}...")
         
         # Call RAG service
         result = await rag_service.search_and_answer(
             question=request.question,
-            top_k=request.top_k
+            top_k=request.top_k,
+            filters=request.filters,
+            min_score=request.min_score,
+            rerank=request.rerank,
+            timer=timer,
+            collection=request.collection
         )
+        response.headers["Server-Timing"] = timer.server_timing()
+        observe_stages("ask", timer)
         
         return AskResponse(
             answer=result["answer"],
             sources=result["sources"],
             question=result["question"],
-            processing_time=result["processing_time"]
+            processing_time=result["processing_time"],
+            timings=timer.as_dict() if request.debug else None
         )
         
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         logger.error(f"Validation error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -89,7 +116,18 @@ async def ask_question(
 )
 async def search_only(
     question: str,
+    response: Response,
     top_k: int = 5,
+    document_name: Optional[List[str]] = Query(
+        None, description="Only search chunks from these documents"
+    ),
+    min_score: Optional[float] = Query(
+        None, ge=-1.0, le=1.0, description="Minimum similarity score"
+    ),
+    collection: List[str] = Query(
+        [DEFAULT_COLLECTION], description="Collections to search (repeatable; results are merged)"
+    ),
+    debug: bool = Query(False, description="Include the per-stage timing breakdown"),
     rag_service: RAGService = Depends(get_rag_service)
 ):
     """
@@ -98,26 +136,60 @@ async def search_only(
     
     - **question**: Search query
     - **top_k**: Number of results to return
+    - **document_name**: Restrict the search to these documents (repeatable)
+    - **min_score**: Minimum similarity score
+    - **collection**: Collections to search (repeatable)
+    - **debug**: Include the per-stage timing breakdown
     """
+    timer = StageTimer()
     try:
         # Get embedding and search
-        query_embedding = rag_service.embedding_service.embed_query(question)
-        results = rag_service.faiss_store.search(query_embedding, top_k)
+        with timer.stage("embed"):
+            query_embedding = await rag_service.run_blocking(
+                rag_service.embedding_service.embed_query, question
+            )
+        filters = {"document_name": document_name} if document_name else None
+        with timer.stage("search"):
+            results = await rag_service.run_blocking(
+                rag_service.search_collections,
+                collection,
+                query_embedding,
+                top_k,
+                filters=filters,
+                min_score=min_score
+            )
+        response.headers["Server-Timing"] = timer.server_timing()
+        observe_stages("search", timer)
         
-        return {
+        result = {
             "query": question,
             "results": [
                 {
                     "text": r["text"],
                     "document_name": r["document_name"],
                     "chunk_index": r["chunk_index"],
-                    "similarity_score": round(r["similarity_score"], 4)
+                    "collection": r["collection"],
+                    "similarity_score": round(r["similarity_score"], 4),
+                    "also_in": list(dict.fromkeys(
+                        d["document_name"] for d in r.get("duplicates", [])
+                        if d["document_name"] != r["document_name"]
+                    ))
                 }
                 for r in results
             ],
             "total_results": len(results)
         }
+        if debug:
+            result["timings"] = timer.as_dict()
+        return result
         
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        logger.error(f"Validation error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Search error: {e}")
         raise HTTPException(
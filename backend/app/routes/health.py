@@ -6,8 +6,11 @@ Provides system status, index statistics, and health monitoring.
 import logging
 from datetime import datetime
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
+from app.core.metrics import metrics, CONTENT_TYPE
+from app.core.readiness import readiness, DEGRADED
 from app.models.schemas import HealthResponse
 from app.services.rag_service import RAGService
 
@@ -17,36 +20,87 @@ router = APIRouter(tags=["Health & Status"])
 
 
 def get_rag_service() -> RAGService:
-    """Dependency injection for RAG service."""
+    """Dependency injection for the shared RAG service (503 until the index is loaded)."""
+    readiness.require("embedding", "index")
     return RAGService()
 
 
+@router.get(
+    "/livez",
+    summary="Liveness probe",
+    description="Cheap check that the process is up and serving requests"
+)
+async def liveness():
+    """Return immediately; never touches models or the index."""
+    return {"status": "alive"}
+
+
+@router.get(
+    "/readyz",
+    summary="Readiness probe",
+    description="Per-component load state and warm-up query latency (503 until ready)"
+)
+async def readiness_check():
+    """
+    Get the load state of every component.
+    
+    Returns:
+    - Overall readiness (HTTP 200 when ready, 503 otherwise)
+    - Status, load time and error of each component
+    - Latency of the warm-up search and generation
+    """
+    snapshot = readiness.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    description="Request counts, per-stage latency histograms, cache hits, LLM tokens and index size"
+)
+async def prometheus_metrics():
+    """
+    Export metrics in the Prometheus text format.
+    Stage histograms cover the ask, search and upload pipelines.
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
     summary="Health check",
     description="Check if the API is running and get basic status"
 )
-async def health_check(
-    rag_service: RAGService = Depends(get_rag_service)
-):
+async def health_check():
     """
     Get the health status of the API.
+    Uses the index's precomputed counters and never waits for loading.
     
     Returns:
-    - Service status
+    - Service status ("starting" while components are loading,
+      "degraded" while one runs on a fallback)
     - API version
     - FAISS index status
     - Number of indexed documents
     """
-    stats = rag_service.get_index_stats()
+    index_ready = readiness.is_ready("index")
+    faiss_store = RAGService().faiss_store if index_ready else None
+    components = readiness.snapshot()["components"].values()
+    if readiness.is_ready():
+        status = "healthy"
+    elif any(c["status"] == DEGRADED for c in components):
+        status = "degraded"
+    else:
+        status = "starting"
     
     return HealthResponse(
-        status="healthy",
+        status=status,
         timestamp=datetime.utcnow(),
         version=settings.APP_VERSION,
-        index_loaded=stats["total_chunks"] > 0,
-        total_documents=stats["total_documents"]
+        index_loaded=index_ready and faiss_store.get_total_chunks() > 0,
+        total_documents=faiss_store.get_document_count() if index_ready else 0
     )
 
 
@@ -66,9 +120,10 @@ async def get_stats(
     - Total chunks in index
     - List of document names
     - Embedding dimension
-    - LLM status
+    - LLM status (backend, load time, memory, tokens/sec)
+    - Projection recall, and loaded collections
     """
-    stats = rag_service.get_index_stats()
+    stats = await rag_service.run_blocking(rag_service.get_index_stats)
     
     return {
         "status": "ok",
@@ -77,14 +132,22 @@ async def get_stats(
             "total_chunks": stats["total_chunks"],
             "documents": stats["documents"],
             "embedding_dimension": stats["embedding_dimension"],
-            "llm_loaded": stats["llm_loaded"]
+            "llm_loaded": stats["llm_loaded"],
+            "llm": stats["llm"],
+            "rerank": stats["rerank"],
+            "index_type": stats["index_type"],
+            "projection": stats["projection"],
+            "collections": stats["collections"]
         },
         "config": {
             "chunk_size": settings.CHUNK_SIZE,
             "chunk_overlap": settings.CHUNK_OVERLAP,
             "top_k_default": settings.TOP_K_RESULTS,
             "embedding_model": settings.EMBEDDING_MODEL,
-            "llm_model": settings.LLM_MODEL
+            "llm_model": settings.LLM_MODEL,
+            "llm_backend": settings.LLM_BACKEND,
+            "rerank_enabled": settings.RERANK_ENABLED,
+            "rerank_model": settings.RERANK_MODEL
         }
     }
 
@@ -101,5 +164,7 @@ async def root():
         "version": settings.APP_VERSION,
         "description": "RAG-based legal document Q&A API for Nepali laws",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "readiness": "/readyz",
+        "metrics": "/metrics"
     }
@@ -4,9 +4,14 @@ Handles file upload, validation, and triggers document processing.
 """
 
 import logging
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
 
+from app.core.metrics import observe_stages
+from app.core.readiness import readiness
+from app.core.timing import StageTimer
+from app.db.collection_manager import CollectionNotFoundError, DEFAULT_COLLECTION
+from app.db.sharded_store import ShardUnavailableError
 from app.models.schemas import UploadResponse, ErrorResponse
 from app.services.rag_service import RAGService
 
@@ -16,7 +21,8 @@ router = APIRouter(prefix="/upload", tags=["Document Upload"])
 
 # Dependency to get RAG service instance
 def get_rag_service() -> RAGService:
-    """Dependency injection for RAG service."""
+    """Dependency injection for the shared RAG service (503 until retrieval is loaded)."""
+    readiness.require("embedding", "index")
     return RAGService()
 
 
@@ -44,12 +50,18 @@ def get_rag_service() -> RAGService:
 )
 async def upload_document(
     file: UploadFile = File(..., description="PDF file to upload"),
+    collection: str = Query(
+        DEFAULT_COLLECTION, description="Collection to add the document to (created if needed)"
+    ),
+    debug: bool = Query(False, description="Include the per-stage timing breakdown"),
     rag_service: RAGService = Depends(get_rag_service)
 ):
     """
     Upload and process a PDF document for RAG indexing.
     
     - **file**: PDF file to upload and process
+    - **collection**: Collection to add the document to; each collection has its own index
+    - **debug**: Include the per-stage timing breakdown
     
     Returns processing results including number of chunks created.
     """
@@ -94,12 +106,18 @@ async def upload_document(
         logger.info(f"Processing upload: {file.filename} ({len(content)} bytes)")
         
         # Process the document
-        result = await rag_service.process_document(content, file.filename)
+        timer = StageTimer()
+        result = await rag_service.process_document(
+            content, file.filename, timer=timer, collection=collection
+        )
+        observe_stages("upload", timer)
         
-        return UploadResponse(**result)
+        return UploadResponse(**result, timings=timer.as_dict() if debug else None)
         
     except HTTPException:
         raise
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         logger.error(f"Validation error processing {file.filename}: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -120,15 +138,19 @@ async def upload_document(
 )
 async def delete_document(
     document_name: str,
+    collection: str = Query(DEFAULT_COLLECTION, description="Collection holding the document"),
     rag_service: RAGService = Depends(get_rag_service)
 ):
     """
     Delete a document from the FAISS index.
     
     - **document_name**: Name of the document to delete
+    - **collection**: Collection holding the document
     """
     try:
-        deleted_count = rag_service.delete_document(document_name)
+        deleted_count = await rag_service.run_blocking(
+            rag_service.delete_document, document_name, collection=collection
+        )
         
         if deleted_count == 0:
             raise HTTPException(
@@ -144,6 +166,12 @@ async def delete_document(
         
     except HTTPException:
         raise
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error deleting document {document_name}: {e}")
         raise HTTPException(
@@ -2,3 +2,4 @@
 from .embedding_service import EmbeddingService
 from .llm_service import LLMService
 from .rag_service import RAGService
+from .rerank_service import RerankService
@@ -5,11 +5,13 @@ Uses sentence-transformers for high-quality embeddings.
 
 import logging
 import numpy as np
-from typing import List, Union
-from sentence_transformers import SentenceTransformer
+from typing import List, Union, TYPE_CHECKING
 
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +38,9 @@ class EmbeddingService:
     def _load_model(self):
         """Load the sentence-transformer model."""
         try:
+            # Imported here: torch/transformers take seconds to import
+            from sentence_transformers import SentenceTransformer
+            
             logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
             EmbeddingService._model = SentenceTransformer(settings.EMBEDDING_MODEL)
             logger.info(
@@ -47,12 +52,20 @@ class EmbeddingService:
             raise RuntimeError(f"Failed to load embedding model: {e}")
     
     @property
-    def model(self) -> SentenceTransformer:
+    def model(self) -> "SentenceTransformer":
         """Get the loaded model."""
         if EmbeddingService._model is None:
             self._load_model()
         return EmbeddingService._model
     
+    def get_tokenizer(self):
+        """The model's tokenizer (used to size chunks in tokens)."""
+        return self.model.tokenizer
+    
+    def get_max_seq_length(self) -> int:
+        """Tokens the model reads per text, including special tokens; the rest is truncated."""
+        return self.model.max_seq_length
+    
     def get_dimension(self) -> int:
         """Get the embedding dimension."""
         return self.model.get_sentence_embedding_dimension()
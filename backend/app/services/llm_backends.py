@@ -0,0 +1,503 @@
+"""
+Inference backends used by LLMService.
+Each backend loads one model runtime and turns a prompt into generated text:
+- transformers: HuggingFace model (4-bit on GPU, full precision on CPU)
+- llamacpp: quantized GGUF model (int8/int4) via llama-cpp-python, for CPU
+- openai: any OpenAI-compatible /v1/completions server (vLLM, llama.cpp server, ...)
+- mock: canned responses for development
+"""
+
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of system prompt variants with a cached KV prefix
+PREFIX_CACHE_SIZE = 8
+
+
+def resident_memory_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        # Linux: second field of statm is resident pages
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak RSS: KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if peak > 1 << 32 else peak / 1024
+    except Exception:
+        return 0.0
+
+
+class LLMBackend:
+    """
+    Base class for inference backends.
+    Subclasses implement _load and _generate; this class keeps the
+    load time, memory and throughput statistics.
+    Requests come from worker threads; _generate runs one at a time unless
+    the backend is thread_safe.
+    """
+
+    name = "base"
+    thread_safe = False
+
+    def __init__(self):
+        self._generate_lock = nullcontext() if self.thread_safe else Lock()
+        self._stats_lock = Lock()
+        self.load_time_s: Optional[float] = None
+        self.load_rss_mb: Optional[float] = None
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.generated_tokens = 0
+        self.generation_time_s = 0.0
+
+    def load(self):
+        """Load the model and record load time and memory growth."""
+        rss_before = resident_memory_mb()
+        start = time.perf_counter()
+        self._load()
+        self.load_time_s = time.perf_counter() - start
+        self.load_rss_mb = resident_memory_mb() - rss_before
+        logger.info(
+            f"{self.name} backend loaded in {self.load_time_s:.1f}s "
+            f"(+{self.load_rss_mb:.0f} MB resident)"
+        )
+
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        """
+        Generate a completion and record its throughput.
+
+        Args:
+            prompt: The full prompt
+            max_tokens: Override default max new tokens
+            temperature: Override default temperature (0 for greedy decoding)
+
+        Returns:
+            Generated text without the prompt
+        """
+        with self._generate_lock:
+            start = time.perf_counter()
+            text, num_tokens = self._generate(
+                prompt,
+                max_tokens or settings.LLM_MAX_NEW_TOKENS,
+                settings.LLM_TEMPERATURE if temperature is None else temperature
+            )
+            elapsed = time.perf_counter() - start
+        prompt_tokens = self.count_tokens(prompt)
+
+        with self._stats_lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.generated_tokens += num_tokens
+            self.generation_time_s += elapsed
+        logger.info(
+            f"{self.name} generated {num_tokens} tokens in {elapsed:.2f}s "
+            f"({num_tokens / elapsed if elapsed > 0 else 0:.1f} tok/s)"
+        )
+        return text
+
+    def get_tokenizer(self) -> Optional[Any]:
+        """Tokenizer with encode/decode for token counting, if available."""
+        return None
+
+    def count_tokens(self, text: str) -> int:
+        """Token count of text, estimated at ~4 characters per token without a tokenizer."""
+        tokenizer = self.get_tokenizer()
+        if tokenizer is None:
+            return max(1, len(text) // 4)
+        return len(tokenizer.encode(text))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Load and throughput statistics of this backend."""
+        return {
+            "backend": self.name,
+            "load_time_s": round(self.load_time_s, 2) if self.load_time_s is not None else None,
+            "load_rss_mb": round(self.load_rss_mb, 1) if self.load_rss_mb is not None else None,
+            "rss_mb": round(resident_memory_mb(), 1),
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "generated_tokens": self.generated_tokens,
+            "tokens_per_second": round(self.generated_tokens / self.generation_time_s, 2)
+                if self.generation_time_s > 0 else None
+        }
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, int]:
+        """Return (generated text, number of generated tokens)."""
+        raise NotImplementedError
+
+
+class TransformersBackend(LLMBackend):
+    """
+    HuggingFace transformers backend.
+    Reuses a cached KV state of the system prompt block across requests.
+    """
+
+    name = "transformers"
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+        self.tokenizer = None
+        self.pipeline = None
+        # System prefix text -> (prefix token ids, key/value cache)
+        self.prefix_cache: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+
+    def _load(self):
+        """
+        Load the model with optimizations.
+        Uses 4-bit quantization on GPU; on CPU the weights are loaded in
+        LLM_CPU_DTYPE (use the llamacpp backend for quantized CPU inference).
+        """
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+        logger.info(f"Loading LLM: {settings.LLM_MODEL}")
+
+        # Check for GPU availability
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Using device: {device}")
+
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            settings.LLM_MODEL,
+            trust_remote_code=True
+        )
+
+        # Quantization config for memory efficiency (requires bitsandbytes)
+        if device == "cuda":
+            try:
+                from transformers import BitsAndBytesConfig
+
+                quantization_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_compute_dtype=torch.float16,
+                    bnb_4bit_use_double_quant=True,
+                    bnb_4bit_quant_type="nf4"
+                )
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    settings.LLM_MODEL,
+                    quantization_config=quantization_config,
+                    device_map="auto",
+                    trust_remote_code=True
+                )
+            except ImportError:
+                logger.warning("bitsandbytes not available, loading without quantization")
+                self._load_without_quantization(device)
+        else:
+            self._load_without_quantization(device)
+
+        # Create pipeline for easier inference
+        self.pipeline = pipeline(
+            "text-generation",
+            model=self.model,
+            tokenizer=self.tokenizer,
+            max_new_tokens=settings.LLM_MAX_NEW_TOKENS,
+            temperature=settings.LLM_TEMPERATURE,
+            top_p=settings.LLM_TOP_P,
+            do_sample=True,
+            pad_token_id=self.tokenizer.eos_token_id
+        )
+
+    def _load_without_quantization(self, device: str):
+        """Load model without quantization for CPU or when bitsandbytes unavailable."""
+        import torch
+        from transformers import AutoModelForCausalLM
+
+        if device == "cuda":
+            dtype = torch.float16
+        else:
+            dtype = getattr(torch, settings.LLM_CPU_DTYPE)
+
+        self.model = AutoModelForCausalLM.from_pretrained(
+            settings.LLM_MODEL,
+            torch_dtype=dtype,
+            device_map="auto" if device == "cuda" else None,
+            trust_remote_code=True,
+            low_cpu_mem_usage=True
+        )
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, int]:
+        # Reuse the cached system-prompt KV state when the prompt starts with it
+        prefix = match_system_prefix(prompt)
+        if prefix is not None:
+            try:
+                return self._generate_with_prefix(prefix, prompt, max_tokens, temperature)
+            except Exception as e:
+                logger.warning(f"Prefix-cached generation failed, using pipeline: {e}")
+
+        response = self.pipeline(prompt, max_new_tokens=max_tokens, **self._sampling(temperature))
+
+        # Extract generated text and remove the prompt from it
+        generated_text = response[0]["generated_text"]
+        if generated_text.startswith(prompt):
+            answer = generated_text[len(prompt):].strip()
+        else:
+            answer = generated_text.strip()
+
+        return answer, len(self.tokenizer.encode(answer, add_special_tokens=False))
+
+    def warm_prefix(self, prefix: str):
+        """Precompute the KV cache for a system block."""
+        self._get_prefix_state(prefix)
+
+    def _get_prefix_state(self, prefix: str) -> Tuple[Any, Any]:
+        """
+        Get the token ids and key/value cache for a system prefix.
+        Computed once per system prompt variant and kept in a small LRU.
+
+        Args:
+            prefix: The system block text
+
+        Returns:
+            Tuple of (prefix token ids, past_key_values)
+        """
+        import torch
+
+        if prefix in self.prefix_cache:
+            self.prefix_cache.move_to_end(prefix)
+            return self.prefix_cache[prefix]
+
+        # The prefix carries its own "<s>", so no extra special tokens
+        prefix_ids = self.tokenizer(
+            prefix,
+            return_tensors="pt",
+            add_special_tokens=False
+        ).input_ids.to(self.model.device)
+
+        with torch.no_grad():
+            outputs = self.model(input_ids=prefix_ids, use_cache=True)
+
+        state = (prefix_ids, outputs.past_key_values)
+        self.prefix_cache[prefix] = state
+        while len(self.prefix_cache) > PREFIX_CACHE_SIZE:
+            self.prefix_cache.popitem(last=False)
+
+        logger.info(f"Cached KV state for a {prefix_ids.shape[1]}-token system prefix")
+        return state
+
+    @staticmethod
+    def _sampling(temperature: float) -> Dict[str, Any]:
+        """Generation arguments: sampling, or greedy decoding at temperature 0."""
+        if temperature <= 0:
+            return {"do_sample": False}
+        return {"do_sample": True, "temperature": temperature, "top_p": settings.LLM_TOP_P}
+
+    def _generate_with_prefix(
+        self,
+        prefix: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Tuple[str, int]:
+        """
+        Generate starting from the cached KV state of the system prefix,
+        so only the context and question tokens are prefilled.
+        """
+        import torch
+
+        prefix_ids, past_key_values = self._get_prefix_state(prefix)
+
+        suffix_ids = self.tokenizer(
+            prompt[len(prefix):],
+            return_tensors="pt",
+            add_special_tokens=False
+        ).input_ids.to(self.model.device)
+        input_ids = torch.cat([prefix_ids, suffix_ids], dim=-1)
+
+        with torch.no_grad():
+            output_ids = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                # Generation extends the cache in place, so start from a copy
+                past_key_values=copy.deepcopy(past_key_values),
+                max_new_tokens=max_tokens,
+                pad_token_id=self.tokenizer.eos_token_id,
+                **self._sampling(temperature)
+            )
+
+        new_tokens = output_ids[0, input_ids.shape[1]:]
+        answer = self.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+        return answer, int(new_tokens.shape[0])
+
+    def get_tokenizer(self) -> Optional[Any]:
+        return self.tokenizer
+
+
+class _LlamaCppTokenizer:
+    """Adapts the llama.cpp tokenizer to the encode/decode calls of ContextPacker."""
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def encode(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        return self._llm.tokenize(text.encode("utf-8"), add_bos=add_special_tokens)
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True) -> str:
+        return self._llm.detokenize(ids).decode("utf-8", errors="ignore")
+
+
+class LlamaCppBackend(LLMBackend):
+    """
+    Quantized CPU backend running a GGUF model (e.g. Q4_K_M) with llama.cpp.
+    A 7B model needs about 4-5 GB of RAM instead of ~28 GB in float32.
+    """
+
+    name = "llamacpp"
+
+    def __init__(self):
+        super().__init__()
+        self.llm = None
+
+    def _load(self):
+        from llama_cpp import Llama, LlamaRAMCache
+
+        if not settings.LLM_GGUF_PATH:
+            raise ValueError("LLM_GGUF_PATH must point to a .gguf model for the llamacpp backend")
+
+        logger.info(f"Loading GGUF model: {settings.LLM_GGUF_PATH}")
+        self.llm = Llama(
+            model_path=str(settings.LLM_GGUF_PATH),
+            n_ctx=settings.LLM_CONTEXT_LENGTH,
+            n_threads=settings.LLM_N_THREADS or None,
+            verbose=False
+        )
+        # Prompt-state cache: the shared system block is only evaluated once
+        self.llm.set_cache(LlamaRAMCache())
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, int]:
+        # The prompt already starts with "<s>", so no extra BOS token
+        prompt_tokens = self.llm.tokenize(prompt.encode("utf-8"), add_bos=False, special=True)
+        output = self.llm(
+            prompt_tokens,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=settings.LLM_TOP_P
+        )
+        return output["choices"][0]["text"].strip(), output["usage"]["completion_tokens"]
+
+    def get_tokenizer(self) -> Optional[Any]:
+        return _LlamaCppTokenizer(self.llm) if self.llm is not None else None
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Remote backend for any server implementing the OpenAI /v1/completions API.
+    The HTTP client keeps connections alive between requests.
+    """
+
+    name = "openai"
+    thread_safe = True
+
+    def __init__(self):
+        super().__init__()
+        self.client = None
+
+    def _load(self):
+        import httpx
+
+        headers = {}
+        if settings.LLM_API_KEY:
+            headers["Authorization"] = f"Bearer {settings.LLM_API_KEY}"
+
+        self.client = httpx.Client(
+            base_url=settings.LLM_API_BASE.rstrip("/"),
+            headers=headers,
+            timeout=settings.LLM_API_TIMEOUT
+        )
+
+        # Fail at startup rather than on the first question
+        response = self.client.get("/models")
+        response.raise_for_status()
+        logger.info(f"Connected to OpenAI-compatible server at {settings.LLM_API_BASE}")
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, int]:
+        response = self.client.post("/completions", json={
+            "model": settings.LLM_MODEL,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": settings.LLM_TOP_P
+        })
+        response.raise_for_status()
+        data = response.json()
+
+        text = data["choices"][0]["text"].strip()
+        usage = data.get("usage") or {}
+        # Fall back to a character estimate when the server reports no usage
+        return text, usage.get("completion_tokens", max(1, len(text) // 4))
+
+
+class MockBackend(LLMBackend):
+    """Canned responses for development without a model."""
+
+    name = "mock"
+    thread_safe = True
+
+    def __init__(self, reason: Optional[str] = None):
+        """
+        Args:
+            reason: Why the mock is used instead of the configured backend
+        """
+        super().__init__()
+        self.reason = reason
+
+    def _load(self):
+        pass
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, int]:
+        # Extract question from prompt
+        if "Question:" in prompt:
+            question = prompt.split("Question:")[-1].split("\n")[0].strip()
+        else:
+            question = "your question"
+
+        text = (
+            f"Based on the provided context about Nepali legal documents, "
+            f"here is the answer to {question}:\n\n"
+            f"This is a development response. To get actual LLM-generated answers, "
+            f"configure an LLM backend:\n"
+            f"1. LLM_BACKEND=transformers with a GPU (8GB+ VRAM recommended)\n"
+            f"2. LLM_BACKEND=llamacpp with a quantized GGUF model for CPU\n"
+            f"3. LLM_BACKEND=openai pointing LLM_API_BASE at a completions server\n\n"
+            f"The context provided contains relevant information from the legal documents."
+        )
+        return text, len(text) // 4
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["fallback_reason"] = self.reason
+        return stats
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (TransformersBackend, LlamaCppBackend, OpenAICompatibleBackend, MockBackend)
+}
+
+
+def match_system_prefix(prompt: str) -> Optional[str]:
+    """Return the system block at the start of the prompt, if it has one."""
+    marker = "<</SYS>>\n\n"
+    if not prompt.startswith("<s>[INST] <<SYS>>\n") or marker not in prompt:
+        return None
+    return prompt[:prompt.index(marker) + len(marker)]
@@ -1,22 +1,24 @@
 """
-LLM service for generating answers using HuggingFace models.
-Supports local LLaMA models with optimized inference.
+LLM service for generating answers.
+Delegates inference to a pluggable backend selected with LLM_BACKEND
+(transformers, llamacpp, openai or mock).
 """
 
 import logging
-from typing import List, Optional
-import torch
-from transformers import (
-    AutoModelForCausalLM, 
-    AutoTokenizer,
-    pipeline,
-    BitsAndBytesConfig
-)
+from typing import Any, Dict, List, Optional
 
 from app.core.config import settings
+from .llm_backends import BACKENDS, LLMBackend, MockBackend, TransformersBackend
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SYSTEM_PROMPT = (
+    "You are Nyaya.exe, an expert AI assistant specializing in Nepali laws "
+    "and legal documents. Your role is to provide accurate, helpful information "
+    "based on the legal context provided. Always cite your sources when possible "
+    "and acknowledge if something is unclear or not covered in the provided context."
+)
+
 
 class LLMService:
     """
@@ -25,9 +27,8 @@ class LLMService:
     """
     
     _instance = None
-    _model = None
-    _tokenizer = None
-    _pipeline = None
+    _backend: Optional[LLMBackend] = None
+    _load_error: Optional[str] = None
     
     def __new__(cls):
         """Singleton pattern to ensure model is loaded only once."""
@@ -37,82 +38,43 @@ class LLMService:
     
     def __init__(self):
         """Initialize the LLM."""
-        if LLMService._model is None:
+        if LLMService._backend is None:
             self._load_model()
     
     def _load_model(self):
         """
-        Load the LLaMA model with optimizations.
-        Uses 4-bit quantization for memory efficiency.
+        Load the configured backend.
+        If loading fails the error is recorded and, when LLM_MOCK_FALLBACK
+        is enabled, the mock backend is used instead; otherwise it is raised.
         """
+        name = settings.LLM_BACKEND.lower()
+        if name not in BACKENDS:
+            raise ValueError(
+                f"Unknown LLM_BACKEND '{settings.LLM_BACKEND}'. "
+                f"Choose one of: {', '.join(BACKENDS)}"
+            )
+        
+        backend = BACKENDS[name]()
         try:
-            logger.info(f"Loading LLM: {settings.LLM_MODEL}")
-            
-            # Check for GPU availability
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            logger.info(f"Using device: {device}")
+            backend.load()
             
-            # Quantization config for memory efficiency (requires bitsandbytes)
-            if device == "cuda":
+            # Precompute the KV cache for the default system block
+            if isinstance(backend, TransformersBackend):
                 try:
-                    quantization_config = BitsAndBytesConfig(
-                        load_in_4bit=True,
-                        bnb_4bit_compute_dtype=torch.float16,
-                        bnb_4bit_use_double_quant=True,
-                        bnb_4bit_quant_type="nf4"
-                    )
-                    
-                    LLMService._tokenizer = AutoTokenizer.from_pretrained(
-                        settings.LLM_MODEL,
-                        trust_remote_code=True
-                    )
-                    
-                    LLMService._model = AutoModelForCausalLM.from_pretrained(
-                        settings.LLM_MODEL,
-                        quantization_config=quantization_config,
-                        device_map="auto",
-                        trust_remote_code=True
-                    )
-                except ImportError:
-                    logger.warning("bitsandbytes not available, loading without quantization")
-                    self._load_without_quantization(device)
-            else:
-                self._load_without_quantization(device)
-            
-            # Create pipeline for easier inference
-            LLMService._pipeline = pipeline(
-                "text-generation",
-                model=LLMService._model,
-                tokenizer=LLMService._tokenizer,
-                max_new_tokens=settings.LLM_MAX_NEW_TOKENS,
-                temperature=settings.LLM_TEMPERATURE,
-                top_p=settings.LLM_TOP_P,
-                do_sample=True,
-                pad_token_id=LLMService._tokenizer.eos_token_id
-            )
-            
-            logger.info("LLM loaded successfully")
+                    backend.warm_prefix(self.build_system_prefix(DEFAULT_SYSTEM_PROMPT))
+                except Exception as e:
+                    logger.warning(f"Could not precompute system prefix cache: {e}")
             
         except Exception as e:
-            logger.error(f"Failed to load LLM: {e}")
-            logger.warning("Falling back to mock LLM for development")
-            LLMService._model = "mock"
-            LLMService._tokenizer = "mock"
-    
-    def _load_without_quantization(self, device: str):
-        """Load model without quantization for CPU or when bitsandbytes unavailable."""
-        LLMService._tokenizer = AutoTokenizer.from_pretrained(
-            settings.LLM_MODEL,
-            trust_remote_code=True
-        )
+            LLMService._load_error = f"{type(e).__name__}: {e}"
+            logger.error(f"Failed to load {name} LLM backend: {LLMService._load_error}")
+            if not settings.LLM_MOCK_FALLBACK:
+                raise RuntimeError(f"LLM backend '{name}' failed to load") from e
+            logger.warning("LLM_MOCK_FALLBACK is enabled, answers will be mock responses")
+            backend = MockBackend(reason=LLMService._load_error)
+            backend.load()
         
-        LLMService._model = AutoModelForCausalLM.from_pretrained(
-            settings.LLM_MODEL,
-            torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-            device_map="auto" if device == "cuda" else None,
-            trust_remote_code=True,
-            low_cpu_mem_usage=True
-        )
+        LLMService._backend = backend
     
     def generate_answer(
         self, 
@@ -131,57 +93,16 @@ class LLMService:
         Returns:
             Generated answer text
         """
-        # Mock response for development without GPU
-        if LLMService._model == "mock":
-            return self._mock_generate(prompt)
-        
         try:
-            # Override generation params if provided
-            gen_kwargs = {}
-            if max_tokens:
-                gen_kwargs["max_new_tokens"] = max_tokens
-            if temperature:
-                gen_kwargs["temperature"] = temperature
-            
-            # Generate response
-            response = LLMService._pipeline(prompt, **gen_kwargs)
-            
-            # Extract generated text
-            generated_text = response[0]["generated_text"]
-            
-            # Remove the prompt from the response
-            if generated_text.startswith(prompt):
-                answer = generated_text[len(prompt):].strip()
-            else:
-                answer = generated_text.strip()
-            
-            return answer
-            
+            return LLMService._backend.generate(prompt, max_tokens, temperature)
         except Exception as e:
             logger.error(f"Error generating answer: {e}")
             return f"I apologize, but I encountered an error generating the response: {str(e)}"
     
-    def _mock_generate(self, prompt: str) -> str:
-        """
-        Generate a mock response for development/testing.
-        Useful when running without GPU or before model download.
-        """
-        # Extract question from prompt
-        if "Question:" in prompt:
-            question = prompt.split("Question:")[-1].split("\n")[0].strip()
-        else:
-            question = "your question"
-        
-        return (
-            f"Based on the provided context about Nepali legal documents, "
-            f"here is the answer to {question}:\n\n"
-            f"This is a development response. To get actual LLM-generated answers, "
-            f"please ensure you have:\n"
-            f"1. A GPU with sufficient VRAM (8GB+ recommended)\n"
-            f"2. The LLaMA model downloaded from HuggingFace\n"
-            f"3. Proper authentication with HuggingFace (for gated models)\n\n"
-            f"The context provided contains relevant information from the legal documents."
-        )
+    @staticmethod
+    def build_system_prefix(system_prompt: str) -> str:
+        """Build the static system block that starts every RAG prompt."""
+        return f"<s>[INST] <<SYS>>\n{system_prompt}\n<</SYS>>\n\n"
     
     def build_rag_prompt(
         self, 
@@ -201,12 +122,7 @@ class LLMService:
             Formatted prompt string
         """
         if system_prompt is None:
-            system_prompt = (
-                "You are Nyaya.exe, an expert AI assistant specializing in Nepali laws "
-                "and legal documents. Your role is to provide accurate, helpful information "
-                "based on the legal context provided. Always cite your sources when possible "
-                "and acknowledge if something is unclear or not covered in the provided context."
-            )
+            system_prompt = DEFAULT_SYSTEM_PROMPT
         
         # Format context
         context_text = "\n\n".join([
@@ -214,12 +130,9 @@ class LLMService:
             for i, chunk in enumerate(context_chunks)
         ])
         
-        # Build prompt in LLaMA chat format
-        prompt = f"""<s>[INST] <<SYS>>
-{system_prompt}
-<</SYS>>
-
-Context from Nepali Legal Documents:
+        # Build prompt in LLaMA chat format; the system block is a stable,
+        # KV-cached prefix so it must stay at the very start of the prompt
+        prompt = self.build_system_prefix(system_prompt) + f"""Context from Nepali Legal Documents:
 {context_text}
 
 Based on the above context, please answer the following question. If the answer cannot be found in the context, say so clearly.
@@ -231,6 +144,17 @@ Answer:"""
         
         return prompt
     
+    def get_tokenizer(self):
+        """Get the backend tokenizer, or None when tokens must be estimated."""
+        return LLMService._backend.get_tokenizer()
+    
     def is_loaded(self) -> bool:
-        """Check if the LLM is properly loaded."""
-        return LLMService._model is not None
+        """Check if the configured backend is loaded (not a mock fallback)."""
+        return LLMService._backend is not None and LLMService._load_error is None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend name, load time, resident memory and tokens/sec."""
+        stats = LLMService._backend.get_stats()
+        stats["configured_backend"] = settings.LLM_BACKEND
+        stats["load_error"] = LLMService._load_error
+        return stats
@@ -3,17 +3,29 @@ RAG (Retrieval-Augmented Generation) service.
 Orchestrates the complete RAG pipeline: retrieval, prompt building, and generation.
 """
 
+import asyncio
+import heapq
 import logging
 import time
-from typing import List, Dict, Any, Tuple
+from contextlib import ExitStack, contextmanager
+from threading import Lock
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from pathlib import Path
 
 from app.core.config import settings
+from app.core.metrics import metrics, CACHE_HITS, CACHE_MISSES, LLM_TOKENS, INDEX_CHUNKS, INDEX_DOCUMENTS, PROJECTION_RECALL, COLLECTIONS_LOADED
+from app.core.readiness import readiness
+from app.core.timing import StageTimer
+from app.db.collection_manager import CollectionManager, DEFAULT_COLLECTION
 from app.db.faiss_store import FAISSStore
+from app.db.sharded_store import ShardedCollections, ShardedStore
+from app.db.sentence_store import split_sentences, build_excerpt
 from app.utils.pdf_parser import PDFParser
 from app.utils.text_chunker import TextChunker, TextChunk
+from app.utils.context_packer import ContextPacker
 from .embedding_service import EmbeddingService
 from .llm_service import LLMService
+from .rerank_service import RerankService
 
 logger = logging.getLogger(__name__)
 
@@ -22,23 +34,95 @@ class RAGService:
     """
     Main RAG service that coordinates document processing,
     embedding, retrieval, and answer generation.
+    Shared by all requests (singleton), so the index is loaded once.
     """
     
+    _instance = None
+    
+    def __new__(cls):
+        """Singleton pattern so every request uses the same loaded index."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
     def __init__(self):
-        """Initialize all required services."""
+        """Initialize retrieval services; the LLM is loaded separately."""
+        if self._initialized:
+            return
+        self._initialized = True
+        
         self.embedding_service = EmbeddingService()
-        self.llm_service = LLMService()
-        self.faiss_store = FAISSStore()
-        self.text_chunker = TextChunker(
-            chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP
-        )
+        self.collections = self._create_collections()
+        self.text_chunker = self._create_chunker()
         self.pdf_parser = PDFParser()
+        self.rerank_service = RerankService()
+        # Uploads and deletes run in worker threads; writes to one collection
+        # are serialized so each upload sees the chunks of the previous one
+        self._write_locks: Dict[str, Lock] = {}
+        self._write_locks_guard = Lock()
+        metrics.add_collector(self.collect_metrics)
+    
+    def _create_chunker(self) -> TextChunker:
+        """Character- or token-sized chunker, per CHUNK_SIZE_UNIT."""
+        if settings.CHUNK_SIZE_UNIT != "tokens":
+            return TextChunker(
+                chunk_size=settings.CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP
+            )
+        # Room for the [CLS]/[SEP] tokens the model adds
+        max_tokens = self.embedding_service.get_max_seq_length() - 2
+        chunk_size = min(settings.CHUNK_SIZE_TOKENS or max_tokens, max_tokens)
+        logger.info(f"Chunking by tokens: {chunk_size} per chunk, {settings.CHUNK_OVERLAP_TOKENS} overlap")
+        return TextChunker(
+            chunk_size=chunk_size,
+            chunk_overlap=settings.CHUNK_OVERLAP_TOKENS,
+            tokenizer=self.embedding_service.get_tokenizer()
+        )
+    
+    @staticmethod
+    def _create_collections() -> Union[CollectionManager, ShardedCollections]:
+        """Local collections, or a coordinator for the shard servers in SHARD_URLS."""
+        if settings.SHARD_URLS:
+            return ShardedCollections(settings.SHARD_URLS)
+        return CollectionManager()
+    
+    async def run_blocking(self, func, *args, **kwargs):
+        """
+        Call a blocking function (model inference, index access, or a wait on
+        the shard servers) from async code in a worker thread, so the event
+        loop keeps answering other requests and /livez meanwhile.
+        """
+        return await asyncio.to_thread(func, *args, **kwargs)
+    
+    def _write_lock(self, collection: str) -> Lock:
+        """Lock serializing the writes to one collection."""
+        with self._write_locks_guard:
+            return self._write_locks.setdefault(collection, Lock())
+    
+    @property
+    def faiss_store(self) -> Union[FAISSStore, ShardedStore]:
+        """Store of the default collection (always loaded)."""
+        return self.collections.get(DEFAULT_COLLECTION)
+    
+    @staticmethod
+    def _document_path(collection: str, filename: str) -> Path:
+        """Where an uploaded file is kept; one directory per named collection."""
+        if collection == DEFAULT_COLLECTION:
+            return settings.DOCUMENTS_PATH / filename
+        return settings.DOCUMENTS_PATH / "collections" / collection / filename
+    
+    @property
+    def llm_service(self) -> LLMService:
+        """The LLM service, loaded on first use (normally by the startup warm-up)."""
+        return LLMService()
     
     async def process_document(
         self, 
         file_content: bytes, 
-        filename: str
+        filename: str,
+        timer: Optional[StageTimer] = None,
+        collection: str = DEFAULT_COLLECTION
     ) -> Dict[str, Any]:
         """
         Process an uploaded document: extract text, chunk, embed, and store.
@@ -46,16 +130,35 @@ class RAGService:
         Args:
             file_content: Raw file content as bytes
             filename: Original filename
+            timer: Records the duration of each processing stage
+            collection: Collection to add the document to (created if needed)
             
         Returns:
             Dictionary with processing results
         """
         start_time = time.time()
+        timer = timer or StageTimer()
         
+        with self.collections.use(collection, create=True) as store:
+            return await self.run_blocking(
+                self._process_document, store, collection, file_content, filename, timer, start_time
+            )
+    
+    def _process_document(
+        self,
+        store: Union[FAISSStore, ShardedStore],
+        collection: str,
+        file_content: bytes,
+        filename: str,
+        timer: StageTimer,
+        start_time: float
+    ) -> Dict[str, Any]:
+        """Run the upload pipeline against one collection's store."""
         try:
             # Step 1: Extract text from PDF
             logger.info(f"Extracting text from: {filename}")
-            text = self.pdf_parser.extract_text_from_bytes(file_content, filename)
+            with timer.stage("parse"):
+                text = self.pdf_parser.extract_text_from_bytes(file_content, filename)
             
             if not text or len(text.strip()) < 100:
                 raise ValueError(
@@ -65,43 +168,21 @@ class RAGService:
             
             # Step 2: Chunk the text
             logger.info(f"Chunking text from: {filename}")
-            chunks = self.text_chunker.chunk_text(text, filename)
+            with timer.stage("chunk"):
+                chunks = self.text_chunker.chunk_text(text, filename)
             
             if not chunks:
                 raise ValueError(f"No chunks created from {filename}")
             
-            # Step 3: Generate embeddings
-            logger.info(f"Generating embeddings for {len(chunks)} chunks")
-            chunk_texts = [chunk.text for chunk in chunks]
-            embeddings = self.embedding_service.embed_texts(chunk_texts)
-            
-            # Step 4: Prepare metadata
-            metadata_list = [
-                {
-                    "text": chunk.text,
-                    "document_name": filename,
-                    "chunk_index": chunk.index,
-                    "char_count": len(chunk.text)
-                }
-                for chunk in chunks
-            ]
-            
-            # Step 5: Add to FAISS index
-            logger.info(f"Adding {len(embeddings)} embeddings to FAISS")
-            self.faiss_store.add_embeddings(embeddings, metadata_list)
-            
-            # Step 6: Save the index
-            self.faiss_store.save_index()
-            
-            # Also save the original document
-            doc_path = settings.DOCUMENTS_PATH / filename
-            with open(doc_path, "wb") as f:
-                f.write(file_content)
+            with self._write_lock(collection):
+                duplicate_count = self._index_chunks(
+                    store, collection, chunks, file_content, filename, timer
+                )
             
             processing_time = time.time() - start_time
             
             logger.info(
-                f"Successfully processed {filename}: "
+                f"Successfully processed {filename} into '{collection}': "
                 f"{len(chunks)} chunks in {processing_time:.2f}s"
             )
             
@@ -109,7 +190,9 @@ class RAGService:
                 "success": True,
                 "message": "Document processed and indexed successfully",
                 "document_name": filename,
+                "collection": collection,
                 "total_chunks": len(chunks),
+                "duplicate_chunks": duplicate_count,
                 "processing_time": round(processing_time, 2)
             }
             
@@ -117,10 +200,104 @@ class RAGService:
             logger.error(f"Failed to process document {filename}: {e}")
             raise
     
+    def _index_chunks(
+        self,
+        store: Union[FAISSStore, ShardedStore],
+        collection: str,
+        chunks: List[TextChunk],
+        file_content: bytes,
+        filename: str,
+        timer: StageTimer
+    ) -> int:
+        """
+        Deduplicate, embed and add a document's chunks, then save the store.
+        Must be called with the collection's write lock held.
+        
+        Returns:
+            Number of chunks stored as references to an existing chunk
+        """
+        # Step 2b: Near-duplicates of stored chunks (or of each other) are
+        # stored once; they only add a reference to the existing chunk
+        duplicate_of = [None] * len(chunks)
+        if settings.DEDUP_ENABLED:
+            with timer.stage("dedup"):
+                duplicate_of = store.find_duplicates(
+                    [chunk.text for chunk in chunks], document_name=filename
+                )
+        new_chunks = [chunk for chunk, dup in zip(chunks, duplicate_of) if dup is None]
+        duplicate_count = len(chunks) - len(new_chunks)
+        if duplicate_count:
+            logger.info(f"{duplicate_count} of {len(chunks)} chunks are near-duplicates")
+        
+        if new_chunks:
+            # Step 3: Generate embeddings
+            logger.info(f"Generating embeddings for {len(new_chunks)} chunks")
+            chunk_texts = [chunk.text for chunk in new_chunks]
+            with timer.stage("embed"):
+                embeddings = self.embedding_service.embed_texts(chunk_texts)
+            
+            # Step 3b: Embed sentences for query-time context compression
+            with timer.stage("chunk"):
+                sentence_spans = [split_sentences(chunk.text) for chunk in new_chunks]
+                sentence_texts = [
+                    chunk.text[start:end]
+                    for chunk, spans in zip(new_chunks, sentence_spans)
+                    for start, end in spans
+                ]
+            logger.info(f"Generating embeddings for {len(sentence_texts)} sentences")
+            with timer.stage("embed"):
+                sentence_embeddings = self.embedding_service.embed_texts(sentence_texts)
+            
+            # Step 4: Prepare metadata
+            metadata_list = [
+                {
+                    "text": chunk.text,
+                    "document_name": filename,
+                    "chunk_index": chunk.index,
+                    "char_count": len(chunk.text)
+                }
+                for chunk in new_chunks
+            ]
+            
+            # Step 5: Add to FAISS index
+            logger.info(f"Adding {len(embeddings)} embeddings to FAISS")
+            with timer.stage("index"):
+                store.add_embeddings(
+                    embeddings, 
+                    metadata_list,
+                    sentence_spans=sentence_spans,
+                    sentence_embeddings=sentence_embeddings
+                )
+        
+        if duplicate_count:
+            with timer.stage("index"):
+                store.add_references([
+                    (dup, {"document_name": filename, "chunk_index": chunk.index})
+                    for chunk, dup in zip(chunks, duplicate_of)
+                    if dup is not None
+                ])
+        
+        # Step 6: Save the index
+        with timer.stage("save"):
+            store.save_index()
+            
+            # Also save the original document
+            doc_path = self._document_path(collection, filename)
+            doc_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(doc_path, "wb") as f:
+                f.write(file_content)
+        
+        return duplicate_count
+    
     async def search_and_answer(
         self, 
         question: str,
-        top_k: int = None
+        top_k: int = None,
+        filters: Optional[Dict[str, Any]] = None,
+        min_score: Optional[float] = None,
+        rerank: Optional[bool] = None,
+        timer: Optional[StageTimer] = None,
+        collection: Union[str, List[str]] = DEFAULT_COLLECTION
     ) -> Dict[str, Any]:
         """
         Search for relevant chunks and generate an answer.
@@ -128,21 +305,41 @@ class RAGService:
         Args:
             question: User's question
             top_k: Number of chunks to retrieve
+            filters: Optional metadata filters applied inside the vector search
+            min_score: Optional minimum similarity score for retrieved chunks
+            rerank: Override RERANK_ENABLED for this request
+            timer: Records the duration of each pipeline stage
+            collection: Collection to search, or a list whose results are merged
             
         Returns:
             Dictionary with answer and source chunks
         """
         start_time = time.time()
+        timer = timer or StageTimer()
         top_k = top_k or settings.TOP_K_RESULTS
+        rerank = settings.RERANK_ENABLED if rerank is None else rerank
         
         try:
             # Step 1: Embed the question
             logger.info(f"Processing question: {question[:100]}...")
-            query_embedding = self.embedding_service.embed_query(question)
+            with timer.stage("embed"):
+                query_embedding = await self.run_blocking(
+                    self.embedding_service.embed_query, question
+                )
             
-            # Step 2: Search FAISS
-            logger.info(f"Searching FAISS for top {top_k} results")
-            search_results = self.faiss_store.search(query_embedding, top_k)
+            # Steps 2-3: Search, rerank and compress, with the collections kept
+            # loaded throughout
+            search_results = await self.run_blocking(
+                self._retrieve,
+                question,
+                collection,
+                query_embedding,
+                top_k,
+                filters,
+                min_score,
+                rerank,
+                timer
+            )
             
             if not search_results:
                 return {
@@ -155,23 +352,41 @@ class RAGService:
                     "processing_time": round(time.time() - start_time, 2)
                 }
             
-            # Step 3: Extract context chunks
-            context_chunks = [result["text"] for result in search_results]
-            
-            # Step 4: Build RAG prompt
-            prompt = self.llm_service.build_rag_prompt(question, context_chunks)
+            # Step 3b: Pack context chunks into the token budget
+            with timer.stage("pack"):
+                packer = ContextPacker(
+                    token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                    tokenizer=self.llm_service.get_tokenizer(),
+                    dedup_threshold=settings.CONTEXT_DEDUP_THRESHOLD
+                )
+                context_chunks = packer.pack([
+                    {**result, "text": result.get("excerpt", result["text"])}
+                    for result in search_results
+                ]).texts
+                
+                # Step 4: Build RAG prompt
+                prompt = self.llm_service.build_rag_prompt(question, context_chunks)
             
             # Step 5: Generate answer
             logger.info("Generating answer with LLM")
-            answer = self.llm_service.generate_answer(prompt)
+            with timer.stage("generate"):
+                answer = await self.run_blocking(self.llm_service.generate_answer, prompt)
             
             # Step 6: Format sources
             sources = [
                 {
-                    "text": result["text"][:500] + ("..." if len(result["text"]) > 500 else ""),
+                    "text": result.get("excerpt") or (
+                        result["text"][:500] + ("..." if len(result["text"]) > 500 else "")
+                    ),
                     "document_name": result["document_name"],
                     "chunk_index": result["chunk_index"],
-                    "similarity_score": round(result["similarity_score"], 4)
+                    "collection": result["collection"],
+                    "similarity_score": round(result["similarity_score"], 4),
+                    "highlights": result.get("highlights", []),
+                    "also_in": list(dict.fromkeys(
+                        d["document_name"] for d in result.get("duplicates", [])
+                        if d["document_name"] != result["document_name"]
+                    ))
                 }
                 for result in search_results
             ]
@@ -191,6 +406,143 @@ class RAGService:
             logger.error(f"Failed to answer question: {e}")
             raise
     
+    def _retrieve(
+        self,
+        question: str,
+        collection: Union[str, List[str]],
+        query_embedding,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        min_score: Optional[float],
+        rerank: bool,
+        timer: StageTimer
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the collections, rerank and compress the results, holding the
+        collections loaded so none is unloaded and reloaded in between.
+        
+        Returns:
+            The results to build the context from, best first
+        """
+        names = [collection] if isinstance(collection, str) else list(dict.fromkeys(collection))
+        with self._use_collections(names):
+            # Step 2: Search FAISS (over-retrieve candidates when reranking)
+            search_k = max(top_k, settings.RERANK_CANDIDATES) if rerank else top_k
+            logger.info(f"Searching FAISS for top {search_k} results")
+            with timer.stage("search"):
+                results = self.search_collections(
+                    names, query_embedding, search_k, filters=filters, min_score=min_score
+                )
+            
+            # Step 2b: Rerank candidates and keep only the best few
+            if rerank and results:
+                with timer.stage("rerank"):
+                    results = self.rerank_service.rerank(
+                        question,
+                        results,
+                        top_k=min(settings.RERANK_TOP_K, top_k),
+                        baseline_k=top_k
+                    )
+            
+            # Step 3: Keep only the query-relevant sentences of each chunk
+            if settings.SENTENCE_COMPRESSION and results:
+                with timer.stage("compress"):
+                    self._compress_results(results, query_embedding)
+        
+        return results
+    
+    @contextmanager
+    def _use_collections(self, names: List[str]) -> Iterator[Dict[str, Union[FAISSStore, ShardedStore]]]:
+        """Keep the named collections loaded while the block runs."""
+        with ExitStack() as stack:
+            yield {name: stack.enter_context(self.collections.use(name)) for name in names}
+    
+    def search_collections(
+        self,
+        collection: Union[str, List[str]],
+        query_embedding,
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        min_score: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search one or more collections. Results from several collections are
+        merged by similarity score (all share one embedding model) and each
+        result is tagged with its "collection".
+        
+        Args:
+            collection: Collection name, or a list of names
+            query_embedding: The query embedding
+            top_k: Number of results to return
+            filters: Optional metadata filters applied inside the vector search
+            min_score: Optional minimum similarity score
+            
+        Returns:
+            Search results, best first
+        """
+        names = [collection] if isinstance(collection, str) else list(dict.fromkeys(collection))
+        results = []
+        with self._use_collections(names) as stores:
+            for name, store in stores.items():
+                for result in store.search(query_embedding, top_k, filters=filters, min_score=min_score):
+                    result["collection"] = name
+                    results.append(result)
+        
+        if len(names) > 1:
+            results = heapq.nlargest(top_k, results, key=lambda result: result["similarity_score"])
+            for rank, result in enumerate(results, 1):
+                result["rank"] = rank
+        return results
+    
+    def _compress_results(
+        self, 
+        results: List[Dict[str, Any]], 
+        query_embedding
+    ) -> None:
+        """
+        Attach an "excerpt" of the most query-relevant sentences (plus their
+        neighbours) and its "highlights" to each result that has sentence data.
+        
+        Args:
+            results: Search results to compress in place
+            query_embedding: The already computed query embedding
+        """
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            by_collection.setdefault(result.get("collection", DEFAULT_COLLECTION), []).append(result)
+        
+        with self._use_collections(list(by_collection)) as stores:
+            for collection, group in by_collection.items():
+                selections = stores[collection].sentences.select(
+                    [result["index"] for result in group],
+                    query_embedding,
+                    top_n=settings.SENTENCE_TOP_N,
+                    neighbours=settings.SENTENCE_NEIGHBOURS
+                )
+                
+                for result, selected in zip(group, selections):
+                    if selected:
+                        result["excerpt"], result["highlights"] = build_excerpt(result["text"], selected)
+    
+    def collect_metrics(self):
+        """Mirror index size, cache and token counters into the metrics registry."""
+        INDEX_CHUNKS.set(self.faiss_store.get_total_chunks())
+        INDEX_DOCUMENTS.set(self.faiss_store.get_document_count())
+        COLLECTIONS_LOADED.set(len(self.collections.get_stats()["loaded"]))
+        
+        projection_stats = self.faiss_store.get_projection_stats()
+        if projection_stats and projection_stats["recall"] is not None:
+            PROJECTION_RECALL.set(projection_stats["recall"])
+        
+        rerank_stats = self.rerank_service.get_stats()
+        CACHE_HITS.set(rerank_stats["cache_hits"], cache="rerank")
+        CACHE_MISSES.set(rerank_stats["cache_misses"], cache="rerank")
+        
+        if readiness.is_ready("llm"):
+            llm_stats = self.llm_service.get_stats()
+            LLM_TOKENS.set(llm_stats["prompt_tokens"], direction="prompt")
+            LLM_TOKENS.set(llm_stats["generated_tokens"], direction="completion")
+    
     def get_index_stats(self) -> Dict[str, Any]:
         """Get statistics about the current FAISS index."""
         return {
@@ -198,28 +550,35 @@ class RAGService:
             "total_chunks": self.faiss_store.get_total_chunks(),
             "documents": self.faiss_store.get_all_documents(),
             "embedding_dimension": self.embedding_service.get_dimension(),
-            "llm_loaded": self.llm_service.is_loaded()
+            "index_type": settings.INDEX_TYPE,
+            "llm_loaded": readiness.is_ready("llm") and self.llm_service.is_loaded(),
+            "llm": self.llm_service.get_stats() if readiness.is_ready("llm") else None,
+            "rerank": self.rerank_service.get_stats(),
+            "projection": self.faiss_store.get_projection_stats(),
+            "collections": self.collections.get_stats()
         }
     
-    def delete_document(self, document_name: str) -> int:
+    def delete_document(self, document_name: str, collection: str = DEFAULT_COLLECTION) -> int:
         """
         Delete a document from the index.
         
         Args:
             document_name: Name of the document to delete
+            collection: Collection holding the document
             
         Returns:
             Number of chunks deleted
         """
-        # Delete from FAISS
-        deleted_count = self.faiss_store.delete_document(document_name)
-        
-        if deleted_count > 0:
-            self.faiss_store.save_index()
+        with self.collections.use(collection) as store, self._write_lock(collection):
+            # Delete from FAISS
+            deleted_count = store.delete_document(document_name)
             
-            # Delete stored file
-            doc_path = settings.DOCUMENTS_PATH / document_name
-            if doc_path.exists():
-                doc_path.unlink()
+            if deleted_count > 0:
+                store.save_index()
+                
+                # Delete stored file
+                doc_path = self._document_path(collection, document_name)
+                if doc_path.exists():
+                    doc_path.unlink()
         
         return deleted_count
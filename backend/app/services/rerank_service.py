@@ -0,0 +1,244 @@
+"""
+Rerank service for refining vector search results with a cross-encoder.
+Scores (question, chunk) pairs jointly so fewer, better chunks reach the LLM.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from threading import Lock
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RerankService:
+    """
+    Batched cross-encoder reranking with an LRU score cache.
+    Implements singleton pattern for efficient model loading.
+    """
+    
+    _instance = None
+    _model = None
+    _load_lock = Lock()
+    
+    def __new__(cls):
+        """Singleton pattern to ensure model is loaded only once."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        """Initialize the score cache, worker and metrics."""
+        if self._initialized:
+            return
+        self._initialized = True
+        
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = Lock()
+        # Single worker: scoring runs off the request thread so it can be abandoned
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        # A batch abandoned at its deadline that is still running; new batches
+        # would only queue behind it, so requests fall back until it finishes
+        self._stale: Optional[Future] = None
+        # Requests rerank from concurrent worker threads
+        self._stats_lock = Lock()
+        self._stats = {
+            "requests": 0,
+            "fallbacks": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "tokens_saved_total": 0,
+            "last_tokens_saved": 0,
+            "last_latency_ms": 0.0,
+        }
+    
+    def _load_model(self):
+        """Load the cross-encoder model."""
+        try:
+            from sentence_transformers import CrossEncoder
+            
+            logger.info(f"Loading rerank model: {settings.RERANK_MODEL}")
+            RerankService._model = CrossEncoder(settings.RERANK_MODEL)
+            logger.info("Rerank model loaded successfully")
+        except Exception as e:
+            logger.error(f"Failed to load rerank model: {e}")
+            raise RuntimeError(f"Failed to load rerank model: {e}")
+    
+    @property
+    def model(self):
+        """Get the loaded cross-encoder."""
+        if RerankService._model is None:
+            with self._load_lock:
+                if RerankService._model is None:
+                    self._load_model()
+        return RerankService._model
+    
+    def rerank(
+        self, 
+        question: str, 
+        results: List[Dict[str, Any]],
+        top_k: Optional[int] = None,
+        baseline_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Reorder search results by cross-encoder score and keep the best top_k.
+        Falls back to vector order if scoring exceeds the latency budget,
+        an abandoned batch is still running, or scoring fails.
+        
+        Args:
+            question: User's question
+            results: Candidates from FAISS, in vector-similarity order
+            top_k: Number of results to keep (default: RERANK_TOP_K)
+            baseline_k: Chunks that would have been sent without reranking,
+                used for the tokens-saved metric
+            
+        Returns:
+            The top_k results, each with a "rerank_score" if scored
+        """
+        top_k = top_k or settings.RERANK_TOP_K
+        baseline_k = baseline_k or top_k
+        
+        if not results:
+            return []
+        
+        start_time = time.time()
+        self._count("requests")
+        
+        scores = self._cached_scores(question, results)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        
+        if missing:
+            # Load the model before the deadline starts, so the first request
+            # is reranked rather than timing out while the model loads
+            try:
+                self.model
+            except Exception as e:
+                self._count("fallbacks")
+                logger.error(f"Rerank model unavailable, using vector order: {e}")
+                return results[:top_k]
+            
+            stale = self._stale
+            if stale is not None and not stale.done():
+                self._count("fallbacks")
+                logger.warning("Previous rerank batch still running, using vector order")
+                return results[:top_k]
+            
+            pairs = [(question, results[i]["text"]) for i in missing]
+            future = self._executor.submit(self._score_pairs, pairs)
+            try:
+                new_scores = future.result(timeout=settings.RERANK_TIMEOUT_MS / 1000)
+            except FutureTimeout:
+                # A queued batch is dropped; a running one keeps going and still
+                # warms the cache for next time
+                if not future.cancel():
+                    self._stale = future
+                self._count("fallbacks")
+                logger.warning(
+                    f"Rerank exceeded {settings.RERANK_TIMEOUT_MS}ms budget, "
+                    f"using vector order"
+                )
+                return results[:top_k]
+            except Exception as e:
+                self._count("fallbacks")
+                logger.error(f"Rerank failed, using vector order: {e}")
+                return results[:top_k]
+            
+            for i, score in zip(missing, new_scores):
+                scores[i] = score
+        
+        ranked = sorted(
+            zip(scores, range(len(results))),
+            key=lambda pair: pair[0],
+            reverse=True
+        )[:top_k]
+        reranked = []
+        for rank, (score, i) in enumerate(ranked):
+            reranked.append({**results[i], "rank": rank + 1, "rerank_score": float(score)})
+        
+        tokens_saved = self._count_tokens(results[:baseline_k]) - self._count_tokens(reranked)
+        latency_ms = (time.time() - start_time) * 1000
+        with self._stats_lock:
+            self._stats["tokens_saved_total"] += max(tokens_saved, 0)
+            self._stats["last_tokens_saved"] = tokens_saved
+            self._stats["last_latency_ms"] = round(latency_ms, 2)
+        
+        logger.info(
+            f"Reranked {len(results)} candidates to {len(reranked)} in {latency_ms:.1f}ms "
+            f"({len(missing)} scored, {tokens_saved} prompt tokens saved)"
+        )
+        
+        return reranked
+    
+    def _count(self, stat: str):
+        """Increment a counter in the stats."""
+        with self._stats_lock:
+            self._stats[stat] += 1
+    
+    def _score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Score pairs in one batched forward pass and store them in the cache."""
+        scores = self.model.predict(
+            pairs,
+            batch_size=settings.RERANK_BATCH_SIZE,
+            show_progress_bar=False
+        )
+        scores = [float(s) for s in scores]
+        
+        with self._cache_lock:
+            for (question, text), score in zip(pairs, scores):
+                self._cache[self._cache_key(question, text)] = score
+            while len(self._cache) > settings.RERANK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        
+        return scores
+    
+    def _cached_scores(
+        self, 
+        question: str, 
+        results: List[Dict[str, Any]]
+    ) -> List[Optional[float]]:
+        """Look up cached scores, marking hits as most recently used."""
+        scores: List[Optional[float]] = []
+        with self._cache_lock:
+            for result in results:
+                key = self._cache_key(question, result["text"])
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    self._stats["cache_hits"] += 1
+                else:
+                    self._stats["cache_misses"] += 1
+                scores.append(score)
+        return scores
+    
+    @staticmethod
+    def _cache_key(question: str, text: str) -> Tuple[str, str]:
+        """Cache key for a (question, chunk) pair."""
+        normalized = " ".join(question.lower().split())
+        return normalized, hashlib.sha1(text.encode("utf-8")).hexdigest()
+    
+    def _count_tokens(self, results: List[Dict[str, Any]]) -> int:
+        """Count tokens of result texts, estimating if no tokenizer is loaded."""
+        tokenizer = getattr(RerankService._model, "tokenizer", None)
+        texts = [result["text"] for result in results]
+        if tokenizer is None:
+            return sum(len(text) // 4 for text in texts)
+        return sum(
+            len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get reranking metrics."""
+        requests = max(self._stats["requests"], 1)
+        return {
+            **self._stats,
+            "avg_tokens_saved": round(self._stats["tokens_saved_total"] / requests, 1),
+            "cache_size": len(self._cache),
+            "model": settings.RERANK_MODEL,
+            "model_loaded": RerankService._model is not None
+        }
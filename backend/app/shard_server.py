@@ -0,0 +1,293 @@
+"""
+Shard server for sharded mode (SHARD_URLS).
+Holds one shard of every collection in its own FAISS_INDEX_PATH and answers
+the coordinator (app/db/sharded_store.py): search, sentence selection,
+duplicate lookup and writes. It loads no models.
+
+Run one shard:
+    python -m app.shard_server --port 8101 --index-path data/shards/0
+Run N local shard processes (prints the SHARD_URLS to use):
+    python -m app.shard_server --local 4
+Split an existing index into N shard directories:
+    python -m app.shard_server --split 4 --by document
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.db.collection_manager import CollectionManager, CollectionNotFoundError, DEFAULT_COLLECTION
+from app.db.faiss_store import FAISSStore
+from app.db.sharded_store import SHARD_KEYS, decode_array, shard_for
+
+logging.basicConfig(
+    level=logging.INFO if settings.DEBUG else logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+_manager: Optional[CollectionManager] = None
+
+
+def get_manager() -> CollectionManager:
+    """Collections of this shard, loaded on first request."""
+    global _manager
+    if _manager is None:
+        _manager = CollectionManager(settings.FAISS_INDEX_PATH)
+    return _manager
+
+
+class CollectionRequest(BaseModel):
+    collection: str = DEFAULT_COLLECTION
+
+
+class SearchRequest(CollectionRequest):
+    embedding: Dict[str, Any]
+    top_k: int = 5
+    filters: Optional[Dict[str, Any]] = None
+    min_score: Optional[float] = None
+
+
+class SentencesRequest(CollectionRequest):
+    chunk_ids: List[int]
+    embedding: Dict[str, Any]
+    top_n: int = 3
+    neighbours: int = 1
+
+
+class DuplicatesRequest(CollectionRequest):
+    texts: List[str]
+
+
+class AddRequest(CollectionRequest):
+    embeddings: Dict[str, Any]
+    metadata: List[Dict[str, Any]]
+    sentence_spans: Optional[List[List[Tuple[int, int]]]] = None
+    sentence_embeddings: Optional[Dict[str, Any]] = None
+
+
+class ReferencesRequest(CollectionRequest):
+    references: List[Tuple[int, Dict[str, Any]]]
+
+
+class DeleteRequest(CollectionRequest):
+    document_name: str
+
+
+app = FastAPI(title=f"{settings.APP_NAME} shard", version=settings.APP_VERSION)
+
+
+@app.exception_handler(CollectionNotFoundError)
+async def collection_not_found_handler(request: Request, exc: CollectionNotFoundError):
+    """404 tells the coordinator this shard holds no part of the collection."""
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+
+@app.get("/livez")
+def livez():
+    return {"status": "ok"}
+
+
+@app.post("/search")
+def search(request: SearchRequest):
+    store = get_manager().get(request.collection)
+    results = store.search(
+        decode_array(request.embedding),
+        request.top_k,
+        filters=request.filters,
+        min_score=request.min_score
+    )
+    return {"results": results}
+
+
+@app.post("/sentences")
+def sentences(request: SentencesRequest):
+    store = get_manager().get(request.collection)
+    selections = store.sentences.select(
+        request.chunk_ids,
+        decode_array(request.embedding),
+        top_n=request.top_n,
+        neighbours=request.neighbours
+    )
+    return {"selections": selections}
+
+
+@app.post("/duplicates")
+def duplicates(request: DuplicatesRequest):
+    with get_manager().use(request.collection, create=True) as store:
+        return {"duplicates": store.find_duplicates(request.texts)}
+
+
+@app.post("/add")
+def add(request: AddRequest):
+    sentence_embeddings = None
+    if request.sentence_embeddings is not None:
+        sentence_embeddings = decode_array(request.sentence_embeddings)
+    with get_manager().use(request.collection, create=True) as store:
+        added = store.add_embeddings(
+            decode_array(request.embeddings),
+            request.metadata,
+            sentence_spans=request.sentence_spans,
+            sentence_embeddings=sentence_embeddings
+        )
+    return {"added": added}
+
+
+@app.post("/references")
+def references(request: ReferencesRequest):
+    with get_manager().use(request.collection) as store:
+        return {"added": store.add_references(request.references)}
+
+
+@app.post("/save")
+def save(request: CollectionRequest):
+    with get_manager().use(request.collection) as store:
+        return {"saved": store.save_index()}
+
+
+@app.post("/delete")
+def delete(request: DeleteRequest):
+    manager = get_manager()
+    if not manager.exists(request.collection):
+        return {"deleted": 0}
+    with manager.use(request.collection) as store:
+        return {"deleted": store.delete_document(request.document_name)}
+
+
+@app.get("/stats")
+def stats(collection: Optional[str] = None):
+    manager = get_manager()
+    if collection is None:
+        return {
+            "index_path": str(settings.FAISS_INDEX_PATH),
+            **{k: v for k, v in manager.get_stats().items() if k != "collections"}
+        }
+    store = manager.get(collection)
+    return {
+        "total_chunks": store.get_total_chunks(),
+        "documents": store.get_all_documents()
+    }
+
+
+@app.get("/collections")
+def collections():
+    return {"collections": get_manager().list_collections()}
+
+
+def split_index(source: Path, root: Path, num_shards: int, shard_by: str) -> Dict[str, List[int]]:
+    """
+    Split the collections of a local index into shard directories
+    root/0 .. root/N-1, with the same routing the coordinator uses.
+
+    Args:
+        source: FAISS_INDEX_PATH of the local index
+        root: Directory for the shard indexes
+        num_shards: Number of shards
+        shard_by: "document" or "chunk"
+
+    Returns:
+        Chunks per shard, by collection
+    """
+    collections = [(DEFAULT_COLLECTION, source)]
+    collections_dir = source / "collections"
+    if collections_dir.exists():
+        collections.extend(
+            (path.name, path) for path in sorted(collections_dir.iterdir())
+            if (path / "metadata.json").exists()
+        )
+
+    counts: Dict[str, List[int]] = {}
+    for name, path in collections:
+        store = FAISSStore(path)
+        owners: List[List[int]] = [[] for _ in range(num_shards)]
+        for vector_id, meta in enumerate(store.metadata):
+            shard = shard_for(meta.get("document_name", ""), meta.get("text", ""), num_shards, shard_by)
+            owners[shard].append(vector_id)
+
+        for shard, ids in enumerate(owners):
+            target = root / str(shard)
+            if name != DEFAULT_COLLECTION:
+                target = target / "collections" / name
+            part = FAISSStore(target)
+            if part.get_total_chunks():
+                raise ValueError(f"{target} already holds an index")
+            if ids:
+                sentences = store.sentences
+                rows = np.concatenate(
+                    [np.arange(sentences.offsets[i], sentences.offsets[i + 1]) for i in ids]
+                ).astype(np.int64)
+                embeddings, spans = sentences.take(rows)
+                spans = np.split(spans, np.cumsum(np.diff(sentences.offsets)[ids])[:-1])
+                part.add_embeddings(
+                    store.index.reconstruct_batch(np.asarray(ids, dtype=np.int64)),
+                    [store.metadata[i] for i in ids],
+                    sentence_spans=[chunk_spans.tolist() for chunk_spans in spans],
+                    sentence_embeddings=embeddings.astype(np.float32)
+                )
+            part.save_index()
+        counts[name] = [len(ids) for ids in owners]
+        logger.info(f"Split collection '{name}' into {num_shards} shards: {counts[name]}")
+    return counts
+
+
+def run_local(num_shards: int, base_port: int, root: Path):
+    """Start num_shards shard processes on consecutive ports and wait."""
+    urls = [f"http://127.0.0.1:{base_port + shard}" for shard in range(num_shards)]
+    processes = [
+        subprocess.Popen([
+            sys.executable, "-m", "app.shard_server",
+            "--port", str(base_port + shard),
+            "--index-path", str(root / str(shard))
+        ], cwd=Path(__file__).resolve().parents[1])
+        for shard in range(num_shards)
+    ]
+    print(f"SHARD_URLS={json.dumps(urls)}")
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard server for sharded FAISS search")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--local", type=int, metavar="N", help="start N local shard processes")
+    mode.add_argument("--split", type=int, metavar="N", help="split FAISS_INDEX_PATH into N shards")
+    parser.add_argument("--port", type=int, default=8101, help="port (first port with --local)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--index-path", type=Path, help="this shard's index directory")
+    parser.add_argument("--root", type=Path, default=settings.DATA_DIR / "shards",
+                        help="shard directories for --local and --split")
+    parser.add_argument("--by", choices=SHARD_KEYS, default=settings.SHARD_BY,
+                        help="route chunks by document or by chunk hash (--split)")
+    args = parser.parse_args()
+
+    if args.split:
+        split_index(settings.FAISS_INDEX_PATH, args.root, args.split, args.by)
+    elif args.local:
+        run_local(args.local, args.port, args.root)
+    else:
+        import uvicorn
+
+        if args.index_path:
+            settings.FAISS_INDEX_PATH = args.index_path
+        settings.FAISS_INDEX_PATH.mkdir(parents=True, exist_ok=True)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
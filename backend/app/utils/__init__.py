@@ -1,3 +1,4 @@
 # Utility functions package
 from .pdf_parser import PDFParser
 from .text_chunker import TextChunker
+from .context_packer import ContextPacker
@@ -0,0 +1,240 @@
+"""
+Context packing utility for building compact, token-budgeted LLM context.
+Merges overlapping neighbour chunks, drops near-duplicates, and fills a token
+budget in relevance order.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Prefix length used to locate the overlap between neighbouring chunks
+_OVERLAP_PROBE_CHARS = 32
+# Appended to a span cut to fit the budget
+_TRUNCATION_SUFFIX = " ..."
+
+
+@dataclass
+class ContextSpan:
+    """A contiguous span of one document built from one or more chunks."""
+    text: str
+    document_name: str
+    chunk_indices: List[int]
+    rank: int  # Best (lowest) relevance rank among the merged chunks
+    tokens: int = 0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PackedContext:
+    """Result of packing search results into a token budget."""
+    spans: List[ContextSpan]
+    tokens_before: int
+    tokens_after: int
+    merged_chunks: int
+    dropped_duplicates: int
+    dropped_for_budget: int
+
+    @property
+    def texts(self) -> List[str]:
+        """Span texts in relevance order, ready for prompt building."""
+        return [span.text for span in self.spans]
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into a token budget for the LLM prompt.
+    Uses the LLM tokenizer when available and a character estimate otherwise.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        tokenizer: Optional[Any] = None,
+        dedup_threshold: float = 0.85,
+        shingle_size: int = 5
+    ):
+        """
+        Initialize the packer.
+
+        Args:
+            token_budget: Maximum number of context tokens to emit
+            tokenizer: HuggingFace tokenizer used to count tokens
+            dedup_threshold: Shingle Jaccard similarity above which a span
+                is considered a near-duplicate of an already selected one
+            shingle_size: Number of words per shingle for duplicate detection
+        """
+        self.token_budget = token_budget
+        self.tokenizer = tokenizer
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens in text with the configured tokenizer."""
+        if self.tokenizer is None:
+            # Roughly 4 characters per token for English text
+            return max(1, len(text) // 4)
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def pack(self, results: List[Dict[str, Any]]) -> PackedContext:
+        """
+        Pack search results into the token budget.
+
+        Args:
+            results: Search results in relevance order, each with "text",
+                "document_name" and "chunk_index"
+
+        Returns:
+            PackedContext with the selected spans and token accounting
+        """
+        tokens_before = sum(self.count_tokens(r["text"]) for r in results)
+
+        spans = self._merge_neighbours(results)
+        merged_chunks = len(results) - len(spans)
+        spans.sort(key=lambda span: span.rank)
+
+        selected: List[ContextSpan] = []
+        selected_shingles: List[Set[str]] = []
+        dropped_duplicates = 0
+        dropped_for_budget = 0
+        remaining = self.token_budget
+
+        for span in spans:
+            shingles = self._shingles(span.text)
+            if any(
+                self._jaccard(shingles, other) >= self.dedup_threshold
+                for other in selected_shingles
+            ):
+                dropped_duplicates += 1
+                continue
+
+            span.tokens = self.count_tokens(span.text)
+            if span.tokens > remaining:
+                # Trim the span to what is left if that is still worth sending
+                if remaining < 64:
+                    dropped_for_budget += 1
+                    continue
+                span.text = self._truncate(span.text, remaining)
+                span.tokens = self.count_tokens(span.text)
+
+            selected.append(span)
+            selected_shingles.append(shingles)
+            remaining -= span.tokens
+
+        packed = PackedContext(
+            spans=selected,
+            tokens_before=tokens_before,
+            tokens_after=sum(span.tokens for span in selected),
+            merged_chunks=merged_chunks,
+            dropped_duplicates=dropped_duplicates,
+            dropped_for_budget=dropped_for_budget
+        )
+
+        logger.info(
+            f"Packed context: {packed.tokens_before} -> {packed.tokens_after} tokens "
+            f"(budget {self.token_budget}, {len(results)} chunks -> {len(selected)} spans, "
+            f"{merged_chunks} merged, {dropped_duplicates} duplicates dropped)"
+        )
+
+        return packed
+
+    def _merge_neighbours(self, results: List[Dict[str, Any]]) -> List[ContextSpan]:
+        """Collapse adjacent chunks of the same document into single spans."""
+        by_document: Dict[str, List[tuple]] = {}
+        for rank, result in enumerate(results):
+            by_document.setdefault(result["document_name"], []).append((rank, result))
+
+        spans: List[ContextSpan] = []
+        for document_name, items in by_document.items():
+            items.sort(key=lambda item: item[1]["chunk_index"])
+            current: Optional[ContextSpan] = None
+
+            for rank, result in items:
+                index = result["chunk_index"]
+                if current is not None and index - current.chunk_indices[-1] <= 1:
+                    current.text = self.join_overlapping(current.text, result["text"])
+                    current.chunk_indices.append(index)
+                    current.rank = min(current.rank, rank)
+                    continue
+
+                if current is not None:
+                    spans.append(current)
+                current = ContextSpan(
+                    text=result["text"],
+                    document_name=document_name,
+                    chunk_indices=[index],
+                    rank=rank,
+                    metadata={k: v for k, v in result.items() if k != "text"}
+                )
+
+            if current is not None:
+                spans.append(current)
+
+        return spans
+
+    @staticmethod
+    def join_overlapping(left: str, right: str) -> str:
+        """
+        Join two consecutive chunks, writing their shared overlap only once.
+
+        Args:
+            left: Earlier chunk
+            right: Following chunk, whose head may repeat the tail of left
+
+        Returns:
+            Combined text
+        """
+        if not right or right in left:
+            return left
+
+        probe = right[:_OVERLAP_PROBE_CHARS]
+        # Search from the end: the shortest matching overlap never drops text
+        start = left.rfind(probe)
+        while start != -1:
+            tail = left[start:]
+            if right.startswith(tail):
+                return left + right[len(tail):]
+            start = left.rfind(probe, 0, start + len(probe) - 1)
+
+        return left + "\n" + right
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text to at most max_tokens including the truncation suffix,
+        preferring a sentence boundary.
+        """
+        ids = None if self.tokenizer is None else self.tokenizer.encode(text, add_special_tokens=False)
+        limit = max_tokens - self.count_tokens(_TRUNCATION_SUFFIX)
+        while True:
+            if ids is None:
+                cut = text[:max(limit, 0) * 4]
+            else:
+                cut = self.tokenizer.decode(ids[:max(limit, 0)])
+
+            boundary = max(cut.rfind(". "), cut.rfind("\n"))
+            if boundary > len(cut) // 2:
+                cut = cut[:boundary + 1]
+            truncated = cut.rstrip() + _TRUNCATION_SUFFIX
+            # Decoding and re-encoding can merge tokens differently at the cut
+            excess = self.count_tokens(truncated) - max_tokens
+            if excess <= 0 or limit <= 0:
+                return truncated
+            limit -= excess
+
+    def _shingles(self, text: str) -> Set[str]:
+        """Word n-gram shingles used for near-duplicate detection."""
+        words = re.findall(r"\w+", text.lower())
+        n = self.shingle_size
+        if len(words) < n:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+    @staticmethod
+    def _jaccard(a: Set[str], b: Set[str]) -> float:
+        """Jaccard similarity of two shingle sets."""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -0,0 +1,110 @@
+"""
+MinHash / LSH near-duplicate detection for chunks at ingest.
+Chunks are compared by the Jaccard similarity of their word shingles,
+estimated from MinHash signatures; LSH banding keeps lookups sub-linear.
+"""
+
+import logging
+import re
+import zlib
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime 2^31 - 1: (a * x + b) stays below 2^63 for 32-bit hashes
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class MinHashLSH:
+    """
+    In-memory LSH index over MinHash signatures.
+    Keys are whatever the caller uses to identify a chunk (e.g. vector ids).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            threshold: Estimated Jaccard similarity at or above which two
+                chunks are near-duplicates
+            num_perm: Number of hash permutations per signature
+            bands: LSH bands; num_perm / bands rows each. More bands find
+                less similar candidates (at the cost of more comparisons)
+            shingle_size: Number of words per shingle
+            seed: Seed of the permutation parameters (fixed so signatures
+                stay comparable across runs)
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (num_perm uint32 values) of a text's shingles."""
+        words = re.findall(r"\w+", text.lower())
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        ) % _PRIME
+        # One row per permutation, minimum over the shingles
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        """Index a signature under key."""
+        self._signatures[key] = signature
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[Hashable, float]]:
+        """
+        Find the most similar indexed chunk at or above the threshold.
+
+        Args:
+            signature: Signature of the chunk to look up
+
+        Returns:
+            (key, estimated similarity) of the best match, or None
+        """
+        candidates = set()
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            candidates.update(bucket.get(band, ()))
+
+        best: Optional[Tuple[Hashable, float]] = None
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self.rows:(i + 1) * self.rows].tobytes()
+            for i in range(self.bands)
+        ]
@@ -6,7 +6,6 @@ Supports multiple PDF parsing libraries with fallback options.
 import logging
 from pathlib import Path
 from typing import Optional
-import fitz  # PyMuPDF - fast and reliable PDF parsing
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +39,9 @@ class PDFParser:
         try:
             text_content = []
             
-            # Open PDF with PyMuPDF
+            # Open PDF with PyMuPDF (imported on first use to keep startup fast)
+            import fitz
+            
             with fitz.open(file_path) as doc:
                 logger.info(f"Processing PDF: {file_path.name} ({len(doc)} pages)")
                 
@@ -81,6 +82,8 @@ class PDFParser:
             text_content = []
             
             # Open PDF from bytes
+            import fitz
+            
             with fitz.open(stream=content, filetype="pdf") as doc:
                 logger.info(f"Processing PDF from bytes: {filename} ({len(doc)} pages)")
                 
@@ -113,6 +116,8 @@ class PDFParser:
             raise ValueError(f"File not found: {file_path}")
         
         try:
+            import fitz
+            
             with fitz.open(file_path) as doc:
                 metadata = doc.metadata
                 
@@ -1,15 +1,25 @@
 """
 Text chunking utility for splitting documents into smaller pieces.
 Implements various chunking strategies for optimal RAG performance.
+Sentence and paragraph boundaries are found in one pass over the text and
+looked up per window with bisect, so chunking is linear in the text length.
+Chunks can be sized in characters or in tokens of the embedding tokenizer.
 """
 
+import bisect
 import logging
 import re
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Sentence end: punctuation followed by whitespace
+_SENTENCE_BREAK = re.compile(r'[.!?]\s')
+# Part of each window searched backwards for a break point
+_BREAK_WINDOW = 0.2
+
 
 @dataclass
 class TextChunk:
@@ -27,19 +37,39 @@ class TextChunker:
     Uses a sliding window approach with configurable size and overlap.
     """
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        tokenizer: Optional[Any] = None,
+        token_cache_size: int = 10000
+    ):
         """
         Initialize the chunker with specified parameters.
         
         Args:
-            chunk_size: Target size of each chunk in characters
-            chunk_overlap: Number of characters to overlap between chunks
+            chunk_size: Target size of each chunk (characters, or tokens with a tokenizer)
+            chunk_overlap: Overlap between chunks, in the same unit
+            tokenizer: Fast HuggingFace tokenizer of the embedding model; when
+                given, chunks are sized in its tokens so none exceeds the
+                model's sequence length
+            token_cache_size: Texts whose token counts are cached
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer
+        self._token_cache: "OrderedDict[str, int]" = OrderedDict()
+        self._token_cache_size = token_cache_size
         
         if chunk_overlap >= chunk_size:
             raise ValueError("Chunk overlap must be less than chunk size")
+        if tokenizer is not None and not getattr(tokenizer, "is_fast", False):
+            raise ValueError("Token-sized chunking needs a fast tokenizer (offset mapping)")
+    
+    @property
+    def unit(self) -> str:
+        """Unit of chunk_size and chunk_overlap."""
+        return "tokens" if self.tokenizer is not None else "chars"
     
     def chunk_text(
         self, 
@@ -63,34 +93,20 @@ class TextChunker:
         
         # Clean the text
         text = self._clean_text(text)
+        breaks = self._find_breaks(text)
         
-        chunks = []
-        start = 0
-        chunk_index = 0
+        if self.tokenizer is not None:
+            spans = self._token_windows(text, breaks)
+        else:
+            spans = self._char_windows(text, breaks)
         
-        while start < len(text):
-            # Calculate end position
-            end = start + self.chunk_size
-            
-            # If we're not at the end, try to find a good break point
-            if end < len(text):
-                # Look for sentence endings (., !, ?) within the last 20% of the chunk
-                search_start = end - int(self.chunk_size * 0.2)
-                search_text = text[search_start:end]
-                
-                # Find last sentence boundary
-                last_break = self._find_last_sentence_break(search_text)
-                
-                if last_break != -1:
-                    end = search_start + last_break + 1
-            else:
-                end = len(text)
-            
-            # Extract chunk text
+        chunks = []
+        for start, end in spans:
             chunk_text = text[start:end].strip()
             
             if chunk_text:  # Only add non-empty chunks
-                chunk = TextChunk(
+                chunk_index = len(chunks)
+                chunks.append(TextChunk(
                     text=chunk_text,
                     index=chunk_index,
                     start_char=start,
@@ -100,16 +116,7 @@ class TextChunker:
                         "chunk_index": chunk_index,
                         "char_count": len(chunk_text)
                     }
-                )
-                chunks.append(chunk)
-                chunk_index += 1
-            
-            # Move start position with overlap
-            start = end - self.chunk_overlap
-            
-            # Prevent infinite loop
-            if start >= len(text) - self.chunk_overlap:
-                break
+                ))
         
         logger.info(
             f"Created {len(chunks)} chunks from {document_name} "
@@ -118,6 +125,155 @@ class TextChunker:
         
         return chunks
     
+    def _char_windows(self, text: str, breaks: Tuple[List[int], List[int]]) -> List[Tuple[int, int]]:
+        """
+        Character windows of chunk_size, each cut back to the last break
+        in its final 20%, overlapping by chunk_overlap.
+        
+        Args:
+            text: Cleaned text
+            breaks: Sentence and newline positions from _find_breaks
+            
+        Returns:
+            List of (start, end) character spans
+        """
+        spans = []
+        start = 0
+        
+        while start < len(text):
+            # Calculate end position
+            end = start + self.chunk_size
+            
+            # If we're not at the end, try to find a good break point
+            if end < len(text):
+                search_start = end - int(self.chunk_size * _BREAK_WINDOW)
+                end = self._last_break(breaks, search_start, end)
+            else:
+                end = len(text)
+            
+            spans.append((start, end))
+            
+            # Move start position with overlap (always forward)
+            start = max(end - self.chunk_overlap, start + 1)
+            
+            # Prevent infinite loop
+            if start >= len(text) - self.chunk_overlap:
+                break
+        
+        return spans
+    
+    def _token_windows(self, text: str, breaks: Tuple[List[int], List[int]]) -> List[Tuple[int, int]]:
+        """
+        Windows of at most chunk_size tokens. The text is tokenized once; token
+        offsets map each window to characters before cutting it back to a break.
+        
+        Args:
+            text: Cleaned text
+            breaks: Sentence and newline positions from _find_breaks
+            
+        Returns:
+            List of (start, end) character spans
+        """
+        offsets = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False
+        )["offset_mapping"]
+        if not offsets:
+            return [(0, len(text))] if text else []
+        token_starts = [s for s, _ in offsets]
+        
+        spans = []
+        first = 0
+        while first < len(offsets):
+            last = min(first + self.chunk_size, len(offsets))
+            start, end = token_starts[first], offsets[last - 1][1]
+            
+            if last < len(offsets):
+                search_start = token_starts[last - int(self.chunk_size * _BREAK_WINDOW)]
+                end = self._last_break(breaks, search_start, end)
+            else:
+                end = len(text)
+            spans.append((start, end))
+            
+            if last == len(offsets):
+                break
+            # First token at or after the cut, stepped back by the overlap
+            next_first = bisect.bisect_left(token_starts, end) - self.chunk_overlap
+            first = max(next_first, first + 1)
+        
+        return spans
+    
+    def _find_breaks(self, text: str) -> Tuple[List[int], List[int]]:
+        """
+        All break candidates of the text, found in one pass each.
+        
+        Args:
+            text: Text to scan
+            
+        Returns:
+            Sorted positions of sentence-ending punctuation and of newlines
+        """
+        sentences = [m.start() for m in _SENTENCE_BREAK.finditer(text)]
+        newlines = [m.start() for m in re.finditer('\n', text)]
+        return sentences, newlines
+    
+    @staticmethod
+    def _last_break(breaks: Tuple[List[int], List[int]], search_start: int, end: int) -> int:
+        """
+        Cut point for a window ending at `end`: just after the last sentence
+        end in [search_start, end), else after the last newline, else `end`.
+        
+        Args:
+            breaks: Sentence and newline positions from _find_breaks
+            search_start: First position a break may be at
+            end: Window end (exclusive)
+            
+        Returns:
+            New end position of the window
+        """
+        sentences, newlines = breaks
+        # The whitespace after the punctuation must be inside the window too
+        i = bisect.bisect_right(sentences, end - 2) - 1
+        if i >= 0 and sentences[i] >= search_start:
+            return sentences[i] + 1
+        i = bisect.bisect_right(newlines, end - 1) - 1
+        if i >= 0 and newlines[i] >= search_start:
+            return newlines[i] + 1
+        return end
+    
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Token counts of texts (characters without a tokenizer). Uncached texts
+        are tokenized in one batch call; counts are kept in an LRU cache.
+        
+        Args:
+            texts: Texts to measure
+            
+        Returns:
+            Token count per text
+        """
+        if self.tokenizer is None:
+            return [len(t) for t in texts]
+        
+        missing = list(dict.fromkeys(t for t in texts if t not in self._token_cache))
+        if missing:
+            encoded = self.tokenizer(
+                missing, add_special_tokens=False, return_attention_mask=False, verbose=False
+            )["input_ids"]
+            for text, ids in zip(missing, encoded):
+                self._token_cache[text] = len(ids)
+        
+        counts = []
+        for text in texts:
+            counts.append(self._token_cache[text])
+            self._token_cache.move_to_end(text)
+        while len(self._token_cache) > self._token_cache_size:
+            self._token_cache.popitem(last=False)
+        return counts
+    
     def _clean_text(self, text: str) -> str:
         """
         Clean and normalize text for better chunking.
@@ -144,29 +300,6 @@ class TextChunker:
         
         return text.strip()
     
-    def _find_last_sentence_break(self, text: str) -> int:
-        """
-        Find the last sentence boundary in the text.
-        
-        Args:
-            text: Text to search for sentence breaks
-            
-        Returns:
-            Index of last sentence break, or -1 if not found
-        """
-        # Look for sentence endings followed by space or end
-        matches = list(re.finditer(r'[.!?]\s', text))
-        
-        if matches:
-            return matches[-1].start()
-        
-        # If no sentence break, try to break at paragraph
-        newline_pos = text.rfind('\n')
-        if newline_pos != -1:
-            return newline_pos
-        
-        return -1
-    
     def chunk_by_paragraphs(
         self, 
         text: str, 
@@ -186,7 +319,9 @@ class TextChunker:
             List of TextChunk objects
         """
         text = self._clean_text(text)
-        paragraphs = text.split('\n\n')
+        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+        # One batch tokenization for all paragraphs in token mode
+        sizes = self.count_tokens(paragraphs)
         
         chunks = []
         current_chunk = []
@@ -194,13 +329,7 @@ class TextChunker:
         chunk_index = 0
         start_char = 0
         
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            
-            para_size = len(para)
-            
+        for para, para_size in zip(paragraphs, sizes):
             # If adding this paragraph exceeds chunk_size, save current chunk
             if current_size + para_size > self.chunk_size and current_chunk:
                 chunk_text = '\n\n'.join(current_chunk)
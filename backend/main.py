@@ -5,12 +5,18 @@ Provides REST API endpoints for the React frontend
 
 from __future__ import annotations
 
+import asyncio
+import json
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import numpy as np
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -24,8 +30,25 @@ if str(SCRIPTS) not in sys.path:
 load_dotenv(ROOT / ".env")
 
 from embedding import EmbeddingModel, DEFAULT_EMBEDDING_MODEL
-from llm_wrapper import generate_answer, DEFAULT_LLM_MODEL
-from vector import FaissVectorStore
+from llm_wrapper import generate_answer_async, stream_answer_async, DEFAULT_LLM_MODEL
+from llm_client import close_llm_client, get_llm_client
+from vector import FaissVectorStore, duplicate_sources
+from shards import ShardedVectorStore
+from fast_path import get_fast_path, FAST_PATH_ENABLED
+from context_packer import pack_context, get_llm_tokenizer
+from sentences import format_preview
+from rerank import CrossEncoderReranker, RERANK_ENABLED, RERANK_CANDIDATES, RERANK_TOP_K
+from voice import SpeechToText, TextToSpeech, DEFAULT_VOICE, HAS_EDGE_TTS, HAS_WHISPER
+from app.core.metrics import (
+    metrics, observe_request, observe_stages, route_template,
+    CONTENT_TYPE, CACHE_HITS, CACHE_MISSES, FAST_PATH, LLM_TOKENS, INDEX_CHUNKS,
+)
+from app.core.readiness import readiness
+from app.core.timing import StageTimer
+
+WARMUP_QUERY = "What are the fundamental rights of citizens of Nepal?"
+# Route each query to per-domain / per-Act shards instead of one flat index (opt-in)
+SHARDED_INDEX = os.getenv("SHARDED_INDEX", "false").lower() in ("1", "true", "yes")
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -54,7 +77,9 @@ app.add_middleware(
 
 # Global resources
 model: Optional[EmbeddingModel] = None
-store: Optional[FaissVectorStore] = None
+store: Optional[Union[FaissVectorStore, ShardedVectorStore]] = None
+reranker: Optional[CrossEncoderReranker] = None
+stt: Optional[SpeechToText] = None
 
 
 class SearchRequest(BaseModel):
@@ -62,107 +87,544 @@ class SearchRequest(BaseModel):
     top_k: int = 8
     use_llm: bool = True
     llm_model: str = DEFAULT_LLM_MODEL
+    # Metadata filters pushed into the FAISS search, e.g. {"type": "legal", "year": ["2063", "2074"]}
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None
+    min_score: float = 0.3
+    # Over-retrieve and rerank with a cross-encoder (defaults to RERANK_ENABLED)
+    rerank: Optional[bool] = None
+    # Return the per-stage timing breakdown (ms) in the response
+    debug: bool = False
+    # Answer navigation/emergency questions from the structured service data when
+    # a single service matches confidently; elaborate=True still has the LLM
+    # write the answer, from the matched service instead of retrieved chunks
+    fast_path: bool = True
+    elaborate: bool = False
 
 
 class SearchResponse(BaseModel):
     answer: str
     sources: str
+    timings: Optional[Dict[str, float]] = None
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Load embedding model and FAISS store on startup."""
+def _collect_metrics():
+    """Mirror index size, rerank cache and LLM token counts before a scrape."""
+    if store is not None:
+        INDEX_CHUNKS.set(len(store.metadata))
+    if reranker is not None:
+        CACHE_HITS.set(reranker.stats["cache_hits"], cache="rerank")
+        CACHE_MISSES.set(reranker.stats["cache_misses"], cache="rerank")
+    llm_stats = get_llm_client().get_stats()
+    LLM_TOKENS.set(llm_stats["prompt_tokens"], direction="prompt")
+    LLM_TOKENS.set(llm_stats["completion_tokens"], direction="completion")
+
+
+metrics.add_collector(_collect_metrics)
+
+
+def _load_resources():
+    """Load the embedding model, FAISS store and LLM tokenizer, then time a warm-up search."""
     global model, store
-    
-    print("[Startup] Starting up backend...")
-    try:
+
+    with readiness.loading("embedding"):
         print("[Startup] Loading embedding model...")
-        model = EmbeddingModel()
+        embedding_model = EmbeddingModel()
         print("[Startup] Embedding model loaded.")
 
-        print("[Startup] Loading FAISS vector store...")
-        index_path = ROOT / "database" / "legal_faiss.index"
-        metadata_path = ROOT / "database" / "legal_faiss_meta.json"
-        print(f"[Startup] Index path: {index_path}, Metadata path: {metadata_path}")
+    with readiness.loading("index") as state:
+        if SHARDED_INDEX:
+            vector_store = _load_sharded_store(embedding_model, state)
+        else:
+            vector_store = _load_flat_store(embedding_model, state)
+        state.details["total_chunks"] = len(vector_store.metadata)
+
+    start = time.perf_counter()
+    vector_store.search(WARMUP_QUERY, embedding_model=embedding_model, top_k=8, compress=True)
+    readiness.record_warmup("search", (time.perf_counter() - start) * 1000)
 
-        store = FaissVectorStore(
-            index_path=index_path,
-            metadata_path=metadata_path
+    # Cached after the first call, which may download it from the hub
+    get_llm_tokenizer()
+
+    # Publish only fully loaded resources to request handlers
+    model, store = embedding_model, vector_store
+    print(f"[Startup] Ready (warm-up search {readiness.snapshot()['warmup_ms']['search']} ms)")
+
+
+def _load_sharded_store(embedding_model: EmbeddingModel, state) -> ShardedVectorStore:
+    print("[Startup] Loading sharded FAISS store...")
+    vector_store = ShardedVectorStore(shard_dir=ROOT / "database" / "shards")
+    if vector_store.exists():
+        vector_store.load()
+    else:
+        print("[Startup] Shards not found. Building them from processed documents...")
+        state.details["building"] = True
+        vector_store.build(
+            processed_dir=ROOT / "dataset" / "processed",
+            navigation_dir=ROOT / "dataset" / "navigation",
+            embedding_model=embedding_model,
         )
+        state.details["building"] = False
+    state.details["shards"] = len(vector_store.shards)
+    print(f"[Startup] Loaded {len(vector_store.shards)} shards ({len(vector_store.metadata)} chunks)")
+    return vector_store
 
-        if index_path.exists() and metadata_path.exists():
-            print("[Startup] Index files found. Loading...")
-            store.load()
-            print(f"[Startup] FAISS index loaded successfully! (chunks: {len(store.metadata)})")
-        else:
-            print("[Startup] Index files not found. Building FAISS index from processed documents...")
-            store.build(processed_dir=ROOT / "dataset" / "processed", embedding_model=model)
-            print("[Startup] FAISS index built successfully!")
+
+def _load_flat_store(embedding_model: EmbeddingModel, state) -> FaissVectorStore:
+    print("[Startup] Loading FAISS vector store...")
+    index_path = ROOT / "database" / "legal_faiss.index"
+    metadata_path = ROOT / "database" / "legal_faiss_meta.json"
+    print(f"[Startup] Index path: {index_path}, Metadata path: {metadata_path}")
+
+    vector_store = FaissVectorStore(
+        index_path=index_path,
+        metadata_path=metadata_path
+    )
+
+    if index_path.exists() and metadata_path.exists():
+        print("[Startup] Index files found. Loading...")
+        vector_store.load()
+        print(f"[Startup] FAISS index loaded successfully! (chunks: {len(vector_store.metadata)})")
+    else:
+        print("[Startup] Index files not found. Building FAISS index from processed documents...")
+        state.details["building"] = True
+        vector_store.build(processed_dir=ROOT / "dataset" / "processed", embedding_model=embedding_model)
+        state.details["building"] = False
+        print("[Startup] FAISS index built successfully!")
+    return vector_store
+
+
+async def _warm_up():
+    try:
+        await asyncio.to_thread(_load_resources)
     except Exception as e:
         print(f"[Startup] ERROR: {e}")
-        raise
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count every request and record its latency per route."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        observe_request(request.method, route_template(request.scope), status, time.perf_counter() - start)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start loading the embedding model and FAISS store in the background."""
+    print("[Startup] Starting up backend...")
+    readiness.register("embedding", "index")
+    if FAST_PATH_ENABLED:
+        get_fast_path()  # alias index is small; load it before the first request
+    app.state.warm_up_task = asyncio.create_task(_warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled LLM connections."""
+    await close_llm_client()
+
+
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up, regardless of loading state."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe: per-component load state and warm-up latency (503 until ready)."""
+    snapshot = readiness.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {
-        "status": "healthy",
+        "status": "healthy" if store is not None else "starting",
         "model_loaded": model is not None,
-        "store_loaded": store is not None
+        "store_loaded": store is not None,
+        "chunks": len(store.metadata) if store is not None else 0,
+        "shards": store.get_stats() if isinstance(store, ShardedVectorStore) else None,
+        "fast_path": get_fast_path().get_stats() if FAST_PATH_ENABLED else None
     }
 
 
-@app.post("/api/search", response_model=SearchResponse)
-async def search_and_answer(request: SearchRequest):
-    """Search FAISS and optionally generate LLM answer."""
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus metrics: requests, per-stage latency histograms, cache hits, LLM tokens, index size."""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
+def _sources_text(hits: List[Dict]) -> str:
+    sources_text = ""
+    for i, hit in enumerate(hits, 1):
+        meta = hit.get("metadata", {})
+        source = meta.get("filename", meta.get("title", "Unknown"))
+        year = meta.get("year", "")
+        text_preview = format_preview(hit)
+        also_in = duplicate_sources(hit)
+        if also_in:
+            source += f"; also in {', '.join(also_in)}"
+        sources_text += f"\n\n**{i}. {source}** ({year})\n> {text_preview}"
+    return sources_text
+
+
+async def _fast_path_answer(request: SearchRequest, match: Dict, timer: StageTimer) -> str:
+    """Templated answer for a matched service, or an LLM answer over just that service."""
+    fast_path = get_fast_path()
+    if not (request.elaborate and request.use_llm):
+        FAST_PATH.inc(result="answered")
+        with timer.stage("render"):
+            return fast_path.answer(match)
+
+    FAST_PATH.inc(result="elaborated")
+    try:
+        with timer.stage("generate"):
+            return await generate_answer_async(
+                request.question,
+                [fast_path.context(match)],
+                chunk_metadata=[fast_path.source(match)],
+                model=request.llm_model,
+            )
+    except Exception as e:
+        # The structured answer is still correct without the LLM
+        print(f"[Search] ERROR during LLM elaboration, using templated answer: {e}")
+        return fast_path.answer(match)
+
+
+def _retrieve(request: SearchRequest, timer: StageTimer) -> List[Dict]:
+    """Embed, search, compress and optionally rerank (raises ValueError on bad filters)."""
+    global reranker
+    use_rerank = RERANK_ENABLED if request.rerank is None else request.rerank
+    with timer.stage("embed"):
+        query_emb = model.embed([request.question]).astype(np.float32)
+    with timer.stage("search"):
+        hits = store.search_vector(
+            query_emb,
+            top_k=max(request.top_k, RERANK_CANDIDATES) if use_rerank else request.top_k,
+            min_score=request.min_score,
+            filters=request.filters,
+            question=request.question,
+        )
+    with timer.stage("compress"):
+        store.compress_hits(hits, query_emb)
+    print(f"[Search] Found {len(hits)} hits.")
+
+    if use_rerank and hits:
+        reranker = reranker or CrossEncoderReranker()
+        with timer.stage("rerank"):
+            hits = reranker.rerank(
+                request.question, hits, top_k=min(RERANK_TOP_K, request.top_k), baseline_k=request.top_k
+            )
+    return hits
+
+
+def _require_resources():
     if model is None or store is None:
-        print("[Search] ERROR: Resources not loaded yet (model or store is None)")
-        raise HTTPException(status_code=503, detail="Resources not loaded yet")
+        print("[Search] Resources still loading, rejecting request")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Resources not loaded yet: {readiness.snapshot()['components']}",
+            headers={"Retry-After": "5"},
+        )
+
+
+async def _answer_stream(request: SearchRequest, timer: StageTimer) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Streamed answer as ("sources", markdown) followed by ("token", text delta) events.
+    Uses the structured fast path when it matches; retrieval runs off the event loop.
+    """
+    fast_path = get_fast_path() if FAST_PATH_ENABLED and request.fast_path and not request.filters else None
+    match = None
+    if fast_path is not None:
+        with timer.stage("fastpath"):
+            match = fast_path.match(request.question)
+        elaborate = request.elaborate and request.use_llm
+        FAST_PATH.inc(result="fallback" if match is None else "elaborated" if elaborate else "answered")
+
+    if match is not None:
+        yield "sources", _sources_text([{"text": fast_path.context(match), "metadata": fast_path.source(match)}])
+        if not elaborate:
+            timer.mark("first_token")
+            yield "token", fast_path.answer(match)
+            return
+        context, metadata = [fast_path.context(match)], [fast_path.source(match)]
+    else:
+        _require_resources()
+        try:
+            hits = await asyncio.to_thread(_retrieve, request, timer)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        yield "sources", _sources_text(hits)
+        if not request.use_llm:
+            yield "token", "Here are the relevant sources I found:"
+            return
+        with timer.stage("pack"):
+            context, metadata = pack_context(hits, tokenizer=get_llm_tokenizer())
+
+    with timer.stage("generate"):
+        async for delta in stream_answer_async(
+            request.question, context, chunk_metadata=metadata, model=request.llm_model
+        ):
+            timer.mark("first_token")
+            yield "token", delta
+
+
+@app.post("/api/search", response_model=SearchResponse)
+async def search_and_answer(request: SearchRequest, response: Response):
+    """Search FAISS and optionally generate LLM answer (stage times in Server-Timing)."""
+    timer = StageTimer()
+    # Structured fast path first: it needs neither the embedding model nor the index
+    if FAST_PATH_ENABLED and request.fast_path and not request.filters:
+        fast_path = get_fast_path()
+        with timer.stage("fastpath"):
+            match = fast_path.match(request.question)
+        if match is not None:
+            print(f"[Search] Fast path: {match['entry']['name']} (confidence {match['confidence']})")
+            answer = await _fast_path_answer(request, match, timer)
+            hit = {"text": fast_path.context(match), "metadata": fast_path.source(match)}
+            response.headers["Server-Timing"] = timer.server_timing()
+            observe_stages("api-search-fastpath", timer)
+            return SearchResponse(
+                answer=answer,
+                sources=_sources_text([hit]),
+                timings=timer.as_dict() if request.debug else None,
+            )
+        FAST_PATH.inc(result="fallback")
+
+    _require_resources()
 
     print(f"[Search] Received question: {request.question}")
-    print(f"[Search] top_k: {request.top_k}, use_llm: {request.use_llm}, llm_model: {request.llm_model}")
+    print(f"[Search] top_k: {request.top_k}, use_llm: {request.use_llm}, llm_model: {request.llm_model}, filters: {request.filters}")
     try:
         # Search FAISS
         print("[Search] Searching FAISS index...")
-        hits = store.search(request.question, embedding_model=model, top_k=request.top_k)
-        print(f"[Search] Found {len(hits)} hits.")
+        try:
+            hits = await asyncio.to_thread(_retrieve, request, timer)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         # Build sources text
-        sources_text = ""
-        for i, hit in enumerate(hits, 1):
-            meta = hit.get("metadata", {})
-            source = meta.get("filename", meta.get("title", "Unknown"))
-            year = meta.get("year", "")
-            text_preview = hit["text"][:400] + "..." if len(hit["text"]) > 400 else hit["text"]
-            sources_text += f"\n\n**{i}. {source}** ({year})\n> {text_preview}"
+        sources_text = _sources_text(hits)
 
         if request.use_llm:
             try:
                 print("[Search] Generating answer with LLM...")
-                context = [h["text"] for h in hits]
-                metadata = [h.get("metadata", {}) for h in hits]
-                answer = generate_answer(request.question, context, chunk_metadata=metadata, model=request.llm_model)
+                with timer.stage("pack"):
+                    context, metadata = pack_context(hits, tokenizer=get_llm_tokenizer())
+                with timer.stage("generate"):
+                    answer = await generate_answer_async(
+                        request.question, context, chunk_metadata=metadata, model=request.llm_model
+                    )
                 print("[Search] LLM answer generated.")
-                return SearchResponse(answer=answer, sources=sources_text)
             except Exception as e:
                 print(f"[Search] ERROR during LLM answer generation: {e}")
-                return SearchResponse(
-                    answer=f"⚠️ Error generating response: {e}",
-                    sources=sources_text
-                )
+                answer = f"⚠️ Error generating response: {e}"
         else:
             print("[Search] Returning sources only (no LLM answer)")
-            return SearchResponse(
-                answer="Here are the relevant sources I found:",
-                sources=sources_text
-            )
+            answer = "Here are the relevant sources I found:"
+
+        response.headers["Server-Timing"] = timer.server_timing()
+        observe_stages("api-search", timer)
+        return SearchResponse(
+            answer=answer,
+            sources=sources_text,
+            timings=timer.as_dict() if request.debug else None,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[Search] ERROR: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/search/stream")
+async def search_and_answer_stream(request: SearchRequest):
+    """
+    Same as /api/search, streamed as NDJSON events while the answer is generated:
+    {"type": "sources"}, {"type": "token"} per delta, then {"type": "done", "timings"}
+    or {"type": "error", "status", "detail"}.
+    """
+    print(f"[Search] Streaming answer for: {request.question}")
+    timer = StageTimer()
+
+    async def events():
+        try:
+            async for event, value in _answer_stream(request, timer):
+                payload = {"type": event, "sources" if event == "sources" else "text": value}
+                yield json.dumps(payload) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"type": "error", "status": e.status_code, "detail": e.detail}) + "\n"
+            return
+        except Exception as e:
+            print(f"[Search] ERROR while streaming: {e}")
+            yield json.dumps({"type": "error", "status": 500, "detail": str(e)}) + "\n"
+            return
+        observe_stages("api-search-stream", timer)
+        yield json.dumps({"type": "done", "timings": timer.as_dict()}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _get_stt() -> Optional[SpeechToText]:
+    global stt
+    if stt is None and HAS_WHISPER:
+        stt = SpeechToText()
+    return stt
+
+
+async def _voice_turn(websocket_send, audio: Optional[bytes], question: Optional[str], options: Dict):
+    """
+    One question/answer turn of a voice session. Stages overlap: answer tokens
+    feed a sentence-pipelined TTS stream, so the first sentence is spoken
+    while the rest of the answer is still being generated.
+    """
+    send_json, send_audio = websocket_send
+    timer = StageTimer()
+    speaker = None
+    try:
+        if question is None:
+            recognizer = _get_stt()
+            if recognizer is None:
+                await send_json({"type": "error", "detail": "Speech-to-text is not available"})
+                return
+            with timer.stage("stt"):
+                question = await recognizer.transcribe_async(audio)
+            await send_json({"type": "transcript", "text": question})
+            if not question or question.startswith("[Error"):
+                await send_json({"type": "error", "detail": question or "No speech detected"})
+                return
+        print(f"[Voice] Question: {question}")
+        request = SearchRequest(question=question, **options.get("search", {}))
+
+        # Answer deltas go to the client and, through this queue, to TTS
+        deltas: asyncio.Queue = asyncio.Queue()
+
+        async def text_stream() -> AsyncIterator[str]:
+            while (delta := await deltas.get()) is not None:
+                yield delta
+
+        async def speak():
+            tts = TextToSpeech(voice=options.get("voice") or DEFAULT_VOICE)
+            with timer.stage("tts"):
+                async for frame in tts.stream_async(text_stream()):
+                    timer.mark("first_audio")
+                    await send_audio(frame)
+
+        if options.get("speak", True) and HAS_EDGE_TTS:
+            speaker = asyncio.create_task(speak())
+
+        answer = []
+        try:
+            async for event, value in _answer_stream(request, timer):
+                if event == "sources":
+                    await send_json({"type": "sources", "sources": value})
+                else:
+                    answer.append(value)
+                    deltas.put_nowait(value)
+                    await send_json({"type": "token", "text": value})
+        finally:
+            deltas.put_nowait(None)
+        if speaker is not None:
+            await speaker
+
+        observe_stages("voice", timer)
+        await send_json({"type": "done", "answer": "".join(answer), "timings": timer.as_dict()})
+    except asyncio.CancelledError:
+        raise
+    except HTTPException as e:
+        await send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+    except Exception as e:
+        print(f"[Voice] ERROR: {e}")
+        await send_json({"type": "error", "detail": str(e)})
+    finally:
+        if speaker is not None and not speaker.done():
+            speaker.cancel()
+
+
+@app.websocket("/ws/voice")
+async def voice_session(websocket: WebSocket):
+    """
+    Full-duplex voice session.
+
+    Client -> server:
+        {"type": "config", "voice": ..., "speak": true, "search": {SearchRequest fields}}
+        binary frames: WAV audio of one utterance, then {"type": "end"}
+        {"type": "text", "question": ...} to skip speech-to-text
+        {"type": "cancel"} to stop the current answer (a new utterance also does)
+
+    Server -> client:
+        {"type": "transcript"}, {"type": "sources"}, {"type": "token"} per answer delta,
+        binary MP3 frames per spoken sentence, then {"type": "done", "answer", "timings"}
+        or {"type": "error", "detail"}.
+    """
+    await websocket.accept()
+    lock = asyncio.Lock()
+
+    async def send_json(payload: Dict):
+        async with lock:
+            await websocket.send_text(json.dumps(payload))
+
+    async def send_audio(frame: bytes):
+        async with lock:
+            await websocket.send_bytes(frame)
+
+    options: Dict = {}
+    audio = bytearray()
+    turn: Optional[asyncio.Task] = None
+
+    def start_turn(audio_bytes: Optional[bytes], question: Optional[str]) -> asyncio.Task:
+        if turn is not None:
+            turn.cancel()  # barge-in: the newest question wins
+        return asyncio.create_task(_voice_turn((send_json, send_audio), audio_bytes, question, dict(options)))
+
+    await send_json({
+        "type": "ready",
+        "stt": HAS_WHISPER,
+        "tts": HAS_EDGE_TTS,
+        "audio_format": "audio/mpeg",
+    })
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                audio.extend(message["bytes"])
+                continue
+            try:
+                data = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                await send_json({"type": "error", "detail": "Expected a JSON control message"})
+                continue
+            kind = data.get("type")
+            if kind == "config":
+                options.update({k: v for k, v in data.items() if k in ("voice", "speak", "search")})
+                options.get("search", {}).pop("question", None)
+            elif kind == "end":
+                if audio:
+                    turn = start_turn(bytes(audio), None)
+                audio = bytearray()
+            elif kind == "text":
+                turn = start_turn(None, data.get("question", ""))
+            elif kind == "cancel":
+                if turn is not None:
+                    turn.cancel()
+                audio = bytearray()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if turn is not None:
+            turn.cancel()
+
+
 if __name__ == "__main__":
     import os
     import uvicorn
@@ -0,0 +1,83 @@
+# Synchronous client for the FastAPI backend (backend/main.py), used by the
+# Streamlit app in client mode. One httpx.Client keeps connections alive
+# across questions; answers are read from /api/search/stream as NDJSON
+# events so tokens can be rendered as they arrive.
+# Reads BACKEND_URL and BACKEND_TIMEOUT_S from .env.
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+BACKEND_URL = os.getenv("BACKEND_URL", "")  # Empty: Streamlit loads the model and index itself
+BACKEND_TIMEOUT_S = float(os.getenv("BACKEND_TIMEOUT_S", "120"))
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+class BackendClient:
+
+    def __init__(self, base_url: str = BACKEND_URL, timeout_s: float = BACKEND_TIMEOUT_S) -> None:
+        if not base_url:
+            raise ValueError("BACKEND_URL is not set")
+        self.client = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(timeout_s, connect=10.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=60.0),
+        )
+
+    def health(self) -> Dict:
+        response = self.client.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+    def stream_search(self, question: str, **params) -> Iterator[Dict]:
+        # Events from /api/search/stream: "sources", "token"..., then "done".
+        # Error events (e.g. 503 while the backend is loading) raise BackendError.
+        try:
+            with self.client.stream("POST", "/api/search/stream", json={"question": question, **params}) as response:
+                if response.is_error:
+                    response.read()
+                    raise BackendError(f"HTTP {response.status_code}: {response.text[:200]}")
+                for line in response.iter_lines():
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "error":
+                        raise BackendError(event.get("detail") or "Backend error")
+                    yield event
+        except httpx.HTTPError as e:
+            raise BackendError(f"Backend unreachable at {self.client.base_url}: {e}") from e
+
+    def search(self, question: str, **params) -> Dict:
+        response = self.client.post("/api/search", json={"question": question, **params})
+        if response.is_error:
+            raise BackendError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def close(self) -> None:
+        self.client.close()
+
+
+_client: Optional[BackendClient] = None
+
+
+def get_backend_client() -> BackendClient:
+    global _client
+    if _client is None:
+        _client = BackendClient()
+    return _client
+
+
+__all__ = ["BackendClient", "BackendError", "get_backend_client", "BACKEND_URL"]
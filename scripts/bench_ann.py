@@ -0,0 +1,463 @@
+# ANN retrieval benchmark.
+# Embeds the real chunk set (dataset/processed/*_chunks.json plus the
+# navigation services), optionally scales it synthetically to 100k, 1M or
+# 10M vectors, and for every index mode measures build time, memory, single
+# and batched query latency, range-search latency (the min_score path of
+# FaissVectorStore) and recall@k against exact IndexFlatIP ground truth.
+#
+# Synthetic vectors are noisy copies of real ones (renormalized), so the
+# cluster structure of the corpus is kept. They are generated block by block
+# from a seed, and ground truth is computed by streaming the same blocks, so
+# large scales never hold more than one copy of the vectors per index.
+#
+#   python scripts/bench_ann.py --scales real 100k --indexes flat binary pca opq hnsw ivf
+#   python scripts/bench_ann.py --scales 1m --indexes flat ivf ivfpq --nprobe 8 32 --output results/ann.csv
+#   python scripts/bench_ann.py --embeddings database/bench_embeddings.npy   # reuse cached embeddings
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+ROOT = Path(__file__).resolve().parents[1]
+# The binary and projected modes run the backend's own classes
+BACKEND = ROOT / "backend"
+if str(BACKEND) not in sys.path:
+    sys.path.append(str(BACKEND))
+DEFAULT_CACHE = ROOT / "database" / "bench_embeddings.npy"
+BLOCK_SIZE = 100_000
+SCALES = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+# Largest index whose size is measured by serializing it
+SERIALIZE_LIMIT = 2_000_000
+
+
+def resident_mb() -> float:
+    # Current RSS from /proc (Linux); 0 where unavailable.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def load_real_embeddings(cache: Path, refresh: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    # Real chunk + navigation embeddings (cached to .npy) and embedded
+    # load-test questions to use as real queries (None when loaded from cache).
+    if cache.exists() and not refresh:
+        print(f"Loading cached embeddings from {cache}")
+        return np.load(cache).astype(np.float32), None
+
+    from embedding import EmbeddingModel
+    from vector import _load_navigation_data, _load_texts_and_metadata
+
+    texts, _ = _load_texts_and_metadata(str(ROOT / "dataset" / "processed"))
+    nav_texts, _ = _load_navigation_data(str(ROOT / "dataset" / "navigation"))
+    print(f"Embedding {len(texts)} legal chunks and {len(nav_texts)} navigation services...")
+    model = EmbeddingModel()
+    vectors = model.embed(texts + nav_texts).astype(np.float32)
+
+    questions_path = ROOT / "dataset" / "loadtest" / "questions.json"
+    questions = [q["question"] for q in json.loads(questions_path.read_text(encoding="utf-8"))["questions"]]
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    np.save(cache, vectors)
+    return vectors, model.embed(questions).astype(np.float32)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x /= np.linalg.norm(x, axis=1, keepdims=True) + 1e-12
+    return x
+
+
+def perturb(base: np.ndarray, count: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    # Noisy copies of random base vectors; `noise` is the noise norm relative
+    # to a unit vector (0.5 -> cosine ~0.89 with the parent).
+    parents = base[rng.integers(0, len(base), size=count)]
+    sigma = noise / math.sqrt(base.shape[1])
+    return _normalize(parents + rng.normal(0, sigma, size=parents.shape).astype(np.float32))
+
+
+def iter_blocks(base: np.ndarray, total: int, noise: float, seed: int) -> Iterator[np.ndarray]:
+    # The real vectors first, then deterministic synthetic blocks up to `total`.
+    yield base[:total]
+    produced, block_id = min(total, len(base)), 0
+    while produced < total:
+        size = min(BLOCK_SIZE, total - produced)
+        yield perturb(base, size, noise, np.random.default_rng([seed, block_id]))
+        produced += size
+        block_id += 1
+
+
+def exact_ground_truth(blocks: Iterator[np.ndarray], queries: np.ndarray, k: int) -> np.ndarray:
+    # Exact inner-product top-k by streaming blocks (same result as IndexFlatIP).
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    offset = 0
+    for block in blocks:
+        scores = queries @ block.T
+        kk = min(k, block.shape[0])
+        part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        merged_scores = np.hstack([best_scores, np.take_along_axis(scores, part, axis=1)])
+        merged_ids = np.hstack([best_ids, part + offset])
+        top = np.argsort(-merged_scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_ids = np.take_along_axis(merged_ids, top, axis=1)
+        offset += block.shape[0]
+    return best_ids
+
+
+# ---------------------------------------------------------------------------
+# Index modes
+# ---------------------------------------------------------------------------
+
+def _nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, with at least 39 training points per list.
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def _factory(description: Callable[[int, int], str]) -> Callable[[int, int], "faiss.Index"]:
+    def build(dim: int, n: int):
+        import faiss
+
+        return faiss.index_factory(dim, description(dim, n), faiss.METRIC_INNER_PRODUCT)
+    return build
+
+
+class ProjectedIndex:
+    # The PROJECTION_DIM first stage of FAISSStore (backend/app/db/projection.py):
+    # a PCA/OPQ projection fitted on the training sample, searched for
+    # PROJECTION_SHORTLIST x k candidates that are re-scored with the full
+    # vectors, which stay in memory in an IndexFlatIP as in the store.
+    # Dimension: PROJECTION_DIM, or a quarter of the input when it is 0.
+
+    def __init__(self, dim: int, method: str) -> None:
+        import faiss
+        from app.core.config import settings
+
+        self.method = method
+        self.d_out = settings.PROJECTION_DIM or dim // 4
+        self.shortlist = settings.PROJECTION_SHORTLIST
+        self.full = faiss.IndexFlatIP(dim)
+        self.projection = None
+        self.reduced = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.projection is not None
+
+    def train(self, sample: np.ndarray) -> None:
+        from app.db.projection import Projection
+
+        self.projection = Projection.fit(sample, self.d_out, self.method)
+        self.reduced = self.projection.build_index(np.empty((0, self.full.d), dtype=np.float32))
+
+    def add(self, vectors: np.ndarray) -> None:
+        self.full.add(vectors)
+        self.reduced.add(self.projection.apply(vectors))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        from app.db.projection import shortlist_search
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, q in enumerate(queries):
+            found_scores, found = shortlist_search(
+                self.reduced, self.projection, q[None, :], k,
+                shortlist=self.shortlist, full_vectors=self.full.reconstruct_batch
+            )
+            scores[i, :len(found)], ids[i, :len(found)] = found_scores, found
+        return scores, ids
+
+    def range_search(self, query: np.ndarray, min_score: float):
+        # The store filters the re-scored shortlist by min_score instead
+        raise RuntimeError("projected search has no range search")
+
+    def memory_bytes(self) -> int:
+        return 4 * (self.full.ntotal * self.full.d + self.reduced.ntotal * self.d_out)
+
+
+class BinaryIndex:
+    # INDEX_TYPE=binary of FAISSStore (backend/app/db/binary_index.py): sign
+    # codes searched by Hamming distance for BINARY_SHORTLIST x k candidates,
+    # re-scored with the float vectors, which are saved to a temporary file
+    # and memory-mapped as in the store.
+    is_trained = True
+
+    def __init__(self, dim: int) -> None:
+        from app.core.config import settings
+        from app.db.binary_index import BinaryFlatIndex
+
+        self._dir = tempfile.TemporaryDirectory(prefix="bench_binary_")
+        workdir = Path(self._dir.name)
+        self.codes_file = workdir / "index_binary.faiss"
+        self.index = BinaryFlatIndex(dim, workdir / "vectors.f32", settings.BINARY_SHORTLIST)
+
+    def add(self, vectors: np.ndarray) -> None:
+        self.index.add(vectors)
+
+    def finish(self) -> None:
+        self.index.save(self.codes_file)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, q in enumerate(queries):
+            found_scores, found = self.index.search(q[None, :], k)
+            scores[i, :found.shape[1]], ids[i, :found.shape[1]] = found_scores[0], found[0]
+        return scores, ids
+
+    def range_search(self, query: np.ndarray, min_score: float):
+        # The store filters the re-scored shortlist by min_score instead
+        raise RuntimeError("binary search has no range search")
+
+    def memory_bytes(self) -> int:
+        # Codes only: the float vectors are memory-mapped
+        return self.index.memory_bytes()
+
+
+# name -> (constructor(dim, n), search parameter name or None)
+# "flat" is what FAISSStore and FaissVectorStore use by default, "binary" is
+# FAISSStore's INDEX_TYPE=binary and "pca"/"opq" their PROJECTION_DIM first
+# stage; the others are candidates.
+INDEX_MODES: Dict[str, Tuple[Callable[[int, int], "faiss.Index"], Optional[str]]] = {
+    "flat": (_factory(lambda d, n: "Flat"), None),
+    "binary": (lambda d, n: BinaryIndex(d), None),
+    "pca": (lambda d, n: ProjectedIndex(d, "pca"), None),
+    "opq": (lambda d, n: ProjectedIndex(d, "opq"), None),
+    "sq8": (_factory(lambda d, n: "SQ8"), None),
+    "hnsw": (_factory(lambda d, n: "HNSW32,Flat"), "efSearch"),
+    "ivf": (_factory(lambda d, n: f"IVF{_nlist(n)},Flat"), "nprobe"),
+    "ivfpq": (_factory(lambda d, n: f"IVF{_nlist(n)},PQ{d // 8}x8"), "nprobe"),
+}
+
+
+def build_index(mode: str, dim: int, total: int, blocks: Callable[[], Iterator[np.ndarray]], train_size: int):
+    constructor, _ = INDEX_MODES[mode]
+    rss_before = resident_mb()
+    start = time.perf_counter()
+    index = constructor(dim, total)
+
+    train_s = 0.0
+    if not index.is_trained:
+        sample = np.vstack(list(_take(blocks(), train_size)))
+        t = time.perf_counter()
+        index.train(sample)
+        train_s = time.perf_counter() - t
+        del sample
+
+    for block in blocks():
+        index.add(block)
+    if hasattr(index, "finish"):
+        index.finish()
+    build_s = time.perf_counter() - start
+    rss_mb = resident_mb() - rss_before
+
+    # Exact size from a serialized copy, skipped where the copy itself would not fit;
+    # the backend's index classes report their own
+    index_mb = None
+    if hasattr(index, "memory_bytes"):
+        index_mb = index.memory_bytes() / (1024 * 1024)
+    elif total <= SERIALIZE_LIMIT:
+        import faiss
+
+        index_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+    return index, {
+        "build_s": round(build_s, 3),
+        "train_s": round(train_s, 3),
+        "rss_mb": round(rss_mb, 1),
+        "index_mb": round(index_mb, 1) if index_mb is not None else None,
+        "bytes_per_vector": round((index_mb if index_mb is not None else rss_mb) * 1024 * 1024 / total, 1),
+    }
+
+
+def _take(blocks: Iterator[np.ndarray], count: int) -> Iterator[np.ndarray]:
+    taken = 0
+    for block in blocks:
+        if taken >= count:
+            return
+        yield block[: count - taken]
+        taken += min(len(block), count - taken)
+
+
+def set_search_param(index, param: Optional[str], value: Optional[int]) -> None:
+    if param is None or value is None:
+        return
+    import faiss
+
+    faiss.ParameterSpace().set_index_parameter(index, param, value)
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int, single_queries: int, min_score: float) -> Dict:
+    single = []
+    for q in queries[:single_queries]:
+        t = time.perf_counter()
+        index.search(q[None, :], k)
+        single.append((time.perf_counter() - t) * 1000)
+    single.sort()
+
+    t = time.perf_counter()
+    _, ids = index.search(queries, k)
+    batch_ms = (time.perf_counter() - t) * 1000
+
+    recall = np.mean([len(set(found) & set(exact)) / k for found, exact in zip(ids, truth)])
+
+    # The min_score path of FaissVectorStore; not every index supports it
+    try:
+        t = time.perf_counter()
+        for q in queries[:single_queries]:
+            index.range_search(q[None, :], min_score)
+        range_ms = round((time.perf_counter() - t) * 1000 / min(single_queries, len(queries)), 3)
+    except RuntimeError:
+        range_ms = None
+
+    return {
+        "single_p50_ms": round(single[len(single) // 2], 3),
+        "single_p95_ms": round(single[min(len(single) - 1, int(len(single) * 0.95))], 3),
+        "batch_ms_per_query": round(batch_ms / len(queries), 4),
+        "batch_qps": round(len(queries) / (batch_ms / 1000), 1),
+        "range_ms": range_ms,
+        f"recall@{k}": round(float(recall), 4),
+    }
+
+
+def parse_scale(value: str, real_n: int) -> int:
+    if value == "real":
+        return real_n
+    if value.lower() in SCALES:
+        return SCALES[value.lower()]
+    return int(float(value))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(rows: List[Dict]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+def write_results(path: Path, rows: List[Dict], meta: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        path.write_text(json.dumps({"meta": meta, "results": rows}, indent=2), encoding="utf-8")
+    print(f"\nResults written to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index modes on the legal corpus")
+    parser.add_argument("--scales", nargs="+", default=["real", "100k"], help="real, 100k, 1m, 10m or a number")
+    parser.add_argument("--indexes", nargs="+", choices=list(INDEX_MODES), default=list(INDEX_MODES))
+    parser.add_argument("--embeddings", type=Path, default=DEFAULT_CACHE, help="cached corpus embeddings (.npy)")
+    parser.add_argument("--refresh", action="store_true", help="re-embed the corpus even if cached")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries")
+    parser.add_argument("--single-queries", type=int, default=100, help="queries timed one at a time")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--min-score", type=float, default=0.3, help="range-search threshold")
+    parser.add_argument("--noise", type=float, default=0.5, help="relative noise of synthetic vectors")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 32], help="IVF lists probed")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[64, 128], help="HNSW efSearch")
+    parser.add_argument("--train-size", type=int, default=200_000, help="max vectors used to train IVF/PQ")
+    parser.add_argument("--threads", type=int, help="FAISS OpenMP threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as .json or .csv")
+    args = parser.parse_args()
+
+    import faiss
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    base, question_vectors = load_real_embeddings(args.embeddings, args.refresh)
+    base = _normalize(np.ascontiguousarray(base, dtype=np.float32))
+    dim = base.shape[1]
+
+    # Real questions when available, topped up with held-out noisy copies
+    rng = np.random.default_rng([args.seed, 10_000_000])
+    extra = args.queries - (len(question_vectors) if question_vectors is not None else 0)
+    queries = perturb(base, max(extra, 0), args.noise, rng)
+    if question_vectors is not None:
+        queries = np.vstack([_normalize(question_vectors), queries])[: args.queries]
+
+    param_values = {"nprobe": args.nprobe, "efSearch": args.ef_search}
+    rows: List[Dict] = []
+    for scale in args.scales:
+        total = parse_scale(scale, len(base))
+        blocks = lambda: iter_blocks(base, total, args.noise, args.seed)  # noqa: E731
+        print(f"\n== {scale}: {total:,} vectors of dim {dim}")
+        t = time.perf_counter()
+        truth = exact_ground_truth(blocks(), queries, args.k)
+        print(f"Ground truth in {time.perf_counter() - t:.1f}s")
+
+        for mode in args.indexes:
+            index, build_stats = build_index(mode, dim, total, blocks, args.train_size)
+            _, param = INDEX_MODES[mode]
+            for value in param_values.get(param, [None]):
+                set_search_param(index, param, value)
+                row = {
+                    "scale": scale,
+                    "n": total,
+                    "index": mode,
+                    "params": f"{param}={value}" if param else "",
+                    **build_stats,
+                    **measure(index, queries, truth, args.k, args.single_queries, args.min_score),
+                }
+                rows.append(row)
+                print(f"  {mode:<6} {row['params']:<12} recall@{args.k} {row[f'recall@{args.k}']}  "
+                      f"p50 {row['single_p50_ms']} ms  batch {row['batch_qps']} q/s  build {row['build_s']} s")
+            del index
+
+    print()
+    print_table(rows)
+    meta = {
+        "git_commit": git_commit(),
+        "dim": dim,
+        "real_vectors": len(base),
+        "queries": len(queries),
+        "k": args.k,
+        "noise": args.noise,
+        "threads": faiss.omp_get_max_threads(),
+        "seed": args.seed,
+    }
+    if args.output:
+        write_results(args.output, rows, meta)
+
+
+if __name__ == "__main__":
+    main()
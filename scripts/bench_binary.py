@@ -0,0 +1,183 @@
+# Binary-index benchmark for INDEX_TYPE=binary (backend/app/db/binary_index.py).
+# Builds the sign-quantized index over the corpus embeddings, optionally
+# scaled synthetically like bench_ann.py, with the float vectors saved to a
+# memory-mapped file, and reports recall@k against exact flat search, single
+# query latency and resident bytes per vector for every shortlist size
+# (BINARY_SHORTLIST: candidates per result re-scored with the float vectors).
+# Resident bytes per chunk add the sentence store kept for extractive
+# compression (SENTENCE_COMPRESSION), measured on a sample with the corpus's
+# sentences per chunk: in memory for flat, memory-mapped for binary.
+# Real load-test questions are used as queries when the embeddings are not
+# cached, so recall reflects the legal queries.
+#
+#   python scripts/bench_binary.py
+#   python scripts/bench_binary.py --scales real 100k 1m --shortlist 5 10 20 40 -k 5 --output results/binary.json
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from bench_ann import (
+    DEFAULT_CACHE,
+    _normalize,
+    exact_ground_truth,
+    git_commit,
+    iter_blocks,
+    load_real_embeddings,
+    parse_scale,
+    perturb,
+    print_table,
+    write_results,
+)
+from corpus import iter_chunk_files
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+if str(BACKEND) not in sys.path:
+    sys.path.append(str(BACKEND))
+
+from app.db.binary_index import BinaryFlatIndex
+from app.db.sentence_store import SentenceStore, split_sentences
+
+SENTENCE_SAMPLE = 10_000
+
+
+def sentence_counts(processed_dir: Path) -> np.ndarray:
+    # Sentences per corpus chunk, split like the backend does at ingest
+    return np.array(
+        [len(split_sentences(text)) for _, text, _ in iter_chunk_files(processed_dir)], dtype=np.int64
+    )
+
+
+def sentence_bytes_per_chunk(counts: np.ndarray, dim: int, mmap: bool, workdir: Path) -> float:
+    # Resident bytes of a saved sentence store over SENTENCE_SAMPLE chunks
+    if not len(counts):
+        return 0.0
+    sample = np.resize(counts, SENTENCE_SAMPLE)
+    store = SentenceStore(workdir / f"sentences_{'mmap' if mmap else 'memory'}.npz", dim, mmap=mmap)
+    store.append([[(0, 1)] * int(c) for c in sample], np.zeros((int(sample.sum()), dim), dtype=np.float32))
+    store.save()
+    return round(store.memory_bytes() / SENTENCE_SAMPLE, 1)
+
+
+def timed_search(index, queries: np.ndarray, k: int) -> Dict:
+    found, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        times.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    times.sort()
+    return {
+        "found": found,
+        "p50_ms": round(times[len(times) // 2], 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+    }
+
+
+def recall(found: List[np.ndarray], truth: np.ndarray, k: int) -> float:
+    return round(float(np.mean([len(set(f.tolist()) & set(t.tolist())) / k for f, t in zip(found, truth)])), 4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the binary index with float re-scoring against flat search")
+    parser.add_argument("--scales", nargs="+", default=["real", "100k"], help="real, 100k, 1m, 10m or a number")
+    parser.add_argument("--embeddings", type=Path, default=DEFAULT_CACHE, help="cached corpus embeddings (.npy)")
+    parser.add_argument("--refresh", action="store_true", help="re-embed the corpus even if cached")
+    parser.add_argument("--shortlist", type=int, nargs="+", default=[1, 5, 10, 20, 40], help="candidates per result")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.5, help="relative noise of synthetic vectors and queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as .json or .csv")
+    args = parser.parse_args()
+
+    import faiss
+
+    base, question_vectors = load_real_embeddings(args.embeddings, args.refresh)
+    base = _normalize(np.ascontiguousarray(base, dtype=np.float32))
+    dim = base.shape[1]
+
+    # Real questions when available, topped up with noisy copies of chunks
+    rng = np.random.default_rng([args.seed, 10_000_000])
+    extra = args.queries - (len(question_vectors) if question_vectors is not None else 0)
+    queries = perturb(base, max(extra, 0), args.noise, rng)
+    if question_vectors is not None:
+        queries = np.vstack([_normalize(question_vectors), queries])[: args.queries]
+
+    rows: List[Dict] = []
+    workdir = Path(tempfile.mkdtemp(prefix="bench_binary_"))
+    counts = sentence_counts(ROOT / "dataset" / "processed")
+    if len(counts):
+        print(f"{counts.mean():.1f} sentences per chunk over {len(counts)} corpus chunks")
+    else:
+        print("No corpus chunks found, sentence data left out of resident bytes")
+    sentence_bytes = {
+        "flat": sentence_bytes_per_chunk(counts, dim, False, workdir),
+        "binary": sentence_bytes_per_chunk(counts, dim, True, workdir),
+    }
+    for scale in args.scales:
+        total = parse_scale(scale, len(base))
+        blocks = lambda: iter_blocks(base, total, args.noise, args.seed)  # noqa: E731
+        print(f"\n== {scale}: {total:,} vectors of dim {dim}")
+        truth = exact_ground_truth(blocks(), queries, args.k)
+
+        flat = faiss.IndexFlatIP(dim)
+        for block in blocks():
+            flat.add(block)
+        flat_search = timed_search(flat, queries, args.k)
+        rows.append({
+            "scale": scale,
+            "n": total,
+            "index": "flat",
+            "shortlist": "",
+            f"recall@{args.k}": recall(flat_search["found"], truth, args.k),
+            "p50_ms": flat_search["p50_ms"],
+            "p95_ms": flat_search["p95_ms"],
+            "bytes_per_vector": dim * 4,
+            "sentence_bytes_per_chunk": sentence_bytes["flat"],
+            "resident_bytes_per_chunk": round(dim * 4 + sentence_bytes["flat"], 1),
+        })
+        del flat
+
+        start = time.perf_counter()
+        index = BinaryFlatIndex(dim, workdir / f"{scale}.f32")
+        for block in blocks():
+            index.add(block)
+            # Flush every block so the float vectors never pile up in memory
+            index.save(workdir / f"{scale}.codes")
+        build_s = round(time.perf_counter() - start, 2)
+        print(f"Built binary index in {build_s}s")
+
+        for shortlist in args.shortlist:
+            index.shortlist = shortlist
+            result = timed_search(index, queries, args.k)
+            rows.append({
+                "scale": scale,
+                "n": total,
+                "index": "binary",
+                "shortlist": shortlist,
+                f"recall@{args.k}": recall(result["found"], truth, args.k),
+                "p50_ms": result["p50_ms"],
+                "p95_ms": result["p95_ms"],
+                "bytes_per_vector": round(index.memory_bytes() / total, 1),
+                "sentence_bytes_per_chunk": sentence_bytes["binary"],
+                "resident_bytes_per_chunk": round(index.memory_bytes() / total + sentence_bytes["binary"], 1),
+            })
+
+    print()
+    print_table(rows)
+    meta = {"git_commit": git_commit(), "dim": dim, "queries": len(queries), "k": args.k}
+    if args.output:
+        write_results(args.output, rows, meta)
+
+
+if __name__ == "__main__":
+    main()
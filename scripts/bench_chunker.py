@@ -0,0 +1,124 @@
+# Chunking benchmark for backend/app/utils/text_chunker.py.
+# Chunks a processed Act (default: the National Civil Code) with the
+# character-sized settings and the token-sized mode, and reports chunks/sec
+# plus how much of each chunk the embedding model actually reads: MiniLM
+# truncates every input at max_seq_length word-pieces (256, special tokens
+# included), so tokens past that are embedded by nobody.
+# The pre-rewrite chunker can be timed from git for a before/after run.
+#
+#   python scripts/bench_chunker.py
+#   python scripts/bench_chunker.py --chars 500 2000 --tokens 254 128 --baseline-rev HEAD~1 --output results/chunker.json
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bench_ann import git_commit, print_table, write_results
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+if str(BACKEND) not in sys.path:
+    sys.path.append(str(BACKEND))
+
+from app.core.config import settings
+from app.utils.text_chunker import TextChunker
+
+DEFAULT_TEXT = ROOT / "dataset" / "processed" / "National-Civil-Code(2074).txt"
+CHUNKER_PATH = "backend/app/utils/text_chunker.py"
+
+
+def load_baseline(rev: str):
+    # TextChunker class of text_chunker.py at a git revision
+    source = subprocess.run(
+        ["git", "show", f"{rev}:{CHUNKER_PATH}"], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    path = Path(tempfile.mkdtemp()) / "baseline_text_chunker.py"
+    path.write_text(source, encoding="utf-8")
+    spec = importlib.util.spec_from_file_location("baseline_text_chunker", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.TextChunker
+
+
+def measure(label: str, chunker, text: str, tokenizer, max_seq_length: int, repeats: int) -> Dict:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = chunker.chunk_text(text, "bench")
+        times.append(time.perf_counter() - start)
+    best = min(times)
+
+    # Tokens as the embedding model sees them (with [CLS]/[SEP])
+    lengths = [len(ids) for ids in tokenizer([c.text for c in chunks], verbose=False)["input_ids"]]
+    total = sum(lengths)
+    lost = sum(max(0, n - max_seq_length) for n in lengths)
+    return {
+        "chunker": label,
+        "chunks": len(chunks),
+        "seconds": round(best, 4),
+        "chunks_per_s": round(len(chunks) / best) if best else None,
+        "avg_chars": round(sum(len(c.text) for c in chunks) / max(len(chunks), 1)),
+        "avg_tokens": round(total / max(len(chunks), 1), 1),
+        "max_tokens": max(lengths, default=0),
+        "truncated_chunks": sum(n > max_seq_length for n in lengths),
+        "truncated_token_ratio": round(lost / total, 4) if total else 0.0,
+        "tokens_embedded": total - lost,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark character- vs token-sized chunking")
+    parser.add_argument("--text", type=Path, default=DEFAULT_TEXT)
+    parser.add_argument("--tokenizer", default=settings.EMBEDDING_MODEL, help="HuggingFace tokenizer name")
+    parser.add_argument("--max-seq-length", type=int, default=256, help="tokens the embedding model reads")
+    parser.add_argument("--chars", type=int, nargs="+", default=[settings.CHUNK_SIZE, 2000], help="char chunk sizes")
+    parser.add_argument("--char-overlap", type=float, default=0.1, help="overlap as a fraction of the size")
+    parser.add_argument("--tokens", type=int, nargs="*", help="token chunk sizes (default: max length - 2)")
+    parser.add_argument("--token-overlap", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--baseline-rev", help="also time TextChunker from this git revision (char sizes)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write results as .json or .csv")
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    text = args.text.read_text(encoding="utf-8")
+    print(f"{args.text.name}: {len(text):,} chars, tokenizer {args.tokenizer}, max length {args.max_seq_length}")
+
+    baseline: Optional[type] = load_baseline(args.baseline_rev) if args.baseline_rev else None
+    rows: List[Dict] = []
+    for size in args.chars:
+        overlap = int(size * args.char_overlap)
+        if baseline is not None:
+            rows.append(measure(f"{args.baseline_rev} chars={size}", baseline(size, overlap), text,
+                                tokenizer, args.max_seq_length, args.repeats))
+        rows.append(measure(f"chars={size}", TextChunker(size, overlap), text,
+                            tokenizer, args.max_seq_length, args.repeats))
+    for size in args.tokens or [args.max_seq_length - 2]:
+        chunker = TextChunker(size, args.token_overlap, tokenizer=tokenizer)
+        rows.append(measure(f"tokens={size}", chunker, text, tokenizer, args.max_seq_length, args.repeats))
+
+    print()
+    print_table(rows)
+    meta = {
+        "git_commit": git_commit(),
+        "text": args.text.name,
+        "chars": len(text),
+        "tokenizer": args.tokenizer,
+        "max_seq_length": args.max_seq_length,
+        "repeats": args.repeats,
+    }
+    if args.output:
+        write_results(args.output, rows, meta)
+
+
+if __name__ == "__main__":
+    main()
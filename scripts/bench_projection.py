@@ -0,0 +1,128 @@
+# Dimensionality-reduction benchmark for the projected first stage.
+# Fits the PCA / OPQ projection of scripts/projection.py on the corpus
+# embeddings and, for every output dimension, reports recall@k against exact
+# full-dimension search: projected scores only, and with the shortlist
+# (shortlist x k candidates) re-scored at full dimension. Single-query latency
+# and vector memory are reported next to the full-dimension baseline.
+#
+#   python scripts/bench_projection.py
+#   python scripts/bench_projection.py --dims 64 96 128 192 --methods pca opq --shortlist 2 4 8 --output results/projection.json
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from bench_ann import (
+    DEFAULT_CACHE,
+    _normalize,
+    exact_ground_truth,
+    git_commit,
+    load_real_embeddings,
+    perturb,
+    print_table,
+    write_results,
+)
+from projection import PROJECTION_METHODS, Projection, shortlist_search
+
+
+def recall(found: List[np.ndarray], truth: np.ndarray, k: int) -> float:
+    return round(float(np.mean([len(set(f.tolist()) & set(t.tolist())) / k for f, t in zip(found, truth)])), 4)
+
+
+def run(index, projection, queries: np.ndarray, k: int, shortlist: int, full_vectors) -> Dict:
+    found, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = shortlist_search(index, projection, q[None, :], k, full_vectors=full_vectors, shortlist=shortlist)
+        times.append((time.perf_counter() - start) * 1000)
+        found.append(ids)
+    times.sort()
+    return {"found": found, "p50_ms": round(times[len(times) // 2], 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark projected first-stage search against full dimension")
+    parser.add_argument("--embeddings", type=Path, default=DEFAULT_CACHE, help="cached corpus embeddings (.npy)")
+    parser.add_argument("--refresh", action="store_true", help="re-embed the corpus even if cached")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 96, 128, 192])
+    parser.add_argument("--methods", nargs="+", choices=PROJECTION_METHODS, default=["pca"])
+    parser.add_argument("--shortlist", type=int, nargs="+", default=[1, 2, 4, 8], help="candidates per result")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.5, help="relative noise of synthetic queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as .json or .csv")
+    args = parser.parse_args()
+
+    import faiss
+
+    base, question_vectors = load_real_embeddings(args.embeddings, args.refresh)
+    base = _normalize(np.ascontiguousarray(base, dtype=np.float32))
+    dim = base.shape[1]
+
+    # Real questions when available, topped up with noisy copies of chunks
+    rng = np.random.default_rng([args.seed, 10_000_000])
+    extra = args.queries - (len(question_vectors) if question_vectors is not None else 0)
+    queries = perturb(base, max(extra, 0), args.noise, rng)
+    if question_vectors is not None:
+        queries = np.vstack([_normalize(question_vectors), queries])[: args.queries]
+
+    truth = exact_ground_truth(iter([base]), queries, args.k)
+    full = faiss.IndexFlatIP(dim)
+    full.add(base)
+    baseline = []
+    for q in queries:
+        start = time.perf_counter()
+        full.search(q[None, :], args.k)
+        baseline.append((time.perf_counter() - start) * 1000)
+    baseline.sort()
+    print(f"{len(base):,} vectors of dim {dim}, {len(queries)} queries, "
+          f"full-dimension p50 {baseline[len(baseline) // 2]:.3f} ms")
+
+    rows: List[Dict] = [{
+        "method": "full",
+        "dims": dim,
+        "fit_s": 0.0,
+        "shortlist": "",
+        f"recall@{args.k}": 1.0,
+        f"rescored_recall@{args.k}": 1.0,
+        "p50_ms": round(baseline[len(baseline) // 2], 3),
+        "rescored_p50_ms": None,
+        "vector_mb": round(base.nbytes / 2**20, 2),
+    }]
+    for method in args.methods:
+        for d in args.dims:
+            start = time.perf_counter()
+            projection = Projection.fit(base, d, method, seed=args.seed)
+            fit_s = round(time.perf_counter() - start, 2)
+            reduced = projection.build_index(base)
+            for shortlist in args.shortlist:
+                projected = run(reduced, projection, queries, args.k, shortlist, None)
+                rescored = run(reduced, projection, queries, args.k, shortlist, full.reconstruct_batch)
+                rows.append({
+                    "method": projection.method,
+                    "dims": d,
+                    "fit_s": fit_s,
+                    "shortlist": shortlist,
+                    f"recall@{args.k}": recall(projected["found"], truth, args.k),
+                    f"rescored_recall@{args.k}": recall(rescored["found"], truth, args.k),
+                    "p50_ms": projected["p50_ms"],
+                    "rescored_p50_ms": rescored["p50_ms"],
+                    "vector_mb": round(reduced.ntotal * d * 4 / 2**20, 2),
+                })
+            print(f"  {projection.method} {d}: fitted in {fit_s}s")
+
+    print()
+    print_table(rows)
+    meta = {"git_commit": git_commit(), "n": len(base), "dim": dim, "queries": len(queries), "k": args.k}
+    if args.output:
+        write_results(args.output, rows, meta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Speech-to-text benchmark.
+# Transcribes sample WAVs with every installed STT engine and reports the
+# real-time factor (processing time / audio duration; below 1 is faster than
+# real time), in-memory decode time, model load time and, when a reference
+# transcript <name>.txt sits next to <name>.wav, the word error rate.
+# A concurrent pass pushes all files through the shared SpeechToText worker
+# pool to show throughput under load.
+#
+#   python scripts/bench_stt.py --wavs dataset/stt_samples
+#   python scripts/bench_stt.py --engines whisper google --repeats 3 --concurrency 4 --output results/stt.json
+
+from __future__ import annotations
+
+import argparse
+import io
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bench_ann import git_commit, print_table, write_results
+from voice import STT_ENGINES, STT_WORKERS, SpeechToText, available_stt_engines, decode_wav, get_stt_engine
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SAMPLES = ROOT / "dataset" / "stt_samples"
+
+
+def find_wavs(paths: List[Path]) -> List[Path]:
+    wavs: List[Path] = []
+    for path in paths:
+        wavs.extend(sorted(path.glob("*.wav")) if path.is_dir() else [path])
+    return wavs
+
+
+def audio_seconds(data: bytes) -> float:
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def word_errors(reference: str, hypothesis: str) -> int:
+    # Word-level Levenshtein distance
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1]
+
+
+def _words(text: str) -> List[str]:
+    return "".join(c if c.isalnum() or c.isspace() else " " for c in text.lower()).split()
+
+
+def reference_for(wav: Path) -> Optional[str]:
+    txt = wav.with_suffix(".txt")
+    return txt.read_text(encoding="utf-8").strip() if txt.exists() else None
+
+
+def bench_engine(name: str, samples: List[Dict], repeats: int) -> List[Dict]:
+    start = time.perf_counter()
+    engine = get_stt_engine(name)
+    load_s = time.perf_counter() - start
+    # Warm-up (first call allocates buffers / opens connections)
+    engine.transcribe(*decode_wav(samples[0]["data"]))
+
+    rows = []
+    for sample in samples:
+        decode_ms, transcribe_ms, text = [], [], ""
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            audio, rate = decode_wav(sample["data"])
+            t1 = time.perf_counter()
+            text = engine.transcribe(audio, rate)
+            t2 = time.perf_counter()
+            decode_ms.append((t1 - t0) * 1000)
+            transcribe_ms.append((t2 - t1) * 1000)
+        total_s = (min(decode_ms) + min(transcribe_ms)) / 1000
+        row = {
+            "engine": name,
+            "file": sample["path"].name,
+            "audio_s": round(sample["audio_s"], 2),
+            "load_s": round(load_s, 2),
+            "decode_ms": round(min(decode_ms), 2),
+            "transcribe_ms": round(min(transcribe_ms), 1),
+            "rtf": round(total_s / sample["audio_s"], 3) if sample["audio_s"] else None,
+            "wer": None,
+            "text": text,
+        }
+        if sample["reference"] is not None:
+            words = max(len(_words(sample["reference"])), 1)
+            row["wer"] = round(word_errors(sample["reference"], text) / words, 3)
+        rows.append(row)
+    return rows
+
+
+def bench_concurrent(name: str, samples: List[Dict], concurrency: int) -> Dict:
+    # All files at once through SpeechToText (bounded by STT_WORKERS)
+    stt = SpeechToText(engine=name)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(stt.transcribe, [s["data"] for s in samples]))
+    wall_s = time.perf_counter() - start
+    audio_total = sum(s["audio_s"] for s in samples)
+    return {
+        "engine": name,
+        "files": len(samples),
+        "concurrency": concurrency,
+        "workers": STT_WORKERS,
+        "wall_s": round(wall_s, 2),
+        "audio_s_per_s": round(audio_total / wall_s, 2) if wall_s else None,
+    }
+
+
+def summarize(rows: List[Dict]) -> List[Dict]:
+    summary = []
+    for name in dict.fromkeys(r["engine"] for r in rows):
+        group = [r for r in rows if r["engine"] == name]
+        rtfs = sorted(r["rtf"] for r in group if r["rtf"] is not None)
+        wers = [r["wer"] for r in group if r["wer"] is not None]
+        summary.append({
+            "engine": name,
+            "offline": STT_ENGINES[name].offline,
+            "files": len(group),
+            "load_s": group[0]["load_s"],
+            "mean_rtf": round(sum(rtfs) / len(rtfs), 3) if rtfs else None,
+            "max_rtf": rtfs[-1] if rtfs else None,
+            "mean_decode_ms": round(sum(r["decode_ms"] for r in group) / len(group), 2),
+            "mean_wer": round(sum(wers) / len(wers), 3) if wers else None,
+        })
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark speech-to-text engines on sample WAVs")
+    parser.add_argument("--wavs", type=Path, nargs="+", default=[DEFAULT_SAMPLES], help="WAV files or directories")
+    parser.add_argument("--engines", nargs="+", choices=list(STT_ENGINES), help="default: all installed")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per file (best is reported)")
+    parser.add_argument("--concurrency", type=int, default=0, help="also run all files with N concurrent clients")
+    parser.add_argument("--output", type=Path, help="write results as .json or .csv")
+    args = parser.parse_args()
+
+    wavs = find_wavs(args.wavs)
+    if not wavs:
+        raise SystemExit(f"No WAV files found in {', '.join(map(str, args.wavs))}")
+    engines = args.engines or available_stt_engines()
+    if not engines:
+        raise SystemExit("No speech-to-text engine installed (pip install faster-whisper or SpeechRecognition)")
+
+    samples = []
+    for path in wavs:
+        data = path.read_bytes()
+        samples.append({"path": path, "data": data, "audio_s": audio_seconds(data), "reference": reference_for(path)})
+    print(f"{len(samples)} files, {sum(s['audio_s'] for s in samples):.1f}s of audio, engines: {', '.join(engines)}")
+
+    rows: List[Dict] = []
+    concurrent_rows: List[Dict] = []
+    for name in engines:
+        print(f"\n== {name}")
+        engine_rows = bench_engine(name, samples, args.repeats)
+        for row in engine_rows:
+            print(f"  {row['file']:<28} rtf {row['rtf']}  wer {row['wer']}  {row['text'][:60]!r}")
+        rows.extend(engine_rows)
+        if args.concurrency:
+            concurrent_rows.append(bench_concurrent(name, samples, args.concurrency))
+
+    print()
+    summary = summarize(rows)
+    print_table(summary)
+    if concurrent_rows:
+        print()
+        print_table(concurrent_rows)
+
+    meta = {
+        "git_commit": git_commit(),
+        "files": len(samples),
+        "repeats": args.repeats,
+        "workers": STT_WORKERS,
+        "summary": summary,
+        "concurrent": concurrent_rows,
+    }
+    if args.output:
+        write_results(args.output, rows, meta)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ from typing import Dict, List, Optional
 # Primary extractor
 from pypdf import PdfReader
 
+from corpus import CorpusWriter
+from dedup import DEDUP_THRESHOLD, drop_near_duplicates
+
 try:
     import fitz  # PyMuPDF
     HAS_PYMUPDF = True
@@ -275,9 +278,17 @@ def preserve_legal_structure(text: str) -> str:
     return "\n".join(structured_lines).strip()
 
 
-def prepare_for_rag(text: str, chunk_size: int = 2000, overlap: int = 400, min_chunk_size: int = 100) -> List[str]:
+def prepare_for_rag(
+    text: str,
+    chunk_size: int = 2000,
+    overlap: int = 400,
+    min_chunk_size: int = 100,
+    dedup_threshold: float = 0.0,
+) -> List[str]:
     # Split text into overlapping chunks suitable for RAG embedding.
     # Larger chunks preserve more context for better retrieval.
+    # With dedup_threshold > 0, near-duplicate chunks (repeated boilerplate)
+    # are kept once.
 
     # Split by major sections first to keep context together
     major_sections = re.split(r"\n(?=(?:Part|Chapter|Section|Article)\s*[-:]?\s*\d+)", text)
@@ -343,6 +354,9 @@ def prepare_for_rag(text: str, chunk_size: int = 2000, overlap: int = 400, min_c
         if len(c) >= min_chunk_size and not _is_toc_or_header_only(c):
             filtered_chunks.append(c)
     
+    if dedup_threshold > 0:
+        filtered_chunks = drop_near_duplicates(filtered_chunks, dedup_threshold)
+    
     return filtered_chunks
 
 
@@ -408,6 +422,8 @@ def process_pdfs(
     preserve_structure: bool = True,
     create_chunks: bool = False,
     chunk_size: int = 1000,
+    corpus_path: Optional[Path] = None,
+    dedup_threshold: float = 0.0,
 ) -> Path:
     pdf_files = sorted([p for p in input_dir.glob("**/*.pdf") if p.is_file()])
     if not pdf_files:
@@ -416,6 +432,8 @@ def process_pdfs(
 
     combined_parts: List[str] = []
     all_metadata: List[Dict] = []
+    # Chunks of every PDF go to one JSONL corpus instead of *_chunks.json files
+    corpus = CorpusWriter(corpus_path) if create_chunks and corpus_path else None
 
     for pdf in pdf_files:
         print(f"Extracting: {pdf}")
@@ -448,8 +466,12 @@ def process_pdfs(
             json.dump(metadata, f, indent=2, ensure_ascii=False)
 
         # Create chunks for RAG if requested
-        if create_chunks:
-            chunks = prepare_for_rag(cleaned, chunk_size=chunk_size)
+        if corpus is not None:
+            chunks = prepare_for_rag(cleaned, chunk_size=chunk_size, dedup_threshold=dedup_threshold)
+            corpus.add_document(metadata, chunks)
+            print(f"Added {len(chunks)} chunks to {corpus_path}")
+        elif create_chunks:
+            chunks = prepare_for_rag(cleaned, chunk_size=chunk_size, dedup_threshold=dedup_threshold)
             chunks_path = output_dir / (pdf.stem + "_chunks.json")
             with open(chunks_path, "w", encoding="utf-8") as f:
                 json.dump({
@@ -464,6 +486,10 @@ def process_pdfs(
             combined_parts.append(header)
             combined_parts.append(cleaned)
 
+    if corpus is not None:
+        corpus.close()
+        print(f"Corpus: {corpus.chunks} chunks from {corpus.documents} documents")
+
     # Save combined metadata
     if all_metadata:
         metadata_summary_path = output_dir / "all_metadata.json"
@@ -520,6 +546,19 @@ def main() -> None:
         default=2000,
         help="Character size for RAG chunks (default: 2000)",
     )
+    parser.add_argument(
+        "--corpus",
+        default=None,
+        help="Write chunks to this JSONL corpus instead of *_chunks.json (.gz to compress), "
+             "e.g. dataset/processed/corpus.jsonl",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help=f"Drop near-duplicate chunks within a document above this MinHash similarity, 0 to keep all "
+             f"(default: {DEDUP_THRESHOLD})",
+    )
 
     args = parser.parse_args()
 
@@ -548,6 +587,8 @@ def main() -> None:
         preserve_structure=not args.no_preserve_structure,
         create_chunks=args.create_chunks,
         chunk_size=args.chunk_size,
+        corpus_path=Path(args.corpus) if args.corpus else None,
+        dedup_threshold=args.dedup_threshold,
     )
     
     print("\n Processing complete!")
@@ -0,0 +1,163 @@
+# Token-budgeted context packing for the LLM prompt.
+# Collapses neighbouring chunks of the same Act (which share up to 400 chars of
+# overlap from clean.prepare_for_rag), drops near-duplicates and fills a token
+# budget in relevance order. Reads CONTEXT_TOKEN_BUDGET from .env.
+
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+DEDUP_THRESHOLD = 0.85
+_SHINGLE_SIZE = 5
+_OVERLAP_PROBE_CHARS = 32
+# Appended to a span cut to fit the budget
+_TRUNCATION_SUFFIX = " ..."
+
+
+@lru_cache(maxsize=1)
+def get_llm_tokenizer():
+    # Tokenizer of the hosted LLM, or None (character estimate) if unavailable.
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(
+            os.getenv("LLM_MODEL", "meta-llama/Llama-3.1-8B-Instruct"),
+            token=os.getenv("HUGGINGFACE_API_KEY"),
+        )
+    except Exception as e:
+        print(f"[Context] LLM tokenizer unavailable ({e}), estimating tokens from characters")
+        return None
+
+
+def count_tokens(text: str, tokenizer=None) -> int:
+    if tokenizer is None:
+        return max(1, len(text) // 4)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def join_overlapping(left: str, right: str) -> str:
+    # Join consecutive chunks, writing the shared overlap only once.
+    if not right or right in left:
+        return left
+    probe = right[:_OVERLAP_PROBE_CHARS]
+    # Search from the end: the shortest matching overlap never drops text
+    start = left.rfind(probe)
+    while start != -1:
+        tail = left[start:]
+        if right.startswith(tail):
+            return left + right[len(tail):]
+        start = left.rfind(probe, 0, start + len(probe) - 1)
+    return left + "\n" + right
+
+
+def pack_context(
+    hits: List[Dict],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    tokenizer=None,
+) -> Tuple[List[str], List[Dict]]:
+    # hits come from FaissVectorStore.search in relevance order. Returns the
+    # packed context texts and their metadata, ready for generate_answer.
+    # Compressed hits contribute their sentence excerpt instead of the full chunk.
+    hits = [{**h, "text": h.get("excerpt") or h["text"]} for h in hits]
+    tokens_before = sum(count_tokens(h["text"], tokenizer) for h in hits)
+
+    # Group legal chunks by Act; chunk ids are sequential within an Act
+    spans: List[Dict] = []
+    by_doc: Dict[str, List[Tuple[int, Dict]]] = {}
+    for rank, hit in enumerate(hits):
+        meta = hit.get("metadata", {})
+        if meta.get("type") == "navigation" or "id" not in hit:
+            spans.append({"text": hit["text"], "metadata": meta, "rank": rank})
+        else:
+            by_doc.setdefault(meta.get("filename", ""), []).append((rank, hit))
+
+    for items in by_doc.values():
+        items.sort(key=lambda item: item[1]["id"])
+        current = None
+        for rank, hit in items:
+            if current is not None and hit["id"] - current["last_id"] <= 1:
+                current["text"] = join_overlapping(current["text"], hit["text"])
+                current["last_id"] = hit["id"]
+                current["rank"] = min(current["rank"], rank)
+                continue
+            if current is not None:
+                spans.append(current)
+            current = {"text": hit["text"], "metadata": hit.get("metadata", {}), "rank": rank, "last_id": hit["id"]}
+        if current is not None:
+            spans.append(current)
+
+    spans.sort(key=lambda s: s["rank"])
+
+    texts: List[str] = []
+    metadatas: List[Dict] = []
+    kept_shingles: List[Set[str]] = []
+    remaining = token_budget
+    duplicates = 0
+    for span in spans:
+        shingles = _shingles(span["text"])
+        if any(_jaccard(shingles, other) >= DEDUP_THRESHOLD for other in kept_shingles):
+            duplicates += 1
+            continue
+        text = span["text"]
+        tokens = count_tokens(text, tokenizer)
+        if tokens > remaining:
+            if remaining < 64:
+                continue
+            text = _truncate(text, remaining, tokenizer)
+            tokens = count_tokens(text, tokenizer)
+        texts.append(text)
+        metadatas.append(span["metadata"])
+        kept_shingles.append(shingles)
+        remaining -= tokens
+
+    print(
+        f"[Context] Prompt context tokens: {tokens_before} -> {token_budget - remaining} "
+        f"({len(hits)} chunks -> {len(texts)} spans, {duplicates} near-duplicates dropped)"
+    )
+    return texts, metadatas
+
+
+def _truncate(text: str, max_tokens: int, tokenizer=None) -> str:
+    # At most max_tokens including the suffix, cut at a sentence boundary if possible
+    ids = None if tokenizer is None else tokenizer.encode(text, add_special_tokens=False)
+    limit = max_tokens - count_tokens(_TRUNCATION_SUFFIX, tokenizer)
+    while True:
+        if ids is None:
+            cut = text[: max(limit, 0) * 4]
+        else:
+            cut = tokenizer.decode(ids[: max(limit, 0)])
+        boundary = max(cut.rfind(". "), cut.rfind("\n"))
+        if boundary > len(cut) // 2:
+            cut = cut[: boundary + 1]
+        truncated = cut.rstrip() + _TRUNCATION_SUFFIX
+        # Decoding and re-encoding can merge tokens differently at the cut
+        excess = count_tokens(truncated, tokenizer) - max_tokens
+        if excess <= 0 or limit <= 0:
+            return truncated
+        limit -= excess
+
+
+def _shingles(text: str) -> Set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < _SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+__all__ = ["pack_context", "count_tokens", "get_llm_tokenizer", "join_overlapping", "CONTEXT_TOKEN_BUDGET"]
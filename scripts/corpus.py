@@ -0,0 +1,182 @@
+# Line-delimited chunk corpus shared by clean.py (writer) and vector.py (reader).
+# One JSON object per line, so documents can be appended without rewriting the
+# file and the corpus can be read one record at a time:
+#   {"type": "doc", "doc_id": "citizenship-act-2063", "metadata": {...}}
+#   {"type": "chunk", "id": "citizenship-act-2063:3f1c2a9e0b7d", "doc_id": ..., "seq": 0, "text": "..."}
+# Document metadata is written once; its chunks follow it and refer to it by
+# doc_id. Chunk ids are the doc_id plus a hash of the chunk text, so they stay
+# the same when the corpus is rebuilt or documents are reordered.
+# A path ending in .gz is read and written gzip-compressed.
+#
+#   python scripts/corpus.py                       # *_chunks.json -> corpus.jsonl
+#   python scripts/corpus.py --output dataset/processed/corpus.jsonl.gz
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+# Looked up in this order in a processed directory
+CORPUS_NAMES = ("corpus.jsonl.gz", "corpus.jsonl")
+
+
+def doc_id_for(filename: str) -> str:
+    # "Citizenship-Act(2063).pdf" -> "citizenship-act-2063"
+    return re.sub(r"[^a-z0-9]+", "-", Path(filename).stem.lower()).strip("-")
+
+
+def chunk_id_for(doc_id: str, text: str) -> str:
+    return f"{doc_id}:{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _with_ids(doc_id: str, texts: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    # A chunk text repeated within a document gets a "-<n>" suffix
+    seen: Dict[str, int] = {}
+    for text in texts:
+        chunk_id = chunk_id_for(doc_id, text)
+        if chunk_id in seen:
+            seen[chunk_id] += 1
+            yield f"{chunk_id}-{seen[chunk_id]}", text
+        else:
+            seen[chunk_id] = 0
+            yield chunk_id, text
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        # Appending adds a gzip member; readers see one continuous stream
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def find_corpus(processed_dir: str | Path) -> Path | None:
+    for name in CORPUS_NAMES:
+        path = Path(processed_dir) / name
+        if path.exists():
+            return path
+    return None
+
+
+class CorpusWriter:
+    # Appends documents and their chunks. Use as a context manager.
+
+    def __init__(self, path: str | Path, append: bool = False) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = _open(self.path, "a" if append else "w")
+        self.documents = 0
+        self.chunks = 0
+
+    def add_document(self, metadata: Dict, chunks: Iterable[str]) -> List[str]:
+        # Returns the chunk ids
+        doc_id = doc_id_for(metadata.get("filename", f"document-{self.documents}"))
+        self._write({"type": "doc", "doc_id": doc_id, "metadata": metadata})
+        ids: List[str] = []
+        for seq, (chunk_id, text) in enumerate(_with_ids(doc_id, chunks)):
+            self._write({"type": "chunk", "id": chunk_id, "doc_id": doc_id, "seq": seq, "text": text})
+            ids.append(chunk_id)
+        self.documents += 1
+        self.chunks += len(ids)
+        return ids
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_chunks(path: str | Path) -> Iterator[Tuple[str, str, Dict]]:
+    # Yields (chunk_id, text, metadata) one line at a time. Chunks of a
+    # document share its metadata dict; copy it before changing it.
+    documents: Dict[str, Dict] = {}
+    with _open(Path(path), "r") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid corpus record: {e}") from e
+            if record["type"] == "doc":
+                documents[record["doc_id"]] = record["metadata"]
+            elif record["type"] == "chunk":
+                yield record["id"], record["text"], documents.get(record["doc_id"], {})
+
+
+def iter_batches(
+    chunks: Iterable[Tuple[str, str, Dict]],
+    batch_size: int = 256,
+) -> Iterator[List[Tuple[str, str, Dict]]]:
+    batch: List[Tuple[str, str, Dict]] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _chunk_files(processed_dir: str | Path) -> List[Path]:
+    # Navigation chunks are handled separately
+    chunk_files = sorted(Path(processed_dir).glob("*_chunks.json"))
+    return [f for f in chunk_files if "navigation" not in f.name.lower()]
+
+
+def iter_chunk_files(processed_dir: str | Path) -> Iterator[Tuple[str, str, Dict]]:
+    # Same records from the per-document *_chunks.json files, one file in
+    # memory at a time.
+    for chunk_file in _chunk_files(processed_dir):
+        with open(chunk_file, encoding="utf-8") as f:
+            data = json.load(f)
+        metadata = data.get("metadata", {})
+        doc_id = doc_id_for(metadata.get("filename", chunk_file.name))
+        for chunk_id, text in _with_ids(doc_id, data.get("chunks", [])):
+            yield chunk_id, text, metadata
+
+
+def convert_chunk_files(processed_dir: str | Path, output: str | Path) -> CorpusWriter:
+    # Writes the existing *_chunks.json files as one corpus
+    with CorpusWriter(output) as writer:
+        for chunk_file in _chunk_files(processed_dir):
+            with open(chunk_file, encoding="utf-8") as f:
+                data = json.load(f)
+            writer.add_document(data.get("metadata", {}), data.get("chunks", []))
+    return writer
+
+
+__all__ = [
+    "CorpusWriter",
+    "CORPUS_NAMES",
+    "chunk_id_for",
+    "doc_id_for",
+    "find_corpus",
+    "iter_batches",
+    "iter_chunk_files",
+    "iter_chunks",
+]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert *_chunks.json files into a JSONL chunk corpus")
+    parser.add_argument("--input", default=str(Path("dataset") / "processed"))
+    parser.add_argument("--output", default=None, help="default: <input>/corpus.jsonl (.gz to compress)")
+    args = parser.parse_args()
+
+    output = Path(args.output or Path(args.input) / "corpus.jsonl")
+    writer = convert_chunk_files(args.input, output)
+    print(f"Wrote {writer.chunks} chunks from {writer.documents} documents to {output}")
@@ -0,0 +1,101 @@
+# MinHash / LSH near-duplicate detection for chunks at ingest.
+# Chunks are compared by the Jaccard similarity of their word shingles,
+# estimated from MinHash signatures; LSH banding keeps lookups sub-linear.
+# Used by clean.prepare_for_rag (within a document) and FaissVectorStore.build
+# (across documents, duplicates are stored once with back-references).
+# Reads DEDUP_THRESHOLD (0 disables) from .env.
+
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Hashable, List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+
+# Mersenne prime 2^31 - 1: (a * x + b) stays below 2^63 for 32-bit hashes
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class MinHashLSH:
+    # In-memory LSH index over MinHash signatures, keyed by the caller's ids.
+    # num_perm / bands rows per band; the seed is fixed so signatures stay
+    # comparable across runs.
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = re.findall(r"\w+", text.lower())
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        ) % _PRIME
+        # One row per permutation, minimum over the shingles
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        self._signatures[key] = signature
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, signature: np.ndarray) -> Tuple[Hashable, float] | None:
+        # (key, estimated similarity) of the best match at or above the threshold
+        candidates = set()
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            candidates.update(bucket.get(band, ()))
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+
+def drop_near_duplicates(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> List[str]:
+    # Keeps the first of each group of near-duplicate texts, in order
+    lsh = MinHashLSH(threshold=threshold)
+    kept: List[str] = []
+    for text in texts:
+        signature = lsh.signature(text)
+        if lsh.query(signature) is None:
+            lsh.add(len(kept), signature)
+            kept.append(text)
+    return kept
+
+
+__all__ = ["MinHashLSH", "drop_near_duplicates", "DEDUP_THRESHOLD"]
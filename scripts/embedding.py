@@ -7,11 +7,13 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Iterable, List, Union
+from typing import TYPE_CHECKING, Iterable, List, Union
 
 import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 # Load .env from project root
 _ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
@@ -31,7 +33,10 @@ class EmbeddingModel:
     ) -> None:
         self.model_name = model_name or DEFAULT_EMBEDDING_MODEL
         self.normalize = normalize
-        self.model = SentenceTransformer(self.model_name, device=device)
+        # Imported here: torch/transformers dominate import time
+        import sentence_transformers
+
+        self.model: SentenceTransformer = sentence_transformers.SentenceTransformer(self.model_name, device=device)
 
     @property
     def dimension(self) -> int:
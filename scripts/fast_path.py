@@ -0,0 +1,273 @@
+# Structured fast path for navigation and emergency-service questions.
+# Questions such as "police emergency number" or "documents required for
+# citizenship certificate" are answered straight from the structured fields
+# in navigation_data.json, without embedding, search or the LLM.
+# Matching uses the alias index built by navigation_processor (service names,
+# keywords, emergency names and short numbers): the longest alias phrases in
+# the question are looked up, and the match is accepted only when the aliases
+# cover every content word of the question and point at a single service.
+# Reads FAST_PATH_ENABLED and FAST_PATH_MIN_CONFIDENCE from .env.
+
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Set
+
+from dotenv import load_dotenv
+
+from navigation_processor import (
+    ALIAS_INDEX_PATH,
+    NAVIGATION_DATA_PATH,
+    emergency_service_to_text,
+    format_list_or_value,
+    format_steps,
+    normalize_phrase,
+    save_alias_index,
+    service_to_text,
+)
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.6"))
+
+# Words that ask *what* about a service; they pick the answer sections
+INTENT_WORDS = {
+    "phone": {"phone", "number", "numbers", "contact", "call", "dial", "telephone", "mobile"},
+    "documents": {"documents", "document", "papers", "required", "needed", "requirements", "need"},
+    "cost": {"cost", "costs", "fee", "fees", "charge", "charges", "price", "much", "pay"},
+    "time": {"time", "long", "days", "duration", "take", "takes"},
+    "steps": {"steps", "step", "process", "procedure", "how", "apply", "kasari"},
+    "office": {"office", "address", "where", "location", "located", "kaha"},
+    "online": {"online", "website", "link", "portal", "site"},
+}
+_INTENT_LOOKUP = {word: intent for intent, words in INTENT_WORDS.items() for word in words}
+
+# Count as matched for emergency entries ("police emergency number")
+_EMERGENCY_WORDS = {"emergency", "helpline", "hotline", "toll", "free", "urgent"}
+
+_STOPWORDS = {
+    "a", "an", "the", "to", "for", "of", "in", "at", "on", "is", "are", "was", "what", "which",
+    "do", "does", "i", "we", "can", "could", "get", "my", "me", "from", "with", "and", "or",
+    "it", "there", "any", "be", "please", "want", "obtain", "make", "new", "about", "tell",
+    "nepal", "pokhara", "kaski", "should", "will", "you", "your", "by", "if", "s",
+    "service", "services", "details", "info", "information", "give",
+}
+
+# Questions about the law itself go through retrieval over the Acts
+_LEGAL_WORDS = {
+    "act", "acts", "section", "sections", "article", "law", "laws", "legal", "rights",
+    "punishment", "penalty", "offense", "offence", "crime", "provision", "constitution",
+}
+
+
+class NavigationFastPath:
+    # Greedy longest-alias matcher over the precomputed alias index.
+
+    def __init__(
+        self,
+        index_path: Path | str = ALIAS_INDEX_PATH,
+        min_confidence: float = FAST_PATH_MIN_CONFIDENCE,
+    ) -> None:
+        self.index_path = Path(index_path)
+        self.min_confidence = min_confidence
+        self.entries: List[Dict] = []
+        self.aliases: Dict[str, List[int]] = {}
+        self.max_alias_words = 1
+        self.stats = {"queries": 0, "matches": 0, "low_confidence": 0}
+
+    def load(self) -> None:
+        # Rebuild the index when it is missing or older than the data (a
+        # deployment may ship the index without the data file)
+        stale = (
+            NAVIGATION_DATA_PATH.exists()
+            and self.index_path.exists()
+            and self.index_path.stat().st_mtime < NAVIGATION_DATA_PATH.stat().st_mtime
+        )
+        if not self.index_path.exists() or stale:
+            save_alias_index(self.index_path)
+        with open(self.index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        self.entries = index["entries"]
+        self.aliases = index["aliases"]
+        self.max_alias_words = index["max_alias_words"]
+
+    def match(self, question: str) -> Dict | None:
+        # Returns {"entry", "confidence", "intents", "aliases"} for a confident
+        # single-service match, else None.
+        if not self.entries:
+            self.load()
+        self.stats["queries"] += 1
+        tokens = normalize_phrase(question).split()
+
+        scores: Dict[int, int] = defaultdict(int)
+        matched: List[str] = []
+        leftover: List[str] = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self.max_alias_words, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i:i + n])
+                if phrase in self.aliases:
+                    for entry_id in self.aliases[phrase]:
+                        scores[entry_id] += n
+                    matched.append(phrase)
+                    i += n
+                    break
+            else:
+                leftover.append(tokens[i])
+                i += 1
+        if not scores or _LEGAL_WORDS.intersection(leftover):
+            return None
+
+        intents: Set[str] = {_INTENT_LOOKUP[w] for w in leftover if w in _INTENT_LOOKUP}
+        if "much" in leftover or "long" in leftover:
+            # "how much" / "how long" ask for the cost or time, not the steps
+            intents.discard("steps")
+        emergency_words = [w for w in leftover if w in _EMERGENCY_WORDS]
+        unmatched = [
+            w for w in leftover
+            if w not in _STOPWORDS and w not in _INTENT_LOOKUP and w not in _EMERGENCY_WORDS
+        ]
+        if unmatched:
+            # A content word no alias covers ("renew", "cancel", "duplicate")
+            # usually names a different service than the matched one
+            self.stats["low_confidence"] += 1
+            return None
+        for entry_id in scores:
+            if self.entries[entry_id]["kind"] == "emergency":
+                scores[entry_id] += len(emergency_words)
+
+        content = sum(len(p.split()) for p in matched) + len(emergency_words)
+        best = max(scores.values())
+        tied = [entry_id for entry_id, score in scores.items() if score == best]
+        # Ambiguous aliases ("malpot" names three services) split the confidence
+        confidence = best / content / len(tied)
+        if confidence < self.min_confidence:
+            self.stats["low_confidence"] += 1
+            return None
+        self.stats["matches"] += 1
+        return {
+            "entry": self.entries[tied[0]],
+            "confidence": round(confidence, 3),
+            "intents": intents,
+            "aliases": matched,
+        }
+
+    def answer(self, match: Dict) -> str:
+        # Markdown answer from the structured fields, ending with a TL;DR line
+        # like the LLM answers do.
+        entry = match["entry"]
+        if entry["kind"] == "emergency":
+            return _emergency_answer(entry["record"])
+        return _service_answer(entry["record"], match["intents"])
+
+    def context(self, match: Dict) -> str:
+        # The matched record as a single context chunk for LLM elaboration
+        entry = match["entry"]
+        if entry["kind"] == "emergency":
+            return emergency_service_to_text(entry["record"])
+        return service_to_text(entry["record"])
+
+    def source(self, match: Dict) -> Dict:
+        # Metadata in the shape of a navigation hit, for source listings
+        return {
+            "type": "navigation",
+            "filename": "navigation_data.json",
+            "title": match["entry"]["name"],
+        }
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "entries": len(self.entries), "aliases": len(self.aliases)}
+
+
+def _emergency_answer(emergency: Dict) -> str:
+    name = emergency.get("name", "Emergency Service")
+    number = emergency.get("short_number", "")
+    charge = emergency.get("charge", "")
+    lines = [
+        f"For **{name}**, dial **{number}** from any phone in Nepal" + (f" ({charge.lower()} of charge)." if charge else "."),
+        "Explain your emergency situation clearly when the call is answered.",
+        "",
+        f"**TL;DR:** {name}: dial {number}.",
+    ]
+    return "\n".join(lines)
+
+
+def _present(value) -> bool:
+    return bool(value) and value != "NIL"
+
+
+def _service_answer(service: Dict, intents: Set[str]) -> str:
+    # Sections for the asked-about fields; everything when nothing specific was asked
+    show = intents or set(INTENT_WORDS)
+    name = service.get("service_name", "Service")
+    lines = [f"**{name}**" + (f" ({service['department']})" if _present(service.get("department")) else "")]
+    if service.get("description"):
+        lines.append(service["description"])
+
+    if "steps" in show and service.get("steps"):
+        lines += ["", "**Steps:**", format_steps(service["steps"])]
+        alternatives = service.get("alternative_methods") or (
+            [service["alternative_method"]] if service.get("alternative_method") else []
+        )
+        for alt in alternatives:
+            if alt.get("steps"):
+                lines += ["", f"**Alternative ({alt.get('method', 'Other')}):**", format_steps(alt["steps"])]
+    if "documents" in show and service.get("documents_required"):
+        lines += ["", "**Documents Required:**", format_list_or_value(service["documents_required"])]
+    if "cost" in show and service.get("cost"):
+        lines += ["", "**Cost/Fees:**", format_list_or_value(service["cost"])]
+    if "time" in show and service.get("time_required"):
+        lines += ["", f"**Time Required:** {service['time_required']}"]
+    if "office" in show and _present(service.get("office_address")):
+        lines += ["", f"**Office Address:** {service['office_address']}"]
+    phone = service.get("phone_number")
+    if ("phone" in show or "office" in show) and _present(phone):
+        lines.append(f"**Phone:** {', '.join(phone) if isinstance(phone, list) else phone}")
+    if "online" in show and _present(service.get("online_link")):
+        lines.append(f"**Online Portal:** {service['online_link']}")
+    if not intents and service.get("notes"):
+        lines += ["", "**Important Notes:**", format_list_or_value(service["notes"])]
+
+    summary = [name]
+    if _present(service.get("department")):
+        summary.append(f"apply at {service['department']}")
+    if isinstance(service.get("cost"), str) and service["cost"]:
+        summary.append(f"cost: {service['cost']}")
+    if service.get("time_required"):
+        summary.append(f"time: {service['time_required']}")
+    lines += ["", f"**TL;DR:** {'; '.join(summary)}."]
+    return "\n".join(lines)
+
+
+_fast_path: NavigationFastPath | None = None
+
+
+def get_fast_path() -> NavigationFastPath:
+    global _fast_path
+    if _fast_path is None:
+        _fast_path = NavigationFastPath()
+        _fast_path.load()
+    return _fast_path
+
+
+__all__ = ["NavigationFastPath", "get_fast_path", "FAST_PATH_ENABLED", "FAST_PATH_MIN_CONFIDENCE"]
+
+
+if __name__ == "__main__":
+    import sys
+
+    fast_path = get_fast_path()
+    for question in sys.argv[1:] or ["police emergency number", "documents required for citizenship certificate"]:
+        match = fast_path.match(question)
+        print(f"\n> {question}")
+        if match is None:
+            print("  (no confident match, falls back to retrieval)")
+        else:
+            print(f"  [{match['entry']['name']}, confidence {match['confidence']}]")
+            print(fast_path.answer(match))
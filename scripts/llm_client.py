@@ -0,0 +1,315 @@
+# Long-lived async client for the HuggingFace Inference API (OpenAI-compatible
+# chat completions). One httpx.AsyncClient keeps connections alive across
+# requests; each model gets a concurrency semaphore, all calls share a token
+# bucket, 429/5xx responses are retried with jittered exponential backoff, and a
+# request that runs past the primary model's p95 latency is hedged to a fallback
+# model (first answer wins). Point LLM_API_BASE_URL at scripts/mock_llm_server.py
+# to test locally.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+LLM_API_BASE_URL = os.getenv("LLM_API_BASE_URL", "https://router.huggingface.co/v1")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")  # Empty disables hedging
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Per model
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))  # Requests per second
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Hedge delay until enough latencies are recorded for a p95
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "8000"))
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_BACKOFF_BASE_S = 0.5
+_BACKOFF_CAP_S = 8.0
+_LATENCY_WINDOW = 200
+_MIN_P95_SAMPLES = 20
+
+
+class LLMRequestError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    # Async token bucket: `rate` tokens per second, up to `capacity` banked.
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LatencyTracker:
+    # Rolling window of successful request latencies (seconds) for one model.
+
+    def __init__(self, window: int = _LATENCY_WINDOW) -> None:
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < _MIN_P95_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AsyncLLMClient:
+
+    def __init__(
+        self,
+        base_url: str = LLM_API_BASE_URL,
+        api_key: Optional[str] = None,
+        fallback_model: str = LLM_FALLBACK_MODEL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_limit: float = LLM_RATE_LIMIT,
+        rate_burst: int = LLM_RATE_BURST,
+        timeout_s: float = LLM_TIMEOUT_S,
+        max_retries: int = LLM_MAX_RETRIES,
+    ) -> None:
+        api_key = api_key or os.getenv("HUGGINGFACE_API_KEY")
+        self.fallback_model = fallback_model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=httpx.Timeout(timeout_s, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_concurrency * 2,
+                max_keepalive_connections=max_concurrency * 2,
+                keepalive_expiry=60.0,
+            ),
+        )
+        self.bucket = TokenBucket(rate_limit, rate_burst)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.stats = {
+            "requests": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "errors": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        }
+
+    async def chat(
+        self,
+        messages: List[Dict],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.3,
+    ) -> str:
+        payload = {"messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        self.stats["requests"] += 1
+        if not self.fallback_model or self.fallback_model == model:
+            return await self._call(model, payload)
+        return await self._hedged(model, payload)
+
+    async def chat_stream(
+        self,
+        messages: List[Dict],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        # Content deltas as the server generates them (SSE). Retries apply only
+        # until the first delta is yielded (a retry would repeat the text the
+        # caller already has); streams are not hedged.
+        payload = {
+            "messages": messages, "max_tokens": max_tokens, "temperature": temperature,
+            "model": model, "stream": True, "stream_options": {"include_usage": True},
+        }
+        self.stats["requests"] += 1
+        attempt = 0
+        yielded = False
+        while True:
+            async with self._semaphore(model):
+                await self.bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    async with self.client.stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code not in _RETRY_STATUS:
+                            if response.is_error:
+                                await response.aread()
+                                self.stats["errors"] += 1
+                                raise LLMRequestError(f"{model}: HTTP {response.status_code}: {response.text[:200]}")
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                chunk = json.loads(data)
+                                usage = chunk.get("usage") or {}
+                                self.stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                                self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+                                for choice in chunk.get("choices") or []:
+                                    delta = (choice.get("delta") or {}).get("content")
+                                    if delta:
+                                        yielded = True
+                                        yield delta
+                            self._tracker(model).add(time.perf_counter() - start)
+                            return
+                        reason, retry_after = f"HTTP {response.status_code}", response.headers.get("retry-after")
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if yielded:
+                        self.stats["errors"] += 1
+                        raise LLMRequestError(f"{model}: stream interrupted mid-answer ({e})") from e
+                    reason, retry_after = str(e), None
+
+            if attempt >= self.max_retries:
+                self.stats["errors"] += 1
+                raise LLMRequestError(f"{model}: giving up after {attempt + 1} attempts ({reason})")
+            delay = random.uniform(0, min(_BACKOFF_CAP_S, _BACKOFF_BASE_S * 2 ** attempt))
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            attempt += 1
+            self.stats["retries"] += 1
+            print(f"[LLM] {model}: {reason}, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _hedged(self, model: str, payload: Dict) -> str:
+        # Start the primary; if it hasn't answered by its p95, race the fallback.
+        primary = asyncio.create_task(self._call(model, payload))
+        p95 = self._tracker(model).percentile(0.95)
+        delay = p95 if p95 is not None else LLM_HEDGE_DEFAULT_MS / 1000
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.stats["hedged"] += 1
+        print(f"[LLM] {model} exceeded {delay * 1000:.0f} ms, hedging to {self.fallback_model}")
+        hedge = asyncio.create_task(self._call(self.fallback_model, payload))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, model: str, payload: Dict) -> str:
+        attempt = 0
+        while True:
+            async with self._semaphore(model):
+                await self.bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    response = await self.client.post("/chat/completions", json={**payload, "model": model})
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    response, error = None, e
+                else:
+                    error = None
+
+            if response is not None and response.status_code not in _RETRY_STATUS:
+                if response.is_error:
+                    self.stats["errors"] += 1
+                    raise LLMRequestError(f"{model}: HTTP {response.status_code}: {response.text[:200]}")
+                self._tracker(model).add(time.perf_counter() - start)
+                data = response.json()
+                usage = data.get("usage") or {}
+                self.stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+                return data["choices"][0]["message"]["content"].strip()
+
+            reason = str(error) if response is None else f"HTTP {response.status_code}"
+            if attempt >= self.max_retries:
+                self.stats["errors"] += 1
+                raise LLMRequestError(f"{model}: giving up after {attempt + 1} attempts ({reason})")
+
+            # Full jitter backoff; honour Retry-After from rate-limited responses
+            delay = random.uniform(0, min(_BACKOFF_CAP_S, _BACKOFF_BASE_S * 2 ** attempt))
+            if response is not None and "retry-after" in response.headers:
+                try:
+                    delay = max(delay, float(response.headers["retry-after"]))
+                except ValueError:
+                    pass
+            attempt += 1
+            self.stats["retries"] += 1
+            print(f"[LLM] {model}: {reason}, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[model]
+
+    def _tracker(self, model: str) -> LatencyTracker:
+        if model not in self._latency:
+            self._latency[model] = LatencyTracker()
+        return self._latency[model]
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "p95_ms": {
+                m: round(p95 * 1000, 1)
+                for m, t in self._latency.items()
+                if (p95 := t.percentile(0.95)) is not None
+            },
+        }
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_client: Optional[AsyncLLMClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_llm_client() -> AsyncLLMClient:
+    # Shared client for the running event loop (httpx pools are bound to one loop).
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = AsyncLLMClient()
+        _client_loop = loop
+    return _client
+
+
+async def close_llm_client() -> None:
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+__all__ = ["AsyncLLMClient", "LLMRequestError", "TokenBucket", "get_llm_client", "close_llm_client"]
@@ -4,11 +4,14 @@
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict
 
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+
+if TYPE_CHECKING:
+    from huggingface_hub import InferenceClient
 
 # Load .env from project root
 _ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
@@ -16,6 +19,7 @@ load_dotenv(_ENV_PATH)
 
 DEFAULT_LLM_MODEL = os.getenv("LLM_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
 
 
 def detect_query_type(question: str, context_chunks: List[str] = None) -> str:
@@ -54,23 +58,20 @@ def detect_query_type(question: str, context_chunks: List[str] = None) -> str:
         return "mixed"
 
 
-def generate_answer(
-    question: str,
-    context_chunks: List[str],
-    chunk_metadata: List[Dict] = None,
-    model: str | None = None,
-    max_tokens: int = 1024,
-    temperature: float = 0.3,
-) -> str:
+@lru_cache(maxsize=4)
+def _get_inference_client(api_key: str) -> "InferenceClient":
+    # Reused across calls so the underlying HTTP session stays alive
+    from huggingface_hub import InferenceClient
 
-    # HuggingFace Inference API call 
+    return InferenceClient(token=api_key, timeout=LLM_TIMEOUT_S)
 
-    api_key = HUGGINGFACE_API_KEY
-    if not api_key:
-        raise RuntimeError("api key not found")
 
-    model = model or DEFAULT_LLM_MODEL
-    client = InferenceClient(token=api_key)
+def build_messages(
+    question: str,
+    context_chunks: List[str],
+    chunk_metadata: List[Dict] = None,
+) -> List[Dict]:
+    # System + user chat messages for the question and its retrieved context.
 
     # Detect query type for better prompting
     query_type = detect_query_type(question, context_chunks)
@@ -145,13 +146,33 @@ Question: {question}
 
 Answer using ONLY the context above. Cite sources. End with **TL;DR:** - nothing after it."""
 
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def generate_answer(
+    question: str,
+    context_chunks: List[str],
+    chunk_metadata: List[Dict] = None,
+    model: str | None = None,
+    max_tokens: int = 1024,
+    temperature: float = 0.3,
+) -> str:
+
+    # HuggingFace Inference API call 
+
+    api_key = HUGGINGFACE_API_KEY
+    if not api_key:
+        raise RuntimeError("api key not found")
+
+    client = _get_inference_client(api_key)
+
     # Use chat_completion for conversational models like Llama
     response = client.chat_completion(
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ],
-        model=model,
+        messages=build_messages(question, context_chunks, chunk_metadata),
+        model=model or DEFAULT_LLM_MODEL,
         max_tokens=max_tokens,
         temperature=temperature,
     )
@@ -159,4 +180,44 @@ Answer using ONLY the context above. Cite sources. End with **TL;DR:** - nothing
     return response.choices[0].message.content.strip()
 
 
-__all__ = ["generate_answer", "DEFAULT_LLM_MODEL", "detect_query_type"]
+async def generate_answer_async(
+    question: str,
+    context_chunks: List[str],
+    chunk_metadata: List[Dict] = None,
+    model: str | None = None,
+    max_tokens: int = 1024,
+    temperature: float = 0.3,
+) -> str:
+    # Non-blocking variant for async servers: pooled connections, rate limiting,
+    # retries and hedging come from llm_client.
+    from llm_client import get_llm_client
+
+    return await get_llm_client().chat(
+        build_messages(question, context_chunks, chunk_metadata),
+        model=model or DEFAULT_LLM_MODEL,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+
+
+async def stream_answer_async(
+    question: str,
+    context_chunks: List[str],
+    chunk_metadata: List[Dict] = None,
+    model: str | None = None,
+    max_tokens: int = 1024,
+    temperature: float = 0.3,
+) -> AsyncIterator[str]:
+    # Answer text deltas as they are generated.
+    from llm_client import get_llm_client
+
+    async for delta in get_llm_client().chat_stream(
+        build_messages(question, context_chunks, chunk_metadata),
+        model=model or DEFAULT_LLM_MODEL,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    ):
+        yield delta
+
+
+__all__ = ["generate_answer", "generate_answer_async", "stream_answer_async", "build_messages", "DEFAULT_LLM_MODEL", "detect_query_type"]
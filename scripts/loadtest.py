@@ -0,0 +1,278 @@
+# Open-loop load test for the question-answering endpoints.
+# Replays dataset/loadtest/questions.json against /ask, /ask/search (app.main)
+# and /api/search (backend/main.py) at a fixed arrival rate with Poisson or
+# uniform inter-arrival times. Latency is measured from each request's
+# scheduled send time, so client-side queueing under overload is counted
+# instead of hidden. Per-stage times come from the Server-Timing header.
+#
+# Deterministic, offline run against the local pipeline:
+#   python scripts/mock_llm_server.py --port 8080 --latency-ms 300 --tokens-per-sec 40 --seed 1
+#   (cd backend && LLM_BACKEND=openai LLM_API_BASE=http://localhost:8080/v1 python -m app.main)
+#   python scripts/loadtest.py --endpoints ask ask-search --rate 4 --duration 60 --output results/app.json
+#
+# Against backend/main.py (chat_completion via the same mock):
+#   (cd backend && LLM_API_BASE_URL=http://localhost:8080/v1 python main.py)
+#   python scripts/loadtest.py --endpoints api-search --rate 4 --duration 60 --compare results/before.json
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_QUESTIONS = ROOT / "dataset" / "loadtest" / "questions.json"
+
+# name -> (method, path, request kwargs builder)
+ENDPOINTS = {
+    "ask": ("POST", "/ask", lambda q, args: {"json": {"question": q, "top_k": args.top_k}}),
+    "ask-search": ("GET", "/ask/search", lambda q, args: {"params": {"question": q, "top_k": args.top_k}}),
+    "api-search": (
+        "POST",
+        "/api/search",
+        lambda q, args: {"json": {"question": q, "top_k": args.top_k, "use_llm": not args.no_llm}},
+    ),
+}
+
+
+def load_questions(path: Path) -> List[str]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    items = data["questions"] if isinstance(data, dict) else data
+    return [item["question"] if isinstance(item, dict) else item for item in items]
+
+
+def arrival_offsets(rate: float, count: int, process: str, rng: random.Random) -> List[float]:
+    # Send times (seconds from start) for `count` requests at `rate` per second.
+    offsets, t = [], 0.0
+    for _ in range(count):
+        offsets.append(t)
+        t += rng.expovariate(rate) if process == "poisson" else 1.0 / rate
+    return offsets
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    # "embed;dur=12.1, search;dur=0.8" -> {"embed": 12.1, "search": 0.8}
+    stages: Dict[str, float] = {}
+    if not header:
+        return stages
+    for metric in header.split(","):
+        parts = [p.strip() for p in metric.split(";")]
+        for param in parts[1:]:
+            if param.startswith("dur="):
+                try:
+                    stages[parts[0]] = float(param[4:])
+                except ValueError:
+                    pass
+    return stages
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    # Linear interpolation between closest ranks (q in [0, 100]).
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values)
+    summary = {f"p{q}": percentile(ordered, q) for q in (50, 95, 99)}
+    summary["mean"] = sum(ordered) / len(ordered) if ordered else None
+    summary["max"] = ordered[-1] if ordered else None
+    return {k: round(v, 2) if v is not None else None for k, v in summary.items()}
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            response = await client.get("/readyz")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Server not ready after {timeout_s:.0f}s")
+        await asyncio.sleep(1)
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, question: str, args, scheduled: float) -> Dict:
+    method, path, build = ENDPOINTS[endpoint]
+    record = {"endpoint": endpoint, "question": question, "status": None, "error": None, "stages": {}}
+    try:
+        response = await client.request(method, path, **build(question, args))
+        record["status"] = response.status_code
+        record["stages"] = parse_server_timing(response.headers.get("server-timing"))
+        if response.is_error:
+            record["error"] = response.text[:200]
+    except httpx.HTTPError as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    # From the scheduled send time: includes waiting for a free connection
+    record["latency_ms"] = (time.perf_counter() - scheduled) * 1000
+    return record
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    questions = load_questions(args.questions)
+    rng.shuffle(questions)
+
+    total = args.requests or int(args.rate * args.duration)
+    offsets = arrival_offsets(args.rate, args.warmup + total, args.arrival, rng)
+    plan = [
+        (offset, args.endpoints[i % len(args.endpoints)], questions[i % len(questions)])
+        for i, offset in enumerate(offsets)
+    ]
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.wait_ready:
+            print(f"Waiting for {args.base_url}/readyz ...")
+            await wait_until_ready(client, args.wait_ready)
+
+        print(f"Sending {args.warmup} warm-up + {total} requests at {args.rate}/s "
+              f"({args.arrival}) to {', '.join(args.endpoints)}")
+        start = time.perf_counter()
+        tasks = []
+        for offset, endpoint, question in plan:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(client, endpoint, question, args, scheduled)))
+        records = await asyncio.gather(*tasks)
+        wall_s = time.perf_counter() - start
+
+    measured = records[args.warmup:]
+    return {"records": measured, "summary": summarize(measured, wall_s - (offsets[args.warmup] if args.warmup else 0))}
+
+
+def summarize(records: List[Dict], wall_s: float) -> Dict:
+    def group_summary(group: List[Dict]) -> Dict:
+        ok = [r for r in group if r["status"] is not None and r["status"] < 400]
+        errors: Dict[str, int] = defaultdict(int)
+        for r in group:
+            if r not in ok:
+                errors[str(r["status"] or "transport")] += 1
+        stages: Dict[str, List[float]] = defaultdict(list)
+        for r in ok:
+            for stage, ms in r["stages"].items():
+                stages[stage].append(ms)
+        return {
+            "requests": len(group),
+            "ok": len(ok),
+            "errors": dict(errors),
+            "throughput_rps": round(len(ok) / wall_s, 3) if wall_s > 0 else None,
+            "latency_ms": latency_summary([r["latency_ms"] for r in ok]),
+            "stages_ms": {stage: latency_summary(values) for stage, values in sorted(stages.items())},
+        }
+
+    by_endpoint: Dict[str, List[Dict]] = defaultdict(list)
+    for r in records:
+        by_endpoint[r["endpoint"]].append(r)
+    return {
+        "wall_s": round(wall_s, 2),
+        "overall": group_summary(records),
+        "endpoints": {name: group_summary(group) for name, group in by_endpoint.items()},
+    }
+
+
+def print_summary(summary: Dict) -> None:
+    for name, group in [("overall", summary["overall"]), *summary["endpoints"].items()]:
+        lat = group["latency_ms"]
+        print(f"\n[{name}] {group['ok']}/{group['requests']} ok, errors {group['errors'] or '-'}, "
+              f"{group['throughput_rps']} req/s")
+        print(f"  latency ms   p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+        for stage, s in group["stages_ms"].items():
+            print(f"  {stage:<12} p50 {s['p50']}  p95 {s['p95']}  p99 {s['p99']}")
+
+
+def print_comparison(current: Dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('git_commit')}):")
+    for name, group in current["endpoints"].items():
+        old = baseline["summary"]["endpoints"].get(name)
+        if not old:
+            continue
+        rows = [("throughput_rps", old["throughput_rps"], group["throughput_rps"])]
+        rows += [(q, old["latency_ms"][q], group["latency_ms"][q]) for q in ("p50", "p95", "p99")]
+        for stage, s in group["stages_ms"].items():
+            if stage in old["stages_ms"]:
+                rows.append((f"{stage}.p95", old["stages_ms"][stage]["p95"], s["p95"]))
+        print(f"  [{name}]")
+        for label, before, after in rows:
+            change = f"{(after - before) / before * 100:+.1f}%" if before and after is not None else "n/a"
+            print(f"    {label:<18} {before} -> {after} ({change})")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Open-loop load test for the RAG endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=["ask-search"])
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--rate", type=float, default=2.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals")
+    parser.add_argument("--requests", type=int, help="number of requests (overrides --duration)")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--warmup", type=int, default=5, help="initial requests excluded from stats")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--no-llm", action="store_true", help="api-search: sources only")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--wait-ready", type=float, default=300.0, help="seconds to wait for /readyz (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the summary (and raw records) as JSON")
+    parser.add_argument("--compare", type=Path, help="previous JSON result to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_summary(result["summary"])
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "base_url": args.base_url,
+            "endpoints": args.endpoints,
+            "rate": args.rate,
+            "arrival": args.arrival,
+            "requests": len(result["records"]),
+            "seed": args.seed,
+        },
+        "summary": result["summary"],
+        "records": result["records"],
+    }
+    if args.compare:
+        print_comparison(result["summary"], args.compare)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+    if result["summary"]["overall"]["ok"] == 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# Local stand-in for an OpenAI-compatible LLM server (HuggingFace router,
+# vLLM, llama.cpp server). Standard library only. Serves GET /v1/models,
+# POST /v1/chat/completions and POST /v1/completions, with configurable
+# latency, generation speed and injected 429/503 errors; "stream": true
+# responses are sent as server-sent events, one chunk per token.
+#
+#   python scripts/mock_llm_server.py --port 8080 --latency-ms 300 --tokens-per-sec 40 --error-rate 0.05
+#   LLM_API_BASE_URL=http://localhost:8080/v1 python backend/main.py           # chat_completion
+#   LLM_BACKEND=openai LLM_API_BASE=http://localhost:8080/v1 python -m app.main # local pipeline
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+_ANSWER_WORDS = (
+    "According to the provided context, the relevant provision sets out the rights, "
+    "duties and procedure that apply in this case. The applicant must submit the "
+    "required documents to the concerned office, which decides within the time "
+    "limit prescribed by the Act. **TL;DR:** Follow the procedure in the cited section."
+).split()
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like a real server
+    config: argparse.Namespace
+
+    def log_message(self, format: str, *args) -> None:
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/v1/models":
+            return self._send_json(404, {"error": {"message": "not found"}})
+        self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in self.config.models]})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json(400, {"error": {"message": "invalid JSON"}})
+
+        path = self.path.rstrip("/")
+        if path not in ("/v1/chat/completions", "/v1/completions"):
+            return self._send_json(404, {"error": {"message": "not found"}})
+        chat = path == "/v1/chat/completions"
+
+        model = body.get("model", self.config.models[0])
+        latency = self.config.latency_ms + random.uniform(0, self.config.jitter_ms)
+        if model in self.config.slow_models:
+            latency *= self.config.slow_factor
+        time.sleep(latency / 1000)
+
+        roll = random.random()
+        if roll < self.config.error_rate:
+            status = 429 if roll < self.config.error_rate / 2 else 503
+            headers = {"Retry-After": "0.1"} if status == 429 else {}
+            return self._send_json(status, {"error": {"message": "injected failure"}}, headers)
+
+        tokens = _answer_tokens(int(body.get("max_tokens") or 256))
+        prompt_tokens = _estimate_prompt_tokens(body, chat)
+        if body.get("stream"):
+            return self._stream(model, tokens, chat)
+
+        time.sleep(len(tokens) / self.config.tokens_per_sec)
+        text = "".join(tokens)
+        choice = {"index": 0, "finish_reason": "stop"}
+        if chat:
+            choice["message"] = {"role": "assistant", "content": text}
+        else:
+            choice["text"] = text
+        self._send_json(200, {
+            "id": f"mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion" if chat else "text_completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [choice],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        })
+
+    def _stream(self, model: str, tokens: List[str], chat: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i, token in enumerate(tokens):
+            time.sleep(1 / self.config.tokens_per_sec)
+            last = i == len(tokens) - 1
+            if chat:
+                choice = {"index": 0, "delta": {"content": token}}
+            else:
+                choice = {"index": 0, "text": token}
+            choice["finish_reason"] = "stop" if last else None
+            chunk = {"id": "mock-stream", "model": model, "choices": [choice]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict[str, str] | None = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _answer_tokens(max_tokens: int) -> List[str]:
+    # Roughly one token per word; the leading space belongs to the token
+    words = _ANSWER_WORDS[:max_tokens]
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def _estimate_prompt_tokens(body: Dict, chat: bool) -> int:
+    if chat:
+        text = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+    else:
+        text = str(body.get("prompt", ""))
+    return max(1, len(text) // 4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=200, help="time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="uniform extra latency")
+    parser.add_argument("--tokens-per-sec", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429/503 responses")
+    parser.add_argument("--models", nargs="+", default=["meta-llama/Llama-3.1-8B-Instruct"])
+    parser.add_argument("--slow-models", nargs="*", default=[], help="models whose latency is multiplied")
+    parser.add_argument("--slow-factor", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, help="seed latency jitter and error injection for repeatable runs")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    MockLLMHandler.config = args
+    server = ThreadingHTTPServer((args.host, args.port), MockLLMHandler)
+    server.daemon_threads = True
+    print(f"[MockLLM] Serving on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, {args.tokens_per_sec} tok/s, "
+          f"error rate {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
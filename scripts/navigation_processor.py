@@ -3,12 +3,22 @@
 from __future__ import annotations
 
 import json
+import re
 from pathlib import Path
 from typing import Dict, List, Tuple
 
 
 NAVIGATION_DATA_PATH = Path(__file__).resolve().parents[1] / "dataset" / "navigation" / "navigation_data.json"
 OUTPUT_DIR = Path(__file__).resolve().parents[1] / "dataset" / "processed"
+ALIAS_INDEX_PATH = OUTPUT_DIR / "navigation_aliases.json"
+
+# Never used as aliases on their own: they name places or are too generic
+_GENERIC_ALIASES = {
+    "nepal", "pokhara", "kaski", "update", "identity", "dao", "online", "office",
+    "registration", "certificate", "emergency", "helpline", "service", "support",
+}
+# Dropped from emergency service names to get their short alias ("Fire Support" -> "fire")
+_EMERGENCY_FILLER = {"nepal", "support", "response", "helpline", "service", "services", "the"}
 
 
 def load_navigation_data(path: Path = NAVIGATION_DATA_PATH) -> Dict:
@@ -200,6 +210,75 @@ def process_navigation_data() -> Tuple[List[str], List[Dict]]:
     return texts, metadatas
 
 
+def normalize_phrase(text: str) -> str:
+    # Lowercase words and digits (Devanagari kept), single-spaced
+    return " ".join(re.findall(r"[a-z0-9\u0900-\u097f]+", text.lower()))
+
+
+def _service_aliases(service: Dict) -> List[str]:
+    name = service.get("service_name", "")
+    # "Basai Sarai / Migration Certificate" -> both parts; "(if required)" dropped
+    parts = [name] + re.split(r"/|\(|\)", name)
+    return parts + list(service.get("keywords", []))
+
+
+def _emergency_aliases(emergency: Dict) -> List[str]:
+    name = emergency.get("name", "")
+    short_name = " ".join(
+        w for w in normalize_phrase(name.split("(")[0]).split() if w not in _EMERGENCY_FILLER
+    )
+    # "CIAA (Commission for ...)" -> "ciaa" and the full commission name
+    return [name, short_name, emergency.get("short_number", "")] + re.split(r"\(|\)", name)
+
+
+def build_alias_index(data: Dict | None = None) -> Dict:
+    # Alias phrase -> entry ids, over service names, keywords, emergency
+    # names and short numbers. Entries keep the structured record so answers
+    # can be rendered without touching the vector index.
+    data = data or load_navigation_data()
+    entries: List[Dict] = []
+    aliases: Dict[str, List[int]] = {}
+    seen = set()
+
+    for service in data.get("services", []):
+        if "emergency_services" in service:
+            records = [("emergency", e, _emergency_aliases(e)) for e in service["emergency_services"]]
+        elif "service_name" in service:
+            records = [("service", service, _service_aliases(service))]
+        else:
+            continue
+        for kind, record, phrases in records:
+            name = record.get("service_name") or record.get("name", "")
+            if name in seen:  # the dataset repeats a few services
+                continue
+            seen.add(name)
+            entry_id = len(entries)
+            entries.append({"kind": kind, "name": name, "record": record})
+            for phrase in phrases:
+                alias = normalize_phrase(str(phrase))
+                if not alias or alias in _GENERIC_ALIASES:
+                    continue
+                ids = aliases.setdefault(alias, [])
+                if entry_id not in ids:
+                    ids.append(entry_id)
+
+    return {
+        "schema_version": 1,
+        "entries": entries,
+        "aliases": aliases,
+        "max_alias_words": max((len(a.split()) for a in aliases), default=1),
+    }
+
+
+def save_alias_index(output_path: Path = ALIAS_INDEX_PATH) -> Path:
+    index = build_alias_index()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    print(f" Saved {len(index['aliases'])} aliases for {len(index['entries'])} services to {output_path}")
+    return output_path
+
+
 def save_navigation_chunks(output_dir: Path = OUTPUT_DIR) -> None:
 
     texts, metadatas = process_navigation_data()
@@ -237,5 +316,6 @@ if __name__ == "__main__":
         print(texts[0][:1000])
         print("...")
     
-    # Save chunks
+    # Save chunks and the alias index used by the fast path
     save_navigation_chunks()
+    save_alias_index()
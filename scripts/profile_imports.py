@@ -0,0 +1,127 @@
+# Import-time profile and budget check for the API entry points.
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter,
+# sums the self time per top-level package and compares the total against
+# scripts/import_budget.json. Heavy libraries (torch, faiss, ...) listed as
+# "forbidden" must not be imported at all: they belong behind lazy imports.
+#
+#   python scripts/profile_imports.py                 # report for every target
+#   python scripts/profile_imports.py --check         # exit 1 on a budget regression
+#   python scripts/profile_imports.py --target app.main --top 30 --json report.json
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_PATH = Path(__file__).with_name("import_budget.json")
+
+
+def run_importtime(module: str, cwd: Path) -> List[Dict]:
+    # One row per imported module: name, nesting depth, self and cumulative us.
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-5:]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(tail))
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "depth": depth,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return rows
+
+
+def summarize(rows: List[Dict]) -> Dict:
+    by_package: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        by_package[row["module"].split(".")[0]] += row["self_us"]
+    return {
+        "total_ms": round(sum(r["self_us"] for r in rows) / 1000, 1),
+        "modules": len(rows),
+        "packages_ms": {
+            pkg: round(us / 1000, 1)
+            for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])
+        },
+        "imported": sorted({r["module"] for r in rows}),
+    }
+
+
+def profile(module: str, cwd: Path, repeat: int) -> Dict:
+    # The fastest of several runs is the least noisy estimate.
+    runs = [summarize(run_importtime(module, cwd)) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["total_ms"])
+    best["runs_ms"] = [r["total_ms"] for r in runs]
+    return best
+
+
+def check(name: str, report: Dict, budget: Dict) -> List[str]:
+    problems = []
+    if report["total_ms"] > budget["max_ms"]:
+        problems.append(f"{name}: import took {report['total_ms']} ms, budget is {budget['max_ms']} ms")
+    imported_packages = {m.split(".")[0] for m in report["imported"]}
+    for pkg in budget.get("forbidden", []):
+        if pkg in imported_packages:
+            problems.append(f"{name}: imports '{pkg}' eagerly; import it where it is used")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile and budget-check import time")
+    parser.add_argument("--budget", type=Path, default=BUDGET_PATH)
+    parser.add_argument("--target", action="append", help="target name from the budget file (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="packages to list per target")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a budget is exceeded")
+    parser.add_argument("--json", type=Path, help="write the full report to this file")
+    args = parser.parse_args()
+
+    budgets = json.loads(args.budget.read_text(encoding="utf-8"))["targets"]
+    names = args.target or list(budgets)
+
+    reports = {}
+    problems: List[str] = []
+    for name in names:
+        budget = budgets[name]
+        report = profile(budget["module"], ROOT / budget.get("cwd", "."), args.repeat)
+        reports[name] = report
+        problems.extend(check(name, report, budget))
+
+        print(f"\n== {name} (import {budget['module']}): {report['total_ms']} ms "
+              f"over {report['modules']} modules, budget {budget['max_ms']} ms, runs {report['runs_ms']}")
+        for pkg, ms in list(report["packages_ms"].items())[: args.top]:
+            print(f"  {ms:>9.1f} ms  {pkg}")
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+        print(f"\nReport written to {args.json}")
+
+    if problems:
+        print("\nImport budget exceeded:")
+        for problem in problems:
+            print(f"  - {problem}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("\nAll targets within budget.")
+
+
+if __name__ == "__main__":
+    main()
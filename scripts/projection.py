@@ -0,0 +1,162 @@
+# Learned linear projection for a cheaper first-stage vector search.
+# A PCA (or an OPQ rotation) fitted on the corpus maps the 384-dim embeddings
+# to PROJECTION_DIM dims. The first stage searches the projected vectors for a
+# shortlist of PROJECTION_SHORTLIST x top_k candidates; with PROJECTION_RESCORE
+# the shortlist is re-scored with the full vectors, so the returned scores are
+# exact cosine similarities and only candidates missing from the shortlist are
+# lost. The transform is saved next to the index (<index>.projection).
+# Reads PROJECTION_DIM (0 = off), PROJECTION_METHOD (pca or opq),
+# PROJECTION_RESCORE and PROJECTION_SHORTLIST from .env.
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import faiss
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+PROJECTION_DIM = int(os.getenv("PROJECTION_DIM", "0"))
+PROJECTION_METHOD = os.getenv("PROJECTION_METHOD", "pca")
+PROJECTION_RESCORE = os.getenv("PROJECTION_RESCORE", "true").lower() in ("1", "true", "yes")
+PROJECTION_SHORTLIST = int(os.getenv("PROJECTION_SHORTLIST", "4"))
+# Smaller stores are searched at full dimension
+PROJECTION_MIN_TRAIN = 1000
+PROJECTION_MAX_TRAIN = 100_000
+PROJECTION_METHODS = ("pca", "opq")
+# 39 points per centroid for the 256 centroids of each OPQ sub-quantizer
+OPQ_MIN_TRAIN = 39 * 256
+
+
+class Projection:
+    # Wraps a trained FAISS VectorTransform; outputs are L2-normalized so inner
+    # product is still cosine similarity.
+
+    def __init__(self, transform: "faiss.VectorTransform", method: str) -> None:
+        self.transform = transform
+        self.method = method
+
+    @property
+    def d_in(self) -> int:
+        return self.transform.d_in
+
+    @property
+    def d_out(self) -> int:
+        return self.transform.d_out
+
+    @classmethod
+    def fit(
+        cls,
+        vectors: np.ndarray,
+        dim: int,
+        method: str = PROJECTION_METHOD,
+        max_train: int = PROJECTION_MAX_TRAIN,
+        seed: int = 0,
+    ) -> "Projection":
+        import faiss
+
+        d = vectors.shape[1]
+        if not 0 < dim < d:
+            raise ValueError(f"Projection dim must be between 1 and {d - 1}, got {dim}")
+        if method == "pca":
+            transform = faiss.PCAMatrix(d, dim)
+        elif method == "opq":
+            if min(len(vectors), max_train) < OPQ_MIN_TRAIN:
+                print(f"⚠️ OPQ needs {OPQ_MIN_TRAIN} training vectors, got {len(vectors)}; using PCA")
+                return cls.fit(vectors, dim, "pca", max_train, seed)
+            # Rotation learned for product quantization into M sub-spaces
+            transform = faiss.OPQMatrix(d, _opq_subspaces(dim), dim)
+            transform.niter, transform.niter_pq = 10, 4
+            transform.verbose = False
+        else:
+            raise ValueError(f"Unknown projection method '{method}'. Use one of: {', '.join(PROJECTION_METHODS)}")
+
+        sample = vectors
+        if len(vectors) > max_train:
+            sample = vectors[np.random.default_rng(seed).choice(len(vectors), max_train, replace=False)]
+        transform.train(np.ascontiguousarray(sample, dtype=np.float32))
+        return cls(transform, method)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        import faiss
+
+        projected = self.transform.apply_py(np.ascontiguousarray(vectors.reshape(-1, self.d_in), dtype=np.float32))
+        faiss.normalize_L2(projected)
+        return projected
+
+    def build_index(self, vectors: np.ndarray, batch_size: int = 65536) -> "faiss.Index":
+        # Flat index over the projected vectors, same ids as the full index
+        import faiss
+
+        index = faiss.IndexFlatIP(self.d_out)
+        for start in range(0, len(vectors), batch_size):
+            index.add(self.apply(vectors[start:start + batch_size]))
+        return index
+
+    def save(self, path: Path | str) -> None:
+        import faiss
+
+        faiss.write_VectorTransform(self.transform, str(path))
+
+    @classmethod
+    def load(cls, path: Path | str) -> "Projection":
+        import faiss
+
+        transform = faiss.read_VectorTransform(str(path))
+        # OPQ is stored as its plain linear map
+        return cls(transform, "pca" if isinstance(transform, faiss.PCAMatrix) else "opq")
+
+
+def _opq_subspaces(dim: int) -> int:
+    # Largest of 16/8/4/2 sub-spaces that divides dim
+    return next((m for m in (16, 8, 4, 2) if dim % m == 0), 1)
+
+
+def shortlist_search(
+    reduced_index: "faiss.Index",
+    projection: Projection,
+    query_emb: np.ndarray,
+    top_k: int,
+    full_vectors: Callable[[np.ndarray], np.ndarray] | None = None,
+    shortlist: int = PROJECTION_SHORTLIST,
+    min_score: float | None = None,
+    params=None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # (scores, ids) of the top_k hits, best first. With full_vectors (ids ->
+    # full-dim rows) the shortlist is re-scored at full dimension; otherwise
+    # the projected scores are returned.
+    k = min(max(top_k * shortlist, top_k), reduced_index.ntotal)
+    if k <= 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    scores, ids = reduced_index.search(projection.apply(query_emb), k, params=params)
+    scores, ids = scores[0], ids[0]
+    keep = ids >= 0
+    scores, ids = scores[keep], ids[keep]
+    if full_vectors is not None and len(ids):
+        scores = full_vectors(ids) @ query_emb.reshape(-1).astype(np.float32)
+    order = np.argsort(-scores)
+    scores, ids = scores[order], ids[order]
+    if min_score is not None:
+        keep = scores >= min_score
+        scores, ids = scores[keep], ids[keep]
+    return scores[:top_k], ids[:top_k]
+
+
+__all__ = [
+    "Projection",
+    "shortlist_search",
+    "PROJECTION_DIM",
+    "PROJECTION_METHOD",
+    "PROJECTION_METHODS",
+    "PROJECTION_MIN_TRAIN",
+    "PROJECTION_RESCORE",
+    "PROJECTION_SHORTLIST",
+]
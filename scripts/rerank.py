@@ -0,0 +1,167 @@
+# Cross-encoder reranking for retrieved chunks.
+# Over-retrieve candidates from FAISS, score them in one batched pass and
+# forward only the best few to the LLM. Reads RERANK_* settings from .env.
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+DEFAULT_RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "24"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "4"))
+RERANK_TIMEOUT_MS = int(os.getenv("RERANK_TIMEOUT_MS", "500"))
+
+
+class CrossEncoderReranker:
+
+    def __init__(
+        self,
+        model_name: str | None = None,
+        timeout_ms: int = RERANK_TIMEOUT_MS,
+        cache_size: int = 4096,
+        batch_size: int = 32,
+    ) -> None:
+        self.model_name = model_name or DEFAULT_RERANK_MODEL
+        self.timeout_ms = timeout_ms
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._model = None
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = Lock()
+        self._load_lock = Lock()
+        # Scoring runs off the request thread so it can be abandoned at the deadline
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        # A batch abandoned at its deadline that is still running; new batches
+        # would only queue behind it, so requests fall back until it finishes
+        self._stale: Future | None = None
+        self.stats = {
+            "requests": 0,
+            "fallbacks": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "tokens_saved_total": 0,
+            "last_tokens_saved": 0,
+        }
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def rerank(
+        self,
+        question: str,
+        hits: List[Dict],
+        top_k: int = RERANK_TOP_K,
+        baseline_k: Optional[int] = None,
+    ) -> List[Dict]:
+        # Returns the best top_k hits (with "rerank_score"), or the first top_k
+        # in vector order if the cross-encoder misses its latency budget, is
+        # still busy with an abandoned batch, or fails.
+        if not hits:
+            return []
+        self.stats["requests"] += 1
+        start = time.perf_counter()
+
+        keys = [_cache_key(question, h["text"]) for h in hits]
+        with self._lock:
+            scores: List[Optional[float]] = [self._cache.get(k) for k in keys]
+            for k, s in zip(keys, scores):
+                if s is not None:
+                    self._cache.move_to_end(k)
+                    self.stats["cache_hits"] += 1
+
+        missing = [i for i, s in enumerate(scores) if s is None]
+        self.stats["cache_misses"] += len(missing)
+        if missing:
+            # Load the model before the deadline starts, so the first request
+            # is reranked rather than timing out while the model loads
+            try:
+                self.model
+            except Exception as e:
+                self.stats["fallbacks"] += 1
+                print(f"[Rerank] Model failed to load ({e}), using vector order")
+                return hits[:top_k]
+            stale = self._stale
+            if stale is not None and not stale.done():
+                self.stats["fallbacks"] += 1
+                print("[Rerank] Previous batch still running, using vector order")
+                return hits[:top_k]
+            future = self._executor.submit(
+                self._score, [keys[i] for i in missing], [(question, hits[i]["text"]) for i in missing]
+            )
+            try:
+                for i, s in zip(missing, future.result(timeout=self.timeout_ms / 1000)):
+                    scores[i] = s
+            except FutureTimeout:
+                # A queued batch is dropped; a running one keeps going and still
+                # warms the cache for next time
+                if not future.cancel():
+                    self._stale = future
+                self.stats["fallbacks"] += 1
+                print(f"[Rerank] Budget of {self.timeout_ms}ms exceeded, using vector order")
+                return hits[:top_k]
+            except Exception as e:
+                # e.g. sentence-transformers missing or the model failing to load
+                self.stats["fallbacks"] += 1
+                print(f"[Rerank] Failed ({e}), using vector order")
+                return hits[:top_k]
+
+        order = sorted(range(len(hits)), key=lambda i: scores[i], reverse=True)[:top_k]
+        reranked = [{**hits[i], "rerank_score": float(scores[i])} for i in order]
+
+        saved = self._count_tokens(hits[: baseline_k or top_k]) - self._count_tokens(reranked)
+        self.stats["tokens_saved_total"] += max(saved, 0)
+        self.stats["last_tokens_saved"] = saved
+        print(
+            f"[Rerank] {len(hits)} -> {len(reranked)} chunks in "
+            f"{(time.perf_counter() - start) * 1000:.1f}ms, {saved} prompt tokens saved"
+        )
+        return reranked
+
+    def _score(self, keys: List[Tuple[str, str]], pairs: List[Tuple[str, str]]) -> List[float]:
+        scores = [float(s) for s in self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)]
+        with self._lock:
+            for k, s in zip(keys, scores):
+                self._cache[k] = s
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return scores
+
+    def _count_tokens(self, hits: List[Dict]) -> int:
+        tokenizer = getattr(self._model, "tokenizer", None)
+        texts = [h["text"] for h in hits]
+        if tokenizer is None:
+            return sum(len(t) // 4 for t in texts)
+        return sum(len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"])
+
+
+def _cache_key(question: str, text: str) -> Tuple[str, str]:
+    return " ".join(question.lower().split()), hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+__all__ = [
+    "CrossEncoderReranker",
+    "DEFAULT_RERANK_MODEL",
+    "RERANK_ENABLED",
+    "RERANK_CANDIDATES",
+    "RERANK_TOP_K",
+]
@@ -0,0 +1,173 @@
+# Sentence-level embeddings for extractive context compression.
+# Sentences of every chunk are embedded once at index build time and stored as
+# float16 rows in a CSR layout (chunk i owns rows offsets[i]:offsets[i+1]).
+# At query time only the best sentences of each hit (plus neighbours) are kept.
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def split_sentences(text: str, min_chars: int = 40) -> List[Tuple[int, int]]:
+    # (start, end) spans; short fragments such as clause numbers are merged forward.
+    raw_spans = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        raw_spans.append((start, match.start()))
+        start = match.end()
+    raw_spans.append((start, len(text)))
+
+    spans: List[Tuple[int, int]] = []
+    for s, e in raw_spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if e <= s:
+            continue
+        if spans and spans[-1][1] - spans[-1][0] < min_chars:
+            spans[-1] = (spans[-1][0], e)
+        else:
+            spans.append((s, e))
+    return spans
+
+
+class SentenceIndex:
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.embeddings: np.ndarray | None = None
+        self.spans: np.ndarray | None = None
+        self.offsets: np.ndarray | None = None
+        self._parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self.offsets is not None
+
+    def build(self, texts: List[str], embedding_model, batch_size: int = 256) -> None:
+        self.reset()
+        self.add(texts, embedding_model, batch_size)
+        self.finish()
+
+    def reset(self) -> None:
+        # Start an incremental build: add() batches of chunks, then finish()
+        self.embeddings = self.spans = self.offsets = None
+        self._parts = []
+
+    def add(self, texts: List[str], embedding_model, batch_size: int = 256) -> None:
+        spans_per_chunk = [split_sentences(t) for t in texts]
+        counts = np.array([len(s) for s in spans_per_chunk], dtype=np.int64)
+        spans = np.asarray(
+            [span for spans in spans_per_chunk for span in spans], dtype=np.int32
+        ).reshape(-1, 2)
+
+        embeddings = np.zeros((len(spans), embedding_model.dimension), dtype=np.float16)
+        sentences = [t[s:e] for t, spans in zip(texts, spans_per_chunk) for s, e in spans]
+        for i in range(0, len(sentences), batch_size):
+            embeddings[i : i + batch_size] = embedding_model.embed(sentences[i : i + batch_size])
+        self._parts.append((counts, spans, embeddings))
+
+    def finish(self) -> None:
+        counts, spans, embeddings = zip(*self._parts) if self._parts else ([], [], [])
+        counts = np.concatenate(counts) if counts else np.empty(0, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.spans = np.concatenate(spans) if spans else np.empty((0, 2), dtype=np.int32)
+        self.embeddings = np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float16)
+        self._parts = []
+        print(f" Embedded {len(self.spans)} sentences for context compression")
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb") as f:
+            np.savez(f, embeddings=self.embeddings, spans=self.spans, offsets=self.offsets)
+
+    def load(self, expected_chunks: int) -> bool:
+        if not self.path.exists():
+            return False
+        with np.load(self.path) as data:
+            if len(data["offsets"]) - 1 != expected_chunks:
+                print(f"⚠️ Sentence index at {self.path} is stale, ignoring it")
+                return False
+            self.embeddings = data["embeddings"]
+            self.spans = data["spans"]
+            self.offsets = data["offsets"]
+        return True
+
+    def select(
+        self,
+        chunk_ids: List[int],
+        query_emb: np.ndarray,
+        top_n: int = 3,
+        neighbours: int = 1,
+    ) -> List[Optional[List[Tuple[int, int, bool]]]]:
+        # One matrix product scores every sentence of every hit against the query.
+        # Returns per chunk the selected (start, end, is_top) spans in text order.
+        query = np.asarray(query_emb, dtype=np.float32).reshape(-1)
+        ids = np.asarray(chunk_ids, dtype=np.int64)
+        starts = self.offsets[ids]
+        counts = self.offsets[ids + 1] - starts
+        rows = np.concatenate([np.arange(s, s + c) for s, c in zip(starts, counts)]) if len(ids) else np.empty(0, np.int64)
+        scores = self.embeddings[rows].astype(np.float32) @ query
+
+        selections: List[Optional[List[Tuple[int, int, bool]]]] = []
+        pos = 0
+        for start, count in zip(starts, counts):
+            count = int(count)
+            if count == 0:
+                selections.append(None)
+                continue
+            chunk_scores = scores[pos : pos + count]
+            pos += count
+            top = set(np.argsort(-chunk_scores)[:top_n].tolist())
+            keep = set()
+            for i in top:
+                keep.update(range(max(0, i - neighbours), min(count, i + neighbours + 1)))
+            selections.append(
+                [(int(self.spans[start + i][0]), int(self.spans[start + i][1]), i in top) for i in sorted(keep)]
+            )
+        return selections
+
+
+def build_excerpt(text: str, selected: List[Tuple[int, int, bool]]) -> Tuple[str, List[List[int]]]:
+    # Join selected sentences ("..." between gaps). Highlights are [start, end]
+    # offsets of the top-scoring sentences within the excerpt.
+    parts: List[str] = []
+    highlights: List[List[int]] = []
+    length = 0
+    prev_end = None
+    for start, end, is_top in selected:
+        if prev_end is not None:
+            sep = " " if not text[prev_end:start].strip() else " ... "
+            parts.append(sep)
+            length += len(sep)
+        if is_top:
+            highlights.append([length, length + end - start])
+        parts.append(text[start:end])
+        length += end - start
+        prev_end = end
+    return "".join(parts), highlights
+
+
+def format_preview(hit: Dict, limit: int = 400) -> str:
+    # Markdown preview of a hit: highlighted excerpt if compressed, else a prefix.
+    excerpt = hit.get("excerpt")
+    if not excerpt:
+        return hit["text"][:limit] + "..." if len(hit["text"]) > limit else hit["text"]
+    out = []
+    last = 0
+    for start, end in hit.get("highlights", []):
+        out.append(excerpt[last:start])
+        out.append(f"**{' '.join(excerpt[start:end].split())}**")
+        last = end
+    out.append(excerpt[last:])
+    return "".join(out)
+
+
+__all__ = ["SentenceIndex", "split_sentences", "build_excerpt", "format_preview"]
@@ -0,0 +1,312 @@
+# Query-routed sharded FAISS store.
+# The corpus is split into one FaissVectorStore per domain: a "navigation"
+# shard for the government service entries and one shard per Act for the
+# legal chunks. Each question is routed before search:
+#   navigation -> the navigation shard (plus Acts named in the question)
+#   legal      -> the Acts closest to the query (centroid similarity + names)
+#   mixed      -> both, searched in parallel and merged by score
+# Reads SHARD_ACT_FANOUT (Acts searched per legal query, 0 = all) from .env.
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from dedup import DEDUP_THRESHOLD
+from embedding import EmbeddingModel
+from llm_wrapper import detect_query_type
+from vector import BUILD_BATCH_SIZE, FaissVectorStore, _iter_build_chunks, dedup_batches, embed_texts
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+SHARD_ACT_FANOUT = int(os.getenv("SHARD_ACT_FANOUT", "0"))
+NAVIGATION_SHARD = "navigation"
+
+# Words in Act filenames that say nothing about the subject
+_NAME_STOPWORDS = {"act", "acts", "the", "of", "and", "to", "relating", "nepal", "national", "code", "on", "for"}
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+
+
+def _shard_name(meta: Dict) -> str:
+    # One shard per Act, one for navigation
+    if meta.get("type") == "navigation":
+        return NAVIGATION_SHARD
+    return "legal-" + _slug(Path(meta.get("filename", "unknown")).stem)
+
+
+def _name_keywords(filename: str) -> List[str]:
+    # "Citizenship-Act(2063).pdf" -> ["citizenship"]
+    words = re.findall(r"[a-z]+", Path(filename).stem.lower())
+    return sorted({w for w in words if len(w) > 3 and w not in _NAME_STOPWORDS})
+
+
+class ShardedVectorStore:
+    # Same search interface as FaissVectorStore. Hit ids are shard-local;
+    # every hit carries the name of its shard in "shard".
+
+    def __init__(
+        self,
+        shard_dir: Path | str = Path("database/shards"),
+        act_fanout: int = SHARD_ACT_FANOUT,
+        dedup_threshold: float = DEDUP_THRESHOLD,
+    ) -> None:
+        self.shard_dir = Path(shard_dir)
+        self.manifest_path = self.shard_dir / "manifest.json"
+        self.act_fanout = act_fanout
+        # Near-duplicates are found within each shard (0 disables)
+        self.dedup_threshold = dedup_threshold
+        self.shards: Dict[str, FaissVectorStore] = {}
+        # name -> {"domain", "filename", "chunks", "keywords"}
+        self.manifest: Dict[str, Dict] = {}
+        self.centroids: np.ndarray | None = None
+        self._act_names: List[str] = []
+        self._metadata: List[Dict] | None = None
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="shard")
+        self.stats = {"queries": 0, "shards_searched": 0, "routes": defaultdict(int)}
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def build(
+        self,
+        processed_dir: str | Path = "dataset/processed",
+        navigation_dir: str | Path | None = "dataset/navigation",
+        embedding_model: EmbeddingModel | None = None,
+        include_navigation: bool = True,
+        batch_size: int = BUILD_BATCH_SIZE,
+    ) -> None:
+        # Streams the corpus like FaissVectorStore.build_streaming: each batch
+        # is embedded once, then appended to the shards its chunks belong to.
+        # A near-duplicate of a chunk in the same shard is stored as a reference
+        # on that chunk. Chunks are not deduplicated across shards: a reference
+        # in one Act's shard would be invisible to queries routed (or filtered)
+        # to the other Act.
+        embedding_model = embedding_model or EmbeddingModel()
+        chunks = _iter_build_chunks(processed_dir, navigation_dir if include_navigation else None)
+
+        shards: Dict[str, FaissVectorStore] = {}
+        sums: Dict[str, np.ndarray] = {}
+        for entries in dedup_batches(chunks, batch_size, self.dedup_threshold, scope=_shard_name):
+            embeddings = embed_texts([e["text"] for e in entries], embedding_model)
+            groups: Dict[str, List[int]] = defaultdict(list)
+            for i, entry in enumerate(entries):
+                groups[_shard_name(entry["metadata"])].append(i)
+            for name, ids in groups.items():
+                if name not in shards:
+                    shards[name] = self._shard_store(name)
+                    shards[name].begin_build(embedding_model.dimension)
+                    sums[name] = np.zeros(embedding_model.dimension, dtype=np.float64)
+                shards[name].append([entries[i] for i in ids], embeddings[ids], embedding_model)
+                sums[name] += embeddings[ids].sum(axis=0)
+        if not shards:
+            raise ValueError("No chunks to index")
+        duplicates = sum(len(e.get("duplicates", ())) for shard in shards.values() for e in shard.metadata)
+        if duplicates:
+            print(f" Stored {duplicates} near-duplicate chunks as references")
+        print(f"📚 Sharded {sum(len(s.metadata) for s in shards.values())} chunks into {len(shards)} shards")
+
+        self.shards, self.manifest = {}, {}
+        for name, shard in sorted(shards.items()):
+            shard.finish_build()
+            filename = shard.metadata[0]["metadata"].get("filename", "")
+            domain = "navigation" if name == NAVIGATION_SHARD else "legal"
+            self.shards[name] = shard
+            self.manifest[name] = {
+                "domain": domain,
+                "filename": filename,
+                "chunks": len(shard.metadata),
+                "keywords": _name_keywords(filename) if domain == "legal" else [],
+            }
+
+        self._act_names = [n for n, m in self.manifest.items() if m["domain"] == "legal"]
+        self.centroids = self._compute_centroids(sums, embedding_model.dimension)
+        self._metadata = None
+        self.save()
+        print(f" Built {len(self.shards)} shards in {self.shard_dir}")
+
+    def save(self) -> None:
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        np.save(self.shard_dir / "centroids.npy", self.centroids)
+        self.manifest_path.write_text(
+            json.dumps({"acts": self._act_names, "shards": self.manifest}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+    def load(self) -> None:
+        if not self.exists():
+            raise FileNotFoundError(f"Shard manifest not found at {self.manifest_path}")
+        data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        self.manifest = data["shards"]
+        self._act_names = data["acts"]
+        self.centroids = np.load(self.shard_dir / "centroids.npy")
+        self.shards = {}
+        for name in self.manifest:
+            shard = self._shard_store(name)
+            shard.load()
+            self.shards[name] = shard
+        self._metadata = None
+
+    @property
+    def metadata(self) -> List[Dict]:
+        # All entries across shards (for counting and inspection)
+        if self._metadata is None:
+            self._metadata = [entry for shard in self.shards.values() for entry in shard.metadata]
+        return self._metadata
+
+    def route(
+        self,
+        question: str | None,
+        query_emb: np.ndarray,
+        filters: Dict[str, str | Sequence[str]] | None = None,
+    ) -> Tuple[str, List[str]]:
+        # Returns (route, shard names). Explicit type/filename filters win over
+        # the question classifier.
+        navigation = [n for n, m in self.manifest.items() if m["domain"] == "navigation"]
+        filters = filters or {}
+
+        if "filename" in filters:
+            wanted = filters["filename"]
+            wanted = {wanted} if isinstance(wanted, str) else set(wanted)
+            return "filtered", [n for n, m in self.manifest.items() if m["filename"] in wanted]
+        if "type" in filters:
+            wanted = filters["type"]
+            wanted = {wanted} if isinstance(wanted, str) else set(wanted)
+            names = (navigation if "navigation" in wanted else []) + (
+                self._select_acts(question, query_emb) if "legal" in wanted else []
+            )
+            return "filtered", names
+        if question is None:
+            return "all", list(self.manifest)
+
+        query_type = detect_query_type(question)
+        if query_type == "navigation":
+            return query_type, navigation + self._named_acts(question)
+        acts = self._select_acts(question, query_emb)
+        return query_type, acts + (navigation if query_type == "mixed" else [])
+
+    def search(
+        self,
+        query: str,
+        embedding_model: EmbeddingModel | None = None,
+        top_k: int = 5,
+        min_score: float = 0.3,
+        filters: Dict[str, str | Sequence[str]] | None = None,
+        compress: bool = False,
+    ) -> List[Dict]:
+        embedding_model = embedding_model or EmbeddingModel()
+        query_emb = embedding_model.embed([query]).astype(np.float32)
+        if not embedding_model.normalize:
+            import faiss
+
+            faiss.normalize_L2(query_emb)
+        hits = self.search_vector(query_emb, top_k=top_k, min_score=min_score, filters=filters, question=query)
+        if compress:
+            self.compress_hits(hits, query_emb)
+        return hits
+
+    def search_vector(
+        self,
+        query_emb: np.ndarray,
+        top_k: int = 5,
+        min_score: float = 0.3,
+        filters: Dict[str, str | Sequence[str]] | None = None,
+        question: str | None = None,
+    ) -> List[Dict]:
+        # Scatter to the routed shards, gather the overall top_k by score.
+        if not self.shards:
+            self.load()
+        query_emb = np.ascontiguousarray(query_emb.reshape(1, -1), dtype=np.float32)
+        route, names = self.route(question, query_emb, filters)
+        self.stats["queries"] += 1
+        self.stats["routes"][route] += 1
+        self.stats["shards_searched"] += len(names)
+
+        # The remaining filters are pushed down into each shard
+        shard_filters = {f: v for f, v in (filters or {}).items() if f not in ("type", "filename")} or None
+
+        def search_shard(name: str) -> List[Dict]:
+            hits = self.shards[name].search_vector(query_emb, top_k=top_k, min_score=min_score, filters=shard_filters)
+            for hit in hits:
+                hit["shard"] = name
+            return hits
+
+        if len(names) == 1:
+            per_shard = [search_shard(names[0])]
+        else:
+            # FAISS releases the GIL, so shards are searched concurrently
+            per_shard = list(self._executor.map(search_shard, names))
+        return heapq.nlargest(top_k, (hit for hits in per_shard for hit in hits), key=lambda h: h["score"])
+
+    def compress_hits(
+        self,
+        hits: List[Dict],
+        query_emb: np.ndarray,
+        top_n: int = 3,
+        neighbours: int = 1,
+    ) -> List[Dict]:
+        by_shard: Dict[str, List[Dict]] = defaultdict(list)
+        for hit in hits:
+            by_shard[hit["shard"]].append(hit)
+        for name, shard_hits in by_shard.items():
+            self.shards[name].compress_hits(shard_hits, query_emb, top_n, neighbours)
+        return hits
+
+    def get_stats(self) -> Dict:
+        queries = max(self.stats["queries"], 1)
+        return {
+            "shards": len(self.shards),
+            "acts": len(self._act_names),
+            "act_fanout": self.act_fanout,
+            "queries": self.stats["queries"],
+            "routes": dict(self.stats["routes"]),
+            "avg_shards_per_query": round(self.stats["shards_searched"] / queries, 2),
+        }
+
+    def _select_acts(self, question: str | None, query_emb: np.ndarray) -> List[str]:
+        # Acts whose centroid is closest to the query, plus Acts named in it.
+        if self.act_fanout <= 0 or self.act_fanout >= len(self._act_names):
+            return list(self._act_names)
+        scores = self.centroids @ query_emb.reshape(-1)
+        closest = [self._act_names[i] for i in np.argsort(-scores)[: self.act_fanout]]
+        named = self._named_acts(question) if question else []
+        return closest + [n for n in named if n not in closest]
+
+    def _named_acts(self, question: str) -> List[str]:
+        words = set(re.findall(r"[a-z]+", question.lower()))
+        return [n for n in self._act_names if words.intersection(self.manifest[n]["keywords"])]
+
+    def _compute_centroids(self, sums: Dict[str, np.ndarray], dimension: int) -> np.ndarray:
+        # Normalized mean embedding of each Act, from the per-shard sums
+        if not self._act_names:
+            return np.zeros((0, dimension), dtype=np.float32)
+        centroids = np.stack([sums[name] for name in self._act_names])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+        return centroids.astype(np.float32)
+
+    def _shard_store(self, name: str) -> FaissVectorStore:
+        return FaissVectorStore(
+            index_path=self.shard_dir / f"{name}.index",
+            metadata_path=self.shard_dir / f"{name}.json",
+        )
+
+
+__all__ = ["ShardedVectorStore", "SHARD_ACT_FANOUT", "NAVIGATION_SHARD"]
+
+
+if __name__ == "__main__":
+    # Build the sharded store from the processed corpus
+    ShardedVectorStore().build()
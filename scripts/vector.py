@@ -4,14 +4,27 @@
 
 from __future__ import annotations
 
+import itertools
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
 
-import faiss
 import numpy as np
 
+from corpus import find_corpus, iter_batches, iter_chunk_files, iter_chunks
+from dedup import DEDUP_THRESHOLD, MinHashLSH
 from embedding import EmbeddingModel
+from projection import PROJECTION_DIM, PROJECTION_MIN_TRAIN, PROJECTION_RESCORE, Projection, shortlist_search
+from sentences import SentenceIndex, build_excerpt
+
+if TYPE_CHECKING:
+    import faiss
+
+# Metadata fields that can be pushed into the FAISS search as filters
+FILTERABLE_FIELDS = ("type", "filename", "year", "category", "service_name")
+
+# Chunks embedded and indexed per step of a streaming build
+BUILD_BATCH_SIZE = 256
 
 
 class FaissVectorStore:
@@ -22,11 +35,29 @@ class FaissVectorStore:
         self,
         index_path: Path | str = Path("database/legal_faiss.index"),
         metadata_path: Path | str = Path("database/legal_faiss_meta.json"),
+        sentences_path: Path | str | None = None,
+        dedup_threshold: float = DEDUP_THRESHOLD,
+        projection_dim: int = PROJECTION_DIM,
+        projection_rescore: bool = PROJECTION_RESCORE,
     ) -> None:
         self.index_path = Path(index_path)
         self.metadata_path = Path(metadata_path)
         self.index: faiss.Index | None = None
         self.metadata: List[Dict] = []
+        # Sentence embeddings for query-time context compression
+        self.sentences = SentenceIndex(
+            sentences_path or self.index_path.with_suffix(".sentences.npz")
+        )
+        # Lazily built inverted lists: field -> value -> vector ids
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {}
+        # Near-duplicate chunks are indexed once at build time (0 disables)
+        self.dedup_threshold = dedup_threshold
+        # Optional reduced-dimension first stage (0 disables)
+        self.projection_dim = projection_dim
+        self.projection_rescore = projection_rescore
+        self.projection_path = self.index_path.with_suffix(".projection")
+        self.projection: Projection | None = None
+        self.reduced_index: faiss.Index | None = None
 
     def build(
         self,
@@ -36,53 +67,90 @@ class FaissVectorStore:
         include_navigation: bool = True,
     ) -> None:
         embedding_model = embedding_model or EmbeddingModel()
-        
-        # Load legal documents
-        texts, metadatas = _load_texts_and_metadata(str(processed_dir))
-        print(f"📚 Loaded {len(texts)} legal document chunks")
-        
-        # Load navigation data if enabled
-        if include_navigation and navigation_dir:
-            nav_texts, nav_metas = _load_navigation_data(str(navigation_dir))
-            if nav_texts:
-                texts.extend(nav_texts)
-                metadatas.extend(nav_metas)
-                print(f" Loaded {len(nav_texts)} navigation service chunks")
-        
-        print(f" Total chunks to embed: {len(texts)}")
+        chunks = _iter_build_chunks(processed_dir, navigation_dir if include_navigation else None)
+        self.build_streaming(chunks, embedding_model)
+        print(f" Built FAISS index with {len(self.metadata)} total entries")
 
-        embeddings = embedding_model.embed(texts)
-        if not embedding_model.normalize:
-            faiss.normalize_L2(embeddings)
+    def build_streaming(
+        self,
+        chunks: Iterable[Tuple[str | None, str, Dict]],
+        embedding_model: EmbeddingModel,
+        batch_size: int = BUILD_BATCH_SIZE,
+    ) -> None:
+        # Index (chunk_id, text, metadata) records batch by batch: only one
+        # batch of texts and embeddings is held besides the index itself.
+        # A near-duplicate of an indexed chunk is not embedded again; it is
+        # added to that chunk's "duplicates" so its source is still cited.
+        self.begin_build(embedding_model.dimension)
+        for entries in dedup_batches(chunks, batch_size, self.dedup_threshold):
+            self.append(entries, embed_texts([e["text"] for e in entries], embedding_model), embedding_model)
+        duplicates = sum(len(e.get("duplicates", ())) for e in self.metadata)
+        if duplicates:
+            print(f" Stored {duplicates} near-duplicate chunks as references")
+        self.finish_build()
 
-        dim = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dim)
-        self.index.add(embeddings)
+    def begin_build(self, dimension: int) -> None:
+        # Start an empty index: append() batches of entries, then finish_build()
+        import faiss  # imported where used to keep module import cheap
 
-        # Persist metadata aligned by vector id
-        self.metadata = [
-            {"id": idx, "text": text, "metadata": meta}
-            for idx, (text, meta) in enumerate(zip(texts, metadatas))
-        ]
+        self.index = faiss.IndexFlatIP(dimension)
+        self.metadata = []
+        self._postings = {}
+        self.sentences.reset()
+
+    def append(self, entries: List[Dict], embeddings: np.ndarray, embedding_model: EmbeddingModel) -> None:
+        # Add new_entry() records with their normalized embeddings
+        for entry in entries:
+            entry["id"] = len(self.metadata)
+            self.metadata.append(entry)
+        self.index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+        self.sentences.add([e["text"] for e in entries], embedding_model)
 
+    def finish_build(self) -> None:
+        if not self.metadata:
+            raise ValueError("No chunks to index")
+        self.sentences.finish()
+        self._fit_projection()
         self.save()
-        print(f" Built FAISS index with {len(self.metadata)} total entries")
 
     def save(self) -> None:
         if self.index is None:
             raise RuntimeError("Index not built or loaded")
+        import faiss
+
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
         self.metadata_path.parent.mkdir(parents=True, exist_ok=True)
         faiss.write_index(self.index, str(self.index_path))
-        self.metadata_path.write_text(json.dumps(self.metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+        with open(self.metadata_path, "w", encoding="utf-8") as f:
+            # Encoded piece by piece instead of as one string
+            for part in json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(self.metadata):
+                f.write(part)
+        if self.sentences.loaded:
+            self.sentences.save()
+        if self.projection is not None:
+            self.projection.save(self.projection_path)
 
     def load(self) -> None:
         if not self.index_path.exists():
             raise FileNotFoundError(f"FAISS index not found at {self.index_path}")
         if not self.metadata_path.exists():
             raise FileNotFoundError(f"Metadata file not found at {self.metadata_path}")
+        import faiss
+
         self.index = faiss.read_index(str(self.index_path))
         self.metadata = json.loads(self.metadata_path.read_text(encoding="utf-8"))
+        self._postings = {}
+        self.sentences.load(len(self.metadata))
+
+        self.projection = self.reduced_index = None
+        if self.projection_dim > 0:
+            if self.projection_path.exists():
+                self.projection = Projection.load(self.projection_path)
+            if self.projection is None or self.projection.d_out != self.projection_dim:
+                if self._fit_projection():
+                    self.projection.save(self.projection_path)
+            else:
+                self.reduced_index = self.projection.build_index(self.index.reconstruct_n(0, self.index.ntotal))
 
     def search(
         self,
@@ -90,64 +158,241 @@ class FaissVectorStore:
         embedding_model: EmbeddingModel | None = None,
         top_k: int = 5,
         min_score: float = 0.3,
+        filters: Dict[str, str | Sequence[str]] | None = None,
+        compress: bool = False,
     ) -> List[Dict]:
+        embedding_model = embedding_model or EmbeddingModel()
+        query_emb = embedding_model.embed([query]).astype(np.float32)
+        if not embedding_model.normalize:
+            import faiss
+
+            faiss.normalize_L2(query_emb)
+        hits = self.search_vector(query_emb, top_k=top_k, min_score=min_score, filters=filters)
+        if compress:
+            self.compress_hits(hits, query_emb)
+        return hits
+
+    def compress_hits(
+        self,
+        hits: List[Dict],
+        query_emb: np.ndarray,
+        top_n: int = 3,
+        neighbours: int = 1,
+    ) -> List[Dict]:
+        # Adds "excerpt" (best sentences plus neighbours) and "highlights" to
+        # hits that have sentence embeddings. Full "text" is left untouched.
+        if not self.sentences.loaded or not hits:
+            return hits
+        selections = self.sentences.select([h["id"] for h in hits], query_emb, top_n, neighbours)
+        for hit, selected in zip(hits, selections):
+            if selected:
+                hit["excerpt"], hit["highlights"] = build_excerpt(hit["text"], selected)
+        return hits
+
+    def search_vector(
+        self,
+        query_emb: np.ndarray,
+        top_k: int = 5,
+        min_score: float = 0.3,
+        filters: Dict[str, str | Sequence[str]] | None = None,
+        question: str | None = None,
+    ) -> List[Dict]:
+        # `question` is unused here; ShardedVectorStore routes on it.
+        # Filters are pushed into FAISS as an ID selector and the score cut-off
+        # is a range search, so we get exactly the top_k qualifying hits
+        # without over-fetching candidates and dropping them afterwards.
+        import faiss
+
         if self.index is None:
             self.load()
         if self.index is None:
             raise RuntimeError("Index failed to load")
 
-        embedding_model = embedding_model or EmbeddingModel()
-        query_emb = embedding_model.embed([query]).astype(np.float32)
-        if not embedding_model.normalize:
-            faiss.normalize_L2(query_emb)
+        query_emb = np.ascontiguousarray(query_emb.reshape(1, -1), dtype=np.float32)
+
+        params = None
+        allowed_ids = self._filter_ids(filters)
+        if allowed_ids is not None:
+            if len(allowed_ids) == 0:
+                return []
+            selector = faiss.IDSelectorBatch(len(allowed_ids), faiss.swig_ptr(allowed_ids))
+            params = faiss.SearchParameters(sel=selector)
+
+        if self.reduced_index is not None:
+            # Projected first stage; the shortlist is re-scored at full dimension
+            scores, idxs = shortlist_search(
+                self.reduced_index,
+                self.projection,
+                query_emb,
+                top_k,
+                full_vectors=self.index.reconstruct_batch if self.projection_rescore else None,
+                min_score=min_score,
+                params=params,
+            )
+        elif min_score is not None:
+            lims, scores, idxs = self.index.range_search(query_emb, float(min_score), params=params)
+            scores, idxs = scores[lims[0]:lims[1]], idxs[lims[0]:lims[1]]
+            order = np.argsort(-scores)[:top_k]
+            scores, idxs = scores[order], idxs[order]
+        else:
+            k = min(top_k, self.index.ntotal if allowed_ids is None else len(allowed_ids))
+            scores, idxs = self.index.search(query_emb, k, params=params)
+            scores, idxs = scores[0], idxs[0]
 
-        # Fetch more candidates to filter by score
-        scores, idxs = self.index.search(query_emb, top_k * 2)
         results: List[Dict] = []
-        for score, idx in zip(scores[0], idxs[0]):
+        for score, idx in zip(scores, idxs):
             if idx < 0 or idx >= len(self.metadata):
                 continue
-            # Filter out low similarity scores
-            if float(score) < min_score:
-                continue
             meta_entry = self.metadata[idx]
-            results.append(
-                {
-                    "score": float(score),
-                    "text": meta_entry["text"],
-                    "metadata": meta_entry["metadata"],
-                    "id": meta_entry["id"],
-                }
-            )
-            # Stop once we have enough good results
-            if len(results) >= top_k:
-                break
+            hit = {
+                "score": float(score),
+                "text": meta_entry["text"],
+                "metadata": meta_entry["metadata"],
+                "id": meta_entry["id"],
+            }
+            if "duplicates" in meta_entry:
+                hit["duplicates"] = [d["metadata"] for d in meta_entry["duplicates"]]
+            results.append(hit)
         return results
 
+    def _fit_projection(self) -> bool:
+        # Fits the projection on the indexed vectors and builds the reduced
+        # index. Small stores stay at full dimension.
+        self.projection = self.reduced_index = None
+        if self.projection_dim <= 0 or self.index.ntotal < PROJECTION_MIN_TRAIN:
+            return False
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        self.projection = Projection.fit(vectors, self.projection_dim)
+        self.reduced_index = self.projection.build_index(vectors)
+        print(f" Fitted {self.projection.method.upper()} projection {vectors.shape[1]} -> {self.projection_dim} dims")
+        return True
 
-def _load_texts_and_metadata(processed_dir: str) -> Tuple[List[str], List[Dict]]:
-    # Load texts and metadata directly from *_chunks.json files.
-    processed_path = Path(processed_dir)
-    chunk_files = sorted(processed_path.glob("*_chunks.json"))
-    
-    # Exclude navigation chunks (handled separately)
-    chunk_files = [f for f in chunk_files if "navigation" not in f.name.lower()]
-    
-    if not chunk_files:
-        raise FileNotFoundError(f"No chunk files found in {processed_path}")
+    def _filter_ids(self, filters: Dict[str, str | Sequence[str]] | None) -> np.ndarray | None:
+        # AND across fields, OR within a list of values. None means "no filter".
+        if not filters:
+            return None
+        allowed: np.ndarray | None = None
+        for field, value in filters.items():
+            if field not in FILTERABLE_FIELDS:
+                raise ValueError(f"Unsupported filter field '{field}'. Use one of: {', '.join(FILTERABLE_FIELDS)}")
+            values = [value] if isinstance(value, (str, int)) else list(value)
+            postings = self._field_postings(field)
+            matches = [postings[str(v)] for v in values if str(v) in postings]
+            ids = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+            allowed = ids if allowed is None else np.intersect1d(allowed, ids, assume_unique=True)
+        return allowed
+
+    def _field_postings(self, field: str) -> Dict[str, np.ndarray]:
+        if field not in self._postings:
+            buckets: Dict[str, List[int]] = {}
+            for idx, entry in enumerate(self.metadata):
+                # A deduplicated chunk matches the filters of all its sources
+                values = {str(entry["metadata"].get(field, ""))}
+                values.update(str(d["metadata"].get(field, "")) for d in entry.get("duplicates", []))
+                for value in values:
+                    buckets.setdefault(value, []).append(idx)
+            self._postings[field] = {v: np.asarray(ids, dtype=np.int64) for v, ids in buckets.items()}
+        return self._postings[field]
+
+
+def new_entry(chunk_id: str | None, text: str, meta: Dict) -> Dict:
+    # Metadata record of one indexed chunk; append() assigns the id
+    entry = {"id": None, "text": text, "metadata": meta}
+    if chunk_id is not None:
+        entry["chunk_id"] = chunk_id
+    return entry
 
-    texts: List[str] = []
-    metadatas: List[Dict] = []
 
-    for chunk_file in chunk_files:
-        with open(chunk_file, encoding="utf-8") as f:
-            data = json.load(f)
-        for chunk in data.get("chunks", []):
-            texts.append(chunk)
-            meta = data.get("metadata", {}).copy()
-            meta["type"] = "legal"  # Mark as legal document
-            metadatas.append(meta)
+def dedup_batches(
+    chunks: Iterable[Tuple[str | None, str, Dict]],
+    batch_size: int = BUILD_BATCH_SIZE,
+    threshold: float = DEDUP_THRESHOLD,
+    scope: Callable[[Dict], Hashable] | None = None,
+) -> Iterator[List[Dict]]:
+    # Batches of new_entry() records from (chunk_id, text, metadata) records.
+    # A near-duplicate of an earlier chunk gets no entry of its own; it is
+    # added to that entry's "duplicates" so its source is still cited.
+    # With scope(metadata), chunks are only compared within the same scope.
+    detectors: Dict[Hashable, Tuple[MinHashLSH, List[Dict]]] = {}
+    for batch in iter_batches(chunks, batch_size):
+        entries = []
+        for chunk_id, text, meta in batch:
+            entry = new_entry(chunk_id, text, meta)
+            if threshold > 0:
+                key = scope(meta) if scope is not None else None
+                if key not in detectors:
+                    detectors[key] = (MinHashLSH(threshold=threshold), [])
+                lsh, kept = detectors[key]
+                signature = lsh.signature(text)
+                match = lsh.query(signature)
+                if match is not None:
+                    kept[match[0]].setdefault("duplicates", []).append({"chunk_id": chunk_id, "metadata": meta})
+                    continue
+                lsh.add(len(kept), signature)
+                kept.append(entry)
+            entries.append(entry)
+        if entries:
+            yield entries
 
+
+def embed_texts(texts: List[str], embedding_model: EmbeddingModel) -> np.ndarray:
+    # Normalized float32 embeddings, as stored in the inner-product index
+    embeddings = np.ascontiguousarray(embedding_model.embed(texts), dtype=np.float32)
+    if not embedding_model.normalize:
+        import faiss
+
+        faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def duplicate_sources(hit: Dict) -> List[str]:
+    # Other documents containing a hit's chunk (near-duplicates are stored once)
+    primary = hit.get("metadata", {}).get("filename")
+    names = (d.get("filename", d.get("title", "")) for d in hit.get("duplicates", []))
+    return [n for n in dict.fromkeys(names) if n and n != primary]
+
+
+def _iter_legal_chunks(processed_dir: str) -> Iterator[Tuple[str, str, Dict]]:
+    # (chunk_id, text, metadata) from the JSONL corpus when there is one, else
+    # from the *_chunks.json files. Metadata is shared per document.
+    corpus_path = find_corpus(processed_dir)
+    if corpus_path is not None:
+        print(f"📚 Streaming chunks from {corpus_path}")
+        chunks = iter_chunks(corpus_path)
+    else:
+        if not any(Path(processed_dir).glob("*_chunks.json")):
+            raise FileNotFoundError(f"No chunk files found in {processed_dir}")
+        chunks = iter_chunk_files(processed_dir)
+
+    source, legal = None, {}
+    for chunk_id, text, meta in chunks:
+        # Mark as legal document, once per document (its chunks are contiguous)
+        if meta is not source:
+            source, legal = meta, {**meta, "type": "legal"}
+        yield chunk_id, text, legal
+
+
+def _iter_build_chunks(
+    processed_dir: str | Path,
+    navigation_dir: str | Path | None,
+) -> Iterator[Tuple[str | None, str, Dict]]:
+    # Legal chunks are streamed from the corpus; navigation entries are few
+    chunks: Iterable[Tuple[str | None, str, Dict]] = _iter_legal_chunks(str(processed_dir))
+    if navigation_dir:
+        nav_texts, nav_metas = _load_navigation_data(str(navigation_dir))
+        if nav_texts:
+            print(f" Loaded {len(nav_texts)} navigation service chunks")
+            chunks = itertools.chain(chunks, ((None, t, m) for t, m in zip(nav_texts, nav_metas)))
+    return iter(chunks)
+
+
+def _load_texts_and_metadata(processed_dir: str) -> Tuple[List[str], List[Dict]]:
+    # Load all legal texts and metadata as lists (for callers that need them at once).
+    texts: List[str] = []
+    metadatas: List[Dict] = []
+    for _, text, meta in _iter_legal_chunks(processed_dir):
+        texts.append(text)
+        metadatas.append(meta)
     return texts, metadatas
 
 
@@ -208,7 +453,7 @@ def _basic_navigation_load(nav_file: Path) -> Tuple[List[str], List[Dict]]:
     return texts, metadatas
 
 
-__all__ = ["FaissVectorStore"]
+__all__ = ["FaissVectorStore", "duplicate_sources"]
 
 
 if __name__ == "__main__":
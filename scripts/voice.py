@@ -3,25 +3,34 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
+import hashlib
+import importlib.util
 import io
 import os
-import tempfile
+import queue
+import re
+import threading
+import wave
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterable, AsyncIterator, Awaitable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
+from dotenv import load_dotenv
+
+# Load .env from project root
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(_ENV_PATH)
+
+# Availability is checked without importing; the libraries load on first use
 # TTS
-try:
-    import edge_tts
-    HAS_EDGE_TTS = True
-except ImportError:
-    HAS_EDGE_TTS = False
+HAS_EDGE_TTS = importlib.util.find_spec("edge_tts") is not None
 
-# STT - using SpeechRecognition library with Google API
-try:
-    import speech_recognition as sr
-    HAS_WHISPER = True  
-except ImportError:
-    HAS_WHISPER = False
+# STT - Google API through SpeechRecognition, or local Whisper through faster-whisper
+HAS_SPEECH_RECOGNITION = importlib.util.find_spec("speech_recognition") is not None
+HAS_FASTER_WHISPER = importlib.util.find_spec("faster_whisper") is not None
+HAS_WHISPER = HAS_SPEECH_RECOGNITION or HAS_FASTER_WHISPER  # any STT engine
 
 
 # Default voices for edge-tts
@@ -32,84 +41,440 @@ VOICE_OPTIONS = {
 
 DEFAULT_VOICE = "en-US-JennyNeural"
 
+# Speech-to-text engine: "auto" (offline if installed), "whisper" or "google"
+STT_ENGINE = os.getenv("STT_ENGINE", "auto")
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base")
+STT_DEVICE = os.getenv("STT_DEVICE", "cpu")
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en-US")
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+STT_SAMPLE_RATE = 16000
 
-class SpeechToText:
-    
-    def __init__(self, model_size: str = "base", device: str = "cpu"):
-        if not HAS_WHISPER:
+# Synthesized audio is cached per (text, voice): LRU in memory, files on disk ("" disables disk)
+_TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "database/tts_cache")
+TTS_CACHE_DIR = Path(__file__).resolve().parents[1] / _TTS_CACHE_DIR if _TTS_CACHE_DIR else None
+TTS_CACHE_ITEMS = int(os.getenv("TTS_CACHE_ITEMS", "256"))
+# Sentences synthesized ahead of the one being played
+TTS_MAX_AHEAD = int(os.getenv("TTS_MAX_AHEAD", "3"))
+TTS_MIN_SENTENCE_CHARS = 20
+
+
+def decode_wav(audio_bytes: bytes, target_rate: int = STT_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    # WAV bytes -> mono float32 samples in [-1, 1] at target_rate, all in memory
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != target_rate and len(samples):
+        # Linear resampling is plenty for speech recognition input
+        positions = np.arange(0, len(samples), rate / target_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples, target_rate
+
+
+class STTEngine:
+    # A speech recognizer. Engines are loaded once and shared by every
+    # SpeechToText, so transcribe() must be safe to call from several threads.
+    name = "base"
+    offline = False
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int) -> str:
+        raise NotImplementedError
+
+
+class GoogleSTTEngine(STTEngine):
+    # Google Web Speech API through SpeechRecognition (needs network access)
+    name = "google"
+
+    def __init__(self, language: str = STT_LANGUAGE):
+        if not HAS_SPEECH_RECOGNITION:
             raise RuntimeError("SpeechRecognition not installed.")
-        
+        import speech_recognition as sr
+
+        self.language = language
         self.recognizer = sr.Recognizer()
-    
-    def transcribe(self, audio_bytes: bytes) -> str:
-        # Save audio to temp file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            f.write(audio_bytes)
-            temp_path = f.name
-        
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int) -> str:
+        import speech_recognition as sr
+
+        pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+        audio_data = sr.AudioData(pcm, sample_rate, 2)
         try:
-            with sr.AudioFile(temp_path) as source:
-                audio_data = self.recognizer.record(source)
-            
-            # Use Google's free speech recognition API
-            text = self.recognizer.recognize_google(audio_data)
-            return text.strip()
+            return self.recognizer.recognize_google(audio_data, language=self.language).strip()
         except sr.UnknownValueError:
             return ""  # Speech not understood
         except sr.RequestError as e:
             return f"[Error: {e}]"
-        finally:
-            # Cleanup temp file
-            os.unlink(temp_path)
 
 
-class TextToSpeech:    
-    def __init__(self, voice: str = DEFAULT_VOICE):
+class WhisperSTTEngine(STTEngine):
+    # Local Whisper model through faster-whisper (CTranslate2, int8 on CPU);
+    # runs without network access once the model files are present.
+    name = "whisper"
+    offline = True
+
+    def __init__(self, model_size: str = STT_MODEL_SIZE, device: str = STT_DEVICE):
+        if not HAS_FASTER_WHISPER:
+            raise RuntimeError("faster-whisper not installed.")
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_size, device=device, compute_type="int8" if device == "cpu" else "float16"
+        )
+        self.language = STT_LANGUAGE.split("-")[0]
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int) -> str:
+        segments, _ = self.model.transcribe(
+            samples, language=self.language, beam_size=1, vad_filter=True
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+STT_ENGINES = {
+    GoogleSTTEngine.name: GoogleSTTEngine,
+    WhisperSTTEngine.name: WhisperSTTEngine,
+}
+
+_engines: Dict[str, STTEngine] = {}
+_engines_lock = threading.Lock()
+_stt_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def available_stt_engines() -> List[str]:
+    installed = {"google": HAS_SPEECH_RECOGNITION, "whisper": HAS_FASTER_WHISPER}
+    return [name for name in STT_ENGINES if installed.get(name, True)]
+
+
+def get_stt_engine(name: str = STT_ENGINE) -> STTEngine:
+    # Shared engine instance; "auto" prefers an offline engine
+    if name == "auto":
+        names = available_stt_engines()
+        if not names:
+            raise RuntimeError("No speech-to-text engine installed.")
+        name = next((n for n in names if STT_ENGINES[n].offline), names[0])
+    if name not in STT_ENGINES:
+        raise ValueError(f"Unknown STT engine '{name}' (choose from {', '.join(STT_ENGINES)})")
+    with _engines_lock:
+        if name not in _engines:
+            _engines[name] = STT_ENGINES[name]()
+        return _engines[name]
+
+
+def _get_stt_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _stt_pool
+    with _engines_lock:
+        if _stt_pool is None:
+            _stt_pool = concurrent.futures.ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+        return _stt_pool
+
+
+class SpeechToText:
+    # Transcribes WAV bytes without touching disk. Recognition runs on a
+    # bounded worker pool shared by all instances, so concurrent voice
+    # queries queue instead of oversubscribing the CPU.
+
+    def __init__(self, engine: str = STT_ENGINE):
+        self.engine = get_stt_engine(engine)
+
+    def _transcribe(self, audio_bytes: bytes) -> str:
+        samples, rate = decode_wav(audio_bytes)
+        if not len(samples):
+            return ""
+        return self.engine.transcribe(samples, rate)
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        return _get_stt_pool().submit(self._transcribe, audio_bytes).result()
+
+    async def transcribe_async(self, audio_bytes: bytes) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_stt_pool(), self._transcribe, audio_bytes)
+
+
+class _LoopWorker:
+    # One event loop on a daemon thread, shared by every TextToSpeech. Sync
+    # callers submit coroutines to it instead of creating a loop per call.
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="tts-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+_worker: Optional[_LoopWorker] = None
+_worker_lock = threading.Lock()
+
+
+def _get_worker() -> _LoopWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = _LoopWorker()
+        return _worker
+
+
+class TTSCache:
+    # LRU of synthesized audio in memory, backed by one file per entry on
+    # disk. Keyed by (text hash, voice), so repeated answers play instantly,
+    # including after a restart.
+
+    def __init__(self, cache_dir: Path | str | None = TTS_CACHE_DIR, max_items: int = TTS_CACHE_ITEMS) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_items = max_items
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(text: str, voice: str) -> str:
+        return hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, voice: str) -> Optional[bytes]:
+        key = self.key(text, voice)
+        with self._lock:
+            audio = self._items.get(key)
+            if audio is not None:
+                self._items.move_to_end(key)
+                self.stats["hits"] += 1
+                return audio
+        path = self._path(key)
+        if path is not None and path.exists():
+            audio = path.read_bytes()
+            self._remember(key, audio)
+            self.stats["disk_hits"] += 1
+            return audio
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, text: str, voice: str, audio: bytes) -> None:
+        if not audio:
+            return
+        key = self.key(text, voice)
+        self._remember(key, audio)
+        path = self._path(key)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so a concurrent reader never sees half a file
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(audio)
+            os.replace(tmp, path)
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        with self._lock:
+            self._items[key] = audio
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def _path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / key[:2] / f"{key}.mp3" if self.cache_dir else None
+
+
+_MARKDOWN = re.compile(r"[*_`#>|]+|\[(.*?)\]\(.*?\)")
+# A sentence is complete once its end punctuation is followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def speakable(text: str) -> str:
+    # Markdown markers are read out literally by the voices; links keep their label
+    text = _MARKDOWN.sub(lambda m: m.group(1) or " ", text)
+    return " ".join(text.split())
+
+
+class SentenceBuffer:
+    # Collects streamed text deltas and releases complete sentences. Short
+    # fragments ("1.", "Note:") are held back and merged with what follows.
+
+    def __init__(self, min_chars: int = TTS_MIN_SENTENCE_CHARS) -> None:
+        self.min_chars = min_chars
+        self._pending = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._pending += delta
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._pending):
+            candidate = speakable(self._pending[start:match.start()])
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._pending = self._pending[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest, self._pending = speakable(self._pending), ""
+        return [rest] if rest else []
+
+
+class TextToSpeech:
+    def __init__(self, voice: str = DEFAULT_VOICE, cache: Optional[TTSCache] = None):
         if not HAS_EDGE_TTS:
             raise RuntimeError("edge-tts not installed.")
         self.voice = voice
-    
+        self.cache = cache if cache is not None else _get_shared_cache()
+
     async def _synthesize_async(self, text: str) -> bytes:
+        import edge_tts
+
         communicate = edge_tts.Communicate(text, self.voice)
-        audio_data = b""
+        audio = bytearray()
         async for chunk in communicate.stream():
             if chunk["type"] == "audio":
-                audio_data += chunk["data"]
-        return audio_data
-    
+                audio.extend(chunk["data"])
+        return bytes(audio)
+
+    async def synthesize_sentence_async(self, sentence: str) -> bytes:
+        # One sentence (already speakable), through the cache
+        voice = self.voice
+        audio = self.cache.get(sentence, voice)
+        if audio is None:
+            audio = await self._synthesize_async(sentence)
+            self.cache.put(sentence, voice, audio)
+        return audio
+
+    async def stream_async(
+        self,
+        text_stream: AsyncIterable[str],
+        max_ahead: int = TTS_MAX_AHEAD,
+    ) -> AsyncIterator[bytes]:
+        # Audio per sentence, in order, while the text is still arriving.
+        # Synthesis of a sentence starts as soon as it is complete; up to
+        # max_ahead sentences are synthesized ahead of the one being yielded.
+        pending: asyncio.Queue = asyncio.Queue()
+        ahead = asyncio.Semaphore(max_ahead)
+
+        async def start(sentence: str) -> None:
+            await ahead.acquire()
+            pending.put_nowait(asyncio.ensure_future(self.synthesize_sentence_async(sentence)))
+
+        async def produce() -> None:
+            buffer = SentenceBuffer()
+            try:
+                async for delta in text_stream:
+                    for sentence in buffer.feed(delta):
+                        await start(sentence)
+                for sentence in buffer.flush():
+                    await start(sentence)
+            finally:
+                pending.put_nowait(None)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
+                    break
+                audio = await task
+                ahead.release()
+                if audio:
+                    yield audio
+            await producer
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+
+    async def synthesize_async(self, text: str) -> bytes:
+        async def whole():
+            yield text
+
+        audio = bytearray()
+        async for part in self.stream_async(whole()):
+            audio.extend(part)
+        return bytes(audio)
+
     def synthesize(self, text: str) -> bytes:
-        # Run async code in sync context
+        # Blocking call for sync code (Streamlit); runs on the shared loop
+        return _get_worker().submit(self.synthesize_async(text)).result()
+
+    def synthesize_stream(self, text_stream: Iterable[str]) -> Iterator[bytes]:
+        # Blocking generator: feed text deltas from a sync iterator (e.g. a
+        # streaming HTTP response) and get audio per sentence as it is ready.
+        # The sync iterator is consumed on a separate thread so a slow
+        # producer never blocks the shared loop.
+        worker = _get_worker()
+        out: queue.Queue = queue.Queue()
+        done = object()
+
+        async def deltas() -> AsyncIterator[str]:
+            iterator = iter(text_stream)
+            while True:
+                delta = await asyncio.to_thread(next, iterator, done)
+                if delta is done:
+                    return
+                yield delta
+
+        async def pump() -> None:
+            try:
+                async for audio in self.stream_async(deltas()):
+                    out.put(audio)
+            except Exception as e:
+                out.put(e)
+            finally:
+                out.put(done)
+
+        future = worker.submit(pump())
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, self._synthesize_async(text))
-                return future.result()
-        else:
-            return loop.run_until_complete(self._synthesize_async(text))
-    
+            while True:
+                item = out.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
     def set_voice(self, voice: str):
         self.voice = voice
 
 
+_shared_cache: Optional[TTSCache] = None
+
+
+def _get_shared_cache() -> TTSCache:
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = TTSCache()
+    return _shared_cache
+
+
 def check_voice_dependencies() -> dict:
     return {
         "stt": HAS_WHISPER,
+        "stt_engines": available_stt_engines(),
         "tts": HAS_EDGE_TTS,
     }
 
 
 __all__ = [
     "SpeechToText", 
+    "STTEngine",
+    "STT_ENGINES",
+    "get_stt_engine",
+    "available_stt_engines",
+    "decode_wav",
     "TextToSpeech", 
+    "TTSCache",
+    "SentenceBuffer",
+    "speakable",
     "VOICE_OPTIONS", 
     "DEFAULT_VOICE",
     "check_voice_dependencies",
     "HAS_WHISPER",
+    "HAS_SPEECH_RECOGNITION",
+    "HAS_FASTER_WHISPER",
     "HAS_EDGE_TTS",
 ]
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import sys
 import base64
+from collections import OrderedDict
 from pathlib import Path
 
 import streamlit as st
@@ -18,7 +19,10 @@ load_dotenv(ROOT / ".env")
 
 from embedding import EmbeddingModel
 from llm_wrapper import generate_answer, DEFAULT_LLM_MODEL
-from vector import FaissVectorStore
+from vector import FaissVectorStore, duplicate_sources
+from context_packer import pack_context, get_llm_tokenizer
+from sentences import format_preview
+from api_client import BackendClient, BackendError, BACKEND_URL
 
 try:
     from voice import TextToSpeech, SpeechToText, VOICE_OPTIONS, DEFAULT_VOICE, HAS_EDGE_TTS, HAS_WHISPER
@@ -43,6 +47,9 @@ st.set_page_config(
 )
 
 TOP_K = 8
+# With BACKEND_URL set, the app is a thin client of backend/main.py and loads no model or index
+CLIENT_MODE = bool(BACKEND_URL)
+ANSWER_CACHE_SIZE = 32
 LOGO_PATH = ROOT / "assets" / "images" / "logo.jpeg"
 
 SUGGESTIONS = [
@@ -85,6 +92,12 @@ def load_resources():
     return model, store
 
 
+@st.cache_resource(show_spinner=False)
+def load_backend_client() -> BackendClient:
+    # One pooled keep-alive HTTP client shared by all sessions
+    return BackendClient()
+
+
 @st.cache_resource(show_spinner=False)
 def load_tts():
     return TextToSpeech() if HAS_EDGE_TTS else None
@@ -96,7 +109,7 @@ def load_stt():
 
 
 def search_and_answer(question: str, model, store) -> tuple[str, str]:
-    hits = store.search(question, embedding_model=model, top_k=TOP_K)
+    hits = store.search(question, embedding_model=model, top_k=TOP_K, compress=True)
     
     # Build sources text
     sources_lines = []
@@ -108,26 +121,73 @@ def search_and_answer(question: str, model, store) -> tuple[str, str]:
             # Navigation service source
             service_name = meta.get("service_name", meta.get("title", "Unknown Service"))
             category = meta.get("category", "")
-            preview = hit["text"][:400] + "..." if len(hit["text"]) > 400 else hit["text"]
+            preview = format_preview(hit)
             sources_lines.append(f"**{i}. 🧭 {service_name}** ({category})\n> {preview}")
         else:
             # Legal document source
             source = meta.get("filename", meta.get("title", "Unknown"))
+            also_in = duplicate_sources(hit)
+            if also_in:
+                source += f"; also in {', '.join(also_in)}"
             year = meta.get("year", "")
-            preview = hit["text"][:400] + "..." if len(hit["text"]) > 400 else hit["text"]
+            preview = format_preview(hit)
             sources_lines.append(f"**{i}. 📚 {source}** ({year})\n> {preview}")
     
     sources_text = "\n\n".join(sources_lines)
     
     try:
-        context = [h["text"] for h in hits]
-        metadata = [h.get("metadata", {}) for h in hits]
+        context, metadata = pack_context(hits, tokenizer=get_llm_tokenizer())
         answer = generate_answer(question, context, chunk_metadata=metadata, model=DEFAULT_LLM_MODEL)
         return answer, sources_text
     except Exception as e:
         return f" Error generating response: {e}", sources_text
 
 
+def stream_from_backend(question: str) -> tuple[str, str, bool]:
+    # Render answer tokens as they arrive; returns (answer, sources, ok)
+    client = load_backend_client()
+    received = {"sources": ""}
+
+    def tokens():
+        for event in client.stream_search(question, top_k=TOP_K):
+            if event["type"] == "sources":
+                received["sources"] = event["sources"]
+            elif event["type"] == "token":
+                yield event["text"]
+
+    try:
+        with st.spinner(""):
+            stream = tokens()
+            first = next(stream, "")  # spinner until retrieval is done and the first token arrives
+        answer = st.write_stream(_prepend(first, stream))
+        return answer, received["sources"], True
+    except BackendError as e:
+        answer = f" Error generating response: {e}"
+        st.markdown(answer)
+        return answer, received["sources"], False
+
+
+def _prepend(first: str, rest):
+    yield first
+    yield from rest
+
+
+def cached_answer(question: str) -> tuple[str, str] | None:
+    cache = st.session_state.answer_cache
+    key = " ".join(question.lower().split())
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+
+def remember_answer(question: str, answer: str, sources: str) -> None:
+    cache = st.session_state.answer_cache
+    cache[" ".join(question.lower().split())] = (answer, sources)
+    while len(cache) > ANSWER_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
 def generate_tts_audio(text: str, voice: str | None = None) -> bytes | None:
     tts = load_tts()
     if tts:
@@ -151,10 +211,21 @@ def process_query(prompt: str, is_voice: bool = False) -> None:
     
     # Generate response
     with st.chat_message("assistant", avatar="⚖️"):
-        with st.spinner(""):
-            answer, sources = search_and_answer(prompt, model, store)
-        
-        st.markdown(answer)
+        cached = cached_answer(prompt)
+        if cached:
+            answer, sources = cached
+            st.markdown(answer)
+        elif CLIENT_MODE:
+            answer, sources, ok = stream_from_backend(prompt)
+            if ok:
+                remember_answer(prompt, answer, sources)
+        else:
+            with st.spinner(""):
+                answer, sources = search_and_answer(prompt, model, store)
+            if not answer.startswith(" Error"):
+                remember_answer(prompt, answer, sources)
+            st.markdown(answer)
+
         with st.expander("📚 View Sources"):
             st.markdown(sources)
         
@@ -188,6 +259,7 @@ DEFAULTS = {
     "stt_text": "",
     "last_audio_hash": None,
     "suggestion": None,
+    "answer_cache": OrderedDict(),
 }
 
 for key, default in DEFAULTS.items():
@@ -198,12 +270,15 @@ for key, default in DEFAULTS.items():
 LOGO_BASE64 = get_logo_base64()
 st.markdown(load_css(), unsafe_allow_html=True)
 
-# Load resources
-try:
-    model, store = load_resources()
-except Exception as e:
-    st.error(f"Failed to load resources: {e}")
-    st.stop()
+# Load resources (client mode: the backend holds the model and index)
+if CLIENT_MODE:
+    model, store = None, None
+else:
+    try:
+        model, store = load_resources()
+    except Exception as e:
+        st.error(f"Failed to load resources: {e}")
+        st.stop()
 
 with st.sidebar:
     st.title("⚖️ Nyaya.exe")
@@ -264,6 +339,8 @@ with st.sidebar:
         st.caption("⚠️ Install: `pip install SpeechRecognition`")
     
     st.divider()
+    if CLIENT_MODE:
+        st.caption(f"Connected to {BACKEND_URL}")
     st.caption("Powered by RAG technology")
     st.caption("📚 Legal Documents + 🧭 Navigation Services")
 
@@ -0,0 +1,11 @@
+# Tests for the scripts/ pipeline modules, which import each other as
+# top-level modules (python scripts/<name>.py), so scripts/ goes on sys.path.
+# Backend tests import the `app` package, so backend/ goes on it too.
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT / "scripts", ROOT / "backend"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.db.faiss_store import FAISSStore
+
+DIM = 16
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch) -> FAISSStore:
+    monkeypatch.setattr(settings, "INDEX_TYPE", "binary")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", DIM)
+    monkeypatch.setattr(settings, "PROJECTION_DIM", 0)
+    store = FAISSStore(tmp_path)
+    vectors = np.random.default_rng(0).standard_normal((40, DIM)).astype(np.float32)
+    store.add_embeddings(
+        vectors,
+        [{"document_name": f"doc{i % 2}.pdf", "text": f"chunk {i}"} for i in range(40)]
+    )
+    return store
+
+
+def test_search_returns_the_exact_match_first(store):
+    query = store.index.reconstruct(7)
+
+    hits = store.search(query.copy(), top_k=3)
+
+    assert len(hits) == 3
+    assert hits[0]["index"] == 7
+    assert hits[0]["similarity_score"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_filtered_search_only_returns_matching_chunks(store):
+    query = store.index.reconstruct(7)  # a doc1.pdf chunk
+
+    hits = store.search(query.copy(), top_k=5, filters={"document_name": "doc0.pdf"})
+
+    assert len(hits) == 5
+    assert all(hit["document_name"] == "doc0.pdf" for hit in hits)
+
+
+def test_search_after_save_and_reload(store, tmp_path):
+    assert store.save_index()
+    reloaded = FAISSStore(tmp_path)
+
+    hits = reloaded.search(store.index.reconstruct(3).copy(), top_k=1)
+
+    assert hits[0]["index"] == 3
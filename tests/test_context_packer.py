@@ -0,0 +1,40 @@
+import pytest
+
+from app.utils.context_packer import ContextPacker
+from context_packer import count_tokens, pack_context
+
+
+class _WordTokenizer:
+    # One token per word, and one for the "..." the packer appends.
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+HITS = [
+    {"text": " ".join(f"word{i}" for i in range(300)), "metadata": {"filename": "a.pdf"}},
+    {"text": " ".join(f"term{i}" for i in range(300)), "metadata": {"filename": "b.pdf"}},
+]
+
+
+@pytest.mark.parametrize("tokenizer", [None, _WordTokenizer()])
+def test_truncated_context_stays_within_the_budget(tokenizer):
+    texts, _ = pack_context(HITS, token_budget=400, tokenizer=tokenizer)
+
+    assert texts[-1].endswith(" ...")
+    assert sum(count_tokens(text, tokenizer) for text in texts) <= 400
+
+
+@pytest.mark.parametrize("tokenizer", [None, _WordTokenizer()])
+def test_backend_packer_stays_within_the_budget(tokenizer):
+    packer = ContextPacker(token_budget=400, tokenizer=tokenizer)
+
+    packed = packer.pack([
+        {**hit, "document_name": hit["metadata"]["filename"], "chunk_index": 0} for hit in HITS
+    ])
+
+    assert packed.texts[-1].endswith(" ...")
+    assert sum(packer.count_tokens(text) for text in packed.texts) <= 400
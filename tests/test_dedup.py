@@ -0,0 +1,27 @@
+from vector import dedup_batches
+
+TEXT = "Every citizen shall have the right to live with dignity and the right to equality before law."
+
+
+def _chunks():
+    return [
+        ("a-1", TEXT, {"filename": "A.pdf"}),
+        ("a-2", TEXT + " ", {"filename": "A.pdf"}),
+        ("b-1", TEXT, {"filename": "B.pdf"}),
+    ]
+
+
+def test_near_duplicates_are_stored_once_with_references():
+    entries = [e for batch in dedup_batches(_chunks(), batch_size=2, threshold=0.9) for e in batch]
+
+    assert [e["chunk_id"] for e in entries] == ["a-1"]
+    assert [d["chunk_id"] for d in entries[0]["duplicates"]] == ["a-2", "b-1"]
+
+
+def test_scope_keeps_duplicates_in_other_scopes():
+    batches = dedup_batches(_chunks(), threshold=0.9, scope=lambda meta: meta["filename"])
+    entries = [e for batch in batches for e in batch]
+
+    assert [e["chunk_id"] for e in entries] == ["a-1", "b-1"]
+    assert [d["chunk_id"] for d in entries[0]["duplicates"]] == ["a-2"]
+    assert "duplicates" not in entries[1]
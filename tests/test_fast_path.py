@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+import fast_path
+from fast_path import NavigationFastPath
+from navigation_processor import save_alias_index
+
+
+@pytest.fixture(scope="module")
+def index_path(tmp_path_factory) -> Path:
+    path = tmp_path_factory.mktemp("fast_path") / "navigation_aliases.json"
+    save_alias_index(path)
+    return path
+
+
+@pytest.fixture
+def matcher(index_path) -> NavigationFastPath:
+    matcher = NavigationFastPath(index_path)
+    matcher.load()
+    return matcher
+
+
+@pytest.mark.parametrize("question, name", [
+    ("police emergency number", "Nepal Police"),
+    ("documents required for citizenship certificate", "Citizenship Certificate"),
+    ("driving license renewal", "Driving License Renewal"),
+    ("marriage registration documents", "Marriage Registration"),
+])
+def test_matches_named_service(matcher, question, name):
+    match = matcher.match(question)
+    assert match is not None
+    assert match["entry"]["name"] == name
+
+
+@pytest.mark.parametrize("question", [
+    # One content word outside the matched alias names a different service
+    "renew driving license",
+    "cancel marriage registration",
+    "duplicate citizenship certificate",
+])
+def test_unmatched_content_word_falls_back(matcher, question):
+    assert matcher.match(question) is None
+    assert matcher.stats["low_confidence"] == 1
+
+
+def test_load_without_navigation_data(index_path, monkeypatch, tmp_path):
+    monkeypatch.setattr(fast_path, "NAVIGATION_DATA_PATH", tmp_path / "missing.json")
+    matcher = NavigationFastPath(index_path)
+    matcher.load()
+    assert matcher.entries
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from llm_client import AsyncLLMClient, LLMRequestError
+
+
+def _sse(*deltas: str) -> bytes:
+    return b"".join(
+        f"data: {json.dumps({'choices': [{'delta': {'content': d}}]})}\n\n".encode() for d in deltas
+    )
+
+
+class _Stream(httpx.AsyncByteStream):
+    # Sends the given parts, then drops the connection if `fail` is set.
+
+    def __init__(self, parts, fail: bool) -> None:
+        self.parts = parts
+        self.fail = fail
+
+    async def __aiter__(self):
+        for part in self.parts:
+            yield part
+        if self.fail:
+            raise httpx.ReadError("connection dropped")
+
+
+def _client(handler) -> AsyncLLMClient:
+    client = AsyncLLMClient(base_url="http://llm.test/v1", api_key="test", max_retries=2)
+    client.client = httpx.AsyncClient(base_url="http://llm.test/v1", transport=httpx.MockTransport(handler))
+    return client
+
+
+async def _collect(client: AsyncLLMClient, received: list) -> None:
+    async for delta in client.chat_stream([{"role": "user", "content": "hi"}], model="m"):
+        received.append(delta)
+
+
+def test_stream_broken_mid_answer_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, stream=_Stream([_sse("Hello ")], fail=True))
+
+    client = _client(handler)
+    received: list = []
+    with pytest.raises(LLMRequestError, match="mid-answer"):
+        asyncio.run(_collect(client, received))
+    assert received == ["Hello "]
+    assert len(calls) == 1
+    assert client.stats["retries"] == 0
+
+
+def test_stream_failing_before_first_delta_is_retried(monkeypatch):
+    monkeypatch.setattr("llm_client._BACKOFF_BASE_S", 0.0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(200, stream=_Stream([], fail=True))
+        return httpx.Response(200, stream=_Stream([_sse("Hello ", "world"), b"data: [DONE]\n\n"], fail=False))
+
+    client = _client(handler)
+    received: list = []
+    asyncio.run(_collect(client, received))
+    assert received == ["Hello ", "world"]
+    assert len(calls) == 2
@@ -0,0 +1,16 @@
+from app.core.readiness import DEGRADED, ReadinessRegistry
+
+
+def test_degraded_component_serves_but_is_not_ready():
+    registry = ReadinessRegistry()
+    registry.register("llm")
+    with registry.loading("llm"):
+        pass
+
+    registry.mark_degraded("llm", "OSError: model not found")
+
+    registry.require("llm")
+    snapshot = registry.snapshot()
+    assert not snapshot["ready"]
+    assert snapshot["components"]["llm"]["status"] == DEGRADED
+    assert snapshot["components"]["llm"]["error"] == "OSError: model not found"
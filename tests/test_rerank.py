@@ -0,0 +1,66 @@
+import threading
+import time
+
+from rerank import CrossEncoderReranker
+
+HITS = [{"text": f"chunk {i}"} for i in range(4)]
+
+
+class _SlowModel:
+    # Scores by text length once released; counts the batches it scores.
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.batches = 0
+
+    def predict(self, pairs, **kwargs):
+        self.batches += 1
+        self.release.wait(5)
+        return [len(text) for _, text in pairs]
+
+
+class _BrokenModel:
+    def predict(self, pairs, **kwargs):
+        raise RuntimeError("model failed to load")
+
+
+def test_falls_back_without_queueing_behind_an_abandoned_batch():
+    reranker = CrossEncoderReranker(timeout_ms=20)
+    reranker._model = model = _SlowModel()
+
+    assert reranker.rerank("q", HITS, top_k=2) == HITS[:2]
+    # The abandoned batch is still running: later requests do not queue behind it
+    for question in ("q2", "q3", "q4"):
+        assert reranker.rerank(question, HITS, top_k=2) == HITS[:2]
+    model.release.set()
+    reranker._stale.result(timeout=5)
+
+    assert model.batches == 1
+    assert reranker.stats["fallbacks"] == 4
+    # The abandoned batch warmed the cache
+    assert all("rerank_score" in hit for hit in reranker.rerank("q", HITS, top_k=2))
+
+
+def test_scoring_failure_falls_back_to_vector_order():
+    reranker = CrossEncoderReranker(timeout_ms=1000)
+    reranker._model = _BrokenModel()
+
+    assert reranker.rerank("q", HITS, top_k=3) == HITS[:3]
+    assert reranker.stats["fallbacks"] == 1
+
+
+def test_slow_model_load_does_not_count_against_the_deadline(monkeypatch):
+    reranker = CrossEncoderReranker(timeout_ms=20)
+    model = _SlowModel()
+    model.release.set()
+
+    def load(self):
+        time.sleep(0.1)
+        self._model = model
+        return model
+
+    monkeypatch.setattr(CrossEncoderReranker, "model", property(lambda self: self._model or load(self)))
+
+    ranked = reranker.rerank("q", HITS, top_k=2)
+    assert all("rerank_score" in hit for hit in ranked)
+    assert reranker.stats["fallbacks"] == 0